@@ -0,0 +1,139 @@
+# Vectorized board analytics over dense NumPy snapshots.
+#
+# Requires NumPy; check `board_arrays.available` before calling in.
+
+from typing import Dict, Optional, Tuple
+
+import board_arrays
+import stone_db
+from board_arrays import np
+
+influence_radius = 6 # Points either side of a stone that it projects influence over.
+
+# (slice of a point, slice of its neighbour) for each of the four directions.
+_neighbours = [
+    ((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+    ((slice(None), slice(1, None)), (slice(None), slice(None, -1))),
+    ((slice(None, -1), slice(None)), (slice(1, None), slice(None))),
+    ((slice(1, None), slice(None)), (slice(None, -1), slice(None))),
+]
+
+def snapshot(bbox: Optional[Tuple[int, int, int, int]] = None) -> dict:
+    """
+    Exports the stones within the inclusive bounding box (x0, y0, x1, y1)
+    into dense arrays, or, if no box is given, the whole occupied area with
+    a margin of one point, so that every liberty is inside it.
+    Returns { "x0": int, "y0": int, "player": array, "status": array,
+    "placement_time": array }, with arrays as from
+    `board_arrays.rasterize`, indexed [y - y0, x - x0].
+    Groups and liberties computed from a bounding box only see the stones
+    inside it.
+    """
+    if bbox is None:
+        stones = stone_db.retrieve()
+        xs = [x for x, _ in stones] or [0]
+        ys = [y for _, y in stones] or [0]
+        x0, y0, x1, y1 = min(xs) - 1, min(ys) - 1, max(xs) + 1, max(ys) + 1
+    else:
+        x0, y0, x1, y1 = bbox
+        stones = stone_db.retrieve_window(x0, y0, x1, y1)
+
+    player, status, placement_time = board_arrays.rasterize(stones, x0, y0, x1, y1)
+    return {"x0": x0, "y0": y0, "player": player, "status": status, "placement_time": placement_time}
+
+def label_groups(player) -> Tuple["np.ndarray", int]:
+    """
+    Labels the connected groups of same-player stones in a dense player
+    array, by propagating the smallest point index across neighbours of the
+    same player and jumping each label to its label's label until nothing
+    changes. Returns (labels, group count), with labels numbered from 0 and
+    -1 on empty points.
+    """
+    height, width = player.shape
+    stone = player != 0
+    labels = np.where(stone, np.arange(height * width).reshape(height, width), height * width)
+
+    while True:
+        previous = labels
+        labels = labels.copy()
+        for here, there in _neighbours:
+            joined = stone[here] & (player[here] == player[there])
+            labels[here] = np.where(joined, np.minimum(labels[here], previous[there]), labels[here])
+        flat = labels.ravel()
+        on_stones = flat[stone.ravel()]
+        flat[stone.ravel()] = flat[on_stones]
+        if np.array_equal(labels, previous):
+            break
+
+    groups, compact = np.unique(labels[stone], return_inverse=True)
+    out = np.full(player.shape, -1, dtype=np.int64)
+    out[stone] = compact.ravel()
+    return out, len(groups)
+
+def liberty_counts(labels, group_count: int):
+    """
+    Counts the distinct empty points next to each group labelled by
+    `label_groups`. Returns an array indexed by group.
+    """
+    size = labels.size
+    points = np.arange(size).reshape(labels.shape)
+    keys = []
+    for here, there in _neighbours:
+        touching = (labels[here] >= 0) & (labels[there] < 0)
+        keys.append(labels[here][touching] * size + points[there][touching])
+    keys = np.unique(np.concatenate(keys))
+    return np.bincount(keys // size, minlength=group_count)
+
+def liberty_map(labels, liberties):
+    """
+    Spreads per-group liberty counts back over the board: each stone gets
+    its group's count, and empty points get -1.
+    """
+    return np.where(labels >= 0, liberties[np.maximum(labels, 0)], -1)
+
+def influence(player, radius: int = influence_radius):
+    """
+    Computes which player dominates each point: the one with the most
+    stones within `radius` points (in a square box) of it. Returns
+    (owner, margin): the dominating player (0 where no player leads) and
+    how many more stones they have there than the runner-up.
+    """
+    best = np.zeros(player.shape, dtype=np.int64)
+    runner_up = np.zeros(player.shape, dtype=np.int64)
+    owner = np.zeros(player.shape, dtype=np.int64)
+    for candidate in np.unique(player[player != 0]):
+        mask = np.pad(player == candidate, radius)
+        counts = board_arrays.box_sums(mask, radius)
+        leads = counts > best
+        runner_up = np.where(leads, best, np.maximum(runner_up, counts))
+        owner = np.where(leads, candidate, owner)
+        best = np.where(leads, counts, best)
+    owner = np.where(best > runner_up, owner, 0)
+    return owner, best - runner_up
+
+def summarize(snap: dict) -> Dict[int, dict]:
+    """
+    Computes per-player statistics from a snapshot: stones, groups, groups
+    with a single liberty, and territory (the empty points the player
+    dominates by `influence`). Returns { player: { "stones", "groups",
+    "atari", "territory" } }.
+    """
+    player = snap["player"]
+    labels, group_count = label_groups(player)
+    liberties = liberty_counts(labels, group_count)
+    owner, _ = influence(player)
+
+    # The player of each group, read from any one of its stones.
+    group_players = np.zeros(group_count, dtype=np.int64)
+    group_players[labels[labels >= 0]] = player[labels >= 0]
+
+    summary = {}
+    for candidate in np.unique(player[player != 0]).tolist():
+        own_groups = group_players == candidate
+        summary[candidate] = {
+            "stones": int((player == candidate).sum()),
+            "groups": int(own_groups.sum()),
+            "atari": int((own_groups & (liberties == 1)).sum()),
+            "territory": int(((owner == candidate) & (player == 0)).sum()),
+        }
+    return summary
@@ -1,14 +1,27 @@
-from flask import Flask, jsonify, render_template, request, Response, session, url_for
+from flask import Flask, g, jsonify, render_template, request, Response, session, url_for
+import cProfile
+import hashlib
+import io
 import json
+import pstats
+import queue
+import threading
 import time
+import uuid
 
 import emails
 
 import user_db
 import stone_db
 
-import move_validation
-import captures
+import board_arrays
+import board_index
+import broadcaster
+import groups
+import metrics
+import region_cache
+import wire
+from move_engine import MoveEngine
 
 with open("config.json") as f:
     cfg = json.load(f)
@@ -16,6 +29,401 @@ with open("config.json") as f:
 app = Flask(__name__)
 app.secret_key = cfg["secret key"]
 
+metrics.instrument(stone_db)
+metrics.instrument(user_db)
+
+move_engine = MoveEngine()
+stone_db.start_expiry_sweeper()
+
+viewer_window_radius = 32 # Points either side of the cursor embedded in the viewer page.
+window_max_span = 256 # Points per side of the largest window served by `/window`.
+board_changes_page_size = 1000 # Most events read per `/board-changes` page.
+stream_queue_size = 256 # Delta batches buffered per `/board-stream` client before it is disconnected.
+stream_heartbeat = 15.0 # Seconds between keepalive comments on an idle `/board-stream`.
+stream_retry = 3000 # Milliseconds an EventSource waits before reconnecting.
+window_max_age = 1 # Seconds a browser or reverse proxy may reuse a `/region` or `/window` response.
+profile_lines = 40 # Functions listed in a `?profile=1` summary.
+
+# Usernames allowed to profile requests with `?profile=1`.
+admins = set(cfg.get("admins", []))
+
+# Held while a request is being profiled; cProfile profiles one thing at a time.
+profile_lock = threading.Lock()
+
+# Distinguishes this process's ETags from those of earlier runs, whose
+# chunk versions were counted from scratch.
+boot_id = uuid.uuid4().hex
+
+event_fields = ("event_id", "event_time", "event_type", "x", "y", "player", "placement_time", "last_status_change_time", "status")
+
+def stones_payload(stones: dict) -> dict:
+    """
+    Attaches player names and scores to stones keyed by (x, y), keying
+    them by "x y" instead, as the viewer expects.
+    """
+    player_ids = {row["player"] for row in stones.values()}
+    scores = stone_db.scores_for(player_ids)
+    names = user_db.usernames(player_ids)
+    out = {}
+    for (sx, sy), row in stones.items():
+        player_id = row["player"]
+        out[f"{sx} {sy}"] = {
+            "player_name": names[player_id],
+            "player_score": scores[player_id],
+            "status": row["status"],
+            "placement_time": row["placement_time"],
+            "last_status_change_time": row["last_status_change_time"],
+        }
+    return out
+
+def window_stones_payload(x0: int, y0: int, x1: int, y1: int) -> dict:
+    """
+    Builds the same stones payload as `stones_payload` for every stone
+    within the inclusive rectangle spanned by (x0, y0) and (x1, y1),
+    reusing the per-chunk payloads held in `region_cache` and building and
+    caching those of the chunks it is missing. Scores change with moves
+    elsewhere on the board, so they are attached afterwards.
+    """
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    generation = user_db.username_generation()
+
+    chunks = []
+    for cx, cy in board_index.chunks_overlapping(x0, y0, x1, y1):
+        version, stones = stone_db.retrieve_chunk(cx, cy)
+        cached = region_cache.get((cx, cy), version, generation)
+        if cached is None:
+            names = user_db.usernames({row["player"] for row in stones.values()})
+            cached = {
+                (sx, sy): (row["player"], {
+                    "player_name": names[row["player"]],
+                    "status": row["status"],
+                    "placement_time": row["placement_time"],
+                    "last_status_change_time": row["last_status_change_time"],
+                })
+                for (sx, sy), row in stones.items()
+            }
+            region_cache.put((cx, cy), version, generation, cached)
+        chunks.append(cached)
+
+    visible = [
+        (sx, sy, player, stone)
+        for cached in chunks
+        for (sx, sy), (player, stone) in cached.items()
+        if x0 <= sx <= x1 and y0 <= sy <= y1
+    ]
+    scores = stone_db.scores_for({player for _, _, player, _ in visible})
+    return {f"{sx} {sy}": dict(stone, player_score=scores[player]) for sx, sy, player, stone in visible}
+
+def events_payload(events: list) -> list:
+    """
+    Shapes board events (or deltas) for clients, attaching player names and
+    scores.
+    """
+    player_ids = {ev["player"] for ev in events if ev["player"] is not None}
+    scores = stone_db.scores_for(player_ids)
+    names = user_db.usernames(player_ids)
+    out = []
+    for ev in events:
+        item = {field: ev[field] for field in event_fields}
+        pid = ev["player"]
+        if pid is None:
+            item["player_name"] = None
+            item["player_score"] = None
+        else:
+            item["player_name"] = names[pid]
+            item["player_score"] = scores[pid]
+        out.append(item)
+    return out
+
+def window_response(x0: int, y0: int, x1: int, y1: int, build) -> Response:
+    """
+    Sends the stones payload returned by `build()` for the given rectangle
+    with an ETag, or an empty 304 response if the request's If-None-Match
+    already names it, in which case `build` is not called.
+    """
+    compact = wire.requested(request.args.get("format"), request.headers.get("Accept"))
+    etag = window_etag(x0, y0, x1, y1, compact)
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=window_headers(etag))
+
+    response = payload_response(build())
+    response.headers.update(window_headers(etag))
+    return response
+
+def payload_response(payload: dict) -> Response:
+    """
+    Sends a stones or events payload as JSON, or in the compact encoding of
+    `wire` if the request asked for it with `?format=compact` or its Accept
+    header.
+    """
+    if wire.requested(request.args.get("format"), request.headers.get("Accept")):
+        try:
+            response = Response(wire.encode(payload), mimetype=wire.media_type)
+        except ValueError:
+            response = jsonify(payload)
+    else:
+        response = jsonify(payload)
+    response.vary.add("Accept")
+    return response
+
+def parse_bbox(args) -> tuple:
+    """
+    Reads an optional inclusive bounding box from the x0, y0, x1 and y1
+    query parameters, as (x0, y0, x1, y1) with x0 <= x1 and y0 <= y1.
+    Returns None if none of them are given. Raises ValueError if only some
+    are given, any is not an integer, or the box spans `window_max_span`
+    or more points per side.
+    """
+    names = ("x0", "y0", "x1", "y1")
+    if not any(name in args for name in names):
+        return None
+    try:
+        x0, y0, x1, y1 = (int(args[name]) for name in names)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid bounding box")
+    if abs(x1 - x0) >= window_max_span or abs(y1 - y0) >= window_max_span:
+        raise ValueError(f"Bounding box must span fewer than {window_max_span} points per side")
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+def in_bbox(event: dict, bbox: tuple) -> bool:
+    """
+    Determines whether an event's point lies within an inclusive bounding box.
+    """
+    x0, y0, x1, y1 = bbox
+    return x0 <= event["x"] <= x1 and y0 <= event["y"] <= y1
+
+def sse_message(data=None, event_id=None, event=None) -> str:
+    """
+    Formats a Server-Sent Events message. With no data, the message only
+    advances the client's last event id.
+    """
+    lines = []
+    if event is not None:
+        lines.append(f"event: {event}")
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if data is not None:
+        lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def window_etag(x0: int, y0: int, x1: int, y1: int, compact: bool) -> str:
+    """
+    Returns the ETag of the stones payload for the inclusive rectangle
+    spanned by (x0, y0) and (x1, y1). It is derived from the versions of
+    the chunks the rectangle overlaps, the scores of the players holding
+    stones in them and the usernames generation, so it is computed from
+    memory without building the payload.
+    """
+    version = (boot_id, user_db.username_generation(), stone_db.window_version(x0, y0, x1, y1), compact)
+    return hashlib.sha1(repr(version).encode()).hexdigest()
+
+def window_headers(etag: str) -> dict:
+    """
+    Returns the caching headers of a `/region` or `/window` response.
+    """
+    return {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"public, max-age={window_max_age}",
+        "Vary": "Accept",
+    }
+
+def region_payload(x: int, y: int) -> dict:
+    """
+    Builds the `/region` response for the 13x13 region centered on (x, y).
+    """
+    return {"success": True, "stones": window_stones_payload(x - 6, y - 6, x + 6, y + 6)}
+
+def pending_poll_payload(user_id: int, since: float):
+    """
+    Builds the `/new-pending-poll` response: False if none of the player's
+    stones became pending after `since`, otherwise the oldest such stone.
+    """
+    details = stone_db.new_pending_details(user_id, since)
+    if details is None:
+        return False
+    return {
+        "hasNew": True,
+        "x": details["x"],
+        "y": details["y"],
+        "last_status_change_time": details["last_status_change_time"],
+    }
+
+def parse_board_changes_args(args) -> tuple:
+    """
+    Reads the cursor (None if absent), page size and bounding box (see
+    `parse_bbox`) of a `/board-changes` request. Raises ValueError, with a
+    message for the client, if any is invalid.
+    """
+    try:
+        limit = min(int(args.get("limit", board_changes_page_size)), board_changes_page_size)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid 'limit' parameter")
+    if limit <= 0:
+        raise ValueError("Invalid 'limit' parameter")
+
+    try:
+        cursor = None if args.get("cursor") is None else int(args.get("cursor"))
+    except ValueError:
+        raise ValueError("Invalid 'cursor' parameter")
+    return cursor, limit, parse_bbox(args)
+
+def needs_resync(cursor) -> bool:
+    """
+    Determines whether a client must refetch the board instead of catching
+    up from `cursor`: it is None, has been compacted away, or is ahead of
+    the latest event (e.g. after the database was restored from a backup).
+    """
+    return cursor is None or cursor < stone_db.compaction_horizon() or cursor > stone_db.latest_event_id()
+
+def board_changes_payload(cursor, limit: int, bbox=None) -> dict:
+    """
+    Builds the `/board-changes` response for a page of up to `limit` events
+    after `cursor` (within `bbox`, if given), or a resync response if
+    `needs_resync(cursor)`.
+    """
+    if needs_resync(cursor):
+        return {
+            "next_cursor": str(stone_db.latest_event_id()),
+            "has_more": False,
+            "resync": True,
+            "events": [],
+        }
+
+    events, next_cursor, has_more = stone_db.get_events_after(cursor, limit, bbox)
+
+    return {
+        "next_cursor": str(next_cursor),
+        "has_more": has_more,
+        "resync": False,
+        "events": events_payload(events),
+    }
+
+def stream_filter(bbox, user_id):
+    """
+    Returns a predicate selecting the events a `/board-stream` client
+    receives: those within its bounding box (if any), and those for the
+    signed-in player's own stones.
+    """
+    def visible(event: dict) -> bool:
+        return bbox is None or in_bbox(event, bbox) or (user_id is not None and event["player"] == user_id)
+    return visible
+
+def stream_catch_up(cursor, bbox) -> tuple:
+    """
+    Builds the `/board-stream` messages which bring a client from `cursor`
+    up to date: the events since it within `bbox` (or all of them, if None),
+    or a resync message if `needs_resync(cursor)`.
+    Returns (messages, id of the last event covered).
+    """
+    if needs_resync(cursor):
+        last_id = stone_db.latest_event_id()
+        return [sse_message({"next_cursor": str(last_id)}, last_id, "resync")], last_id
+
+    messages = []
+    last_id = cursor
+    has_more = True
+    while has_more:
+        events, last_id, has_more = stone_db.get_events_after(last_id, board_changes_page_size, bbox)
+        messages.append(sse_message({"events": events_payload(events)} if events else None, last_id))
+    return messages, last_id
+
+def stream_message(deltas: list, last_id: int, visible) -> tuple:
+    """
+    Builds the `/board-stream` message for a batch of published deltas,
+    skipping any the client has already been sent.
+    Returns (message or None, id of the last event covered).
+    """
+    # Skip anything already sent while catching up.
+    deltas = [delta for delta in deltas if delta["event_id"] > last_id]
+    if deltas == []:
+        return None, last_id
+    last_id = deltas[-1]["event_id"]
+    deltas = [delta for delta in deltas if visible(delta)]
+    return sse_message({"events": events_payload(deltas)} if deltas else None, last_id), last_id
+
+def is_admin(user_id) -> bool:
+    """
+    Determines whether the signed-in user (None if signed out) is one of the
+    `admins` named in the config.
+    """
+    return user_id is not None and user_db.usernames([user_id]).get(user_id) in admins
+
+def endpoint_label() -> str:
+    """
+    Names the route serving the current request, for labelling its metrics.
+    """
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def profile_response(profiler: cProfile.Profile, response: Response) -> Response:
+    """
+    Replaces `response` with a plain-text summary of the request that
+    produced it: its status, its SQL stats and the `profile_lines`
+    functions with the most cumulative time. A streamed response is
+    dropped without being started.
+    """
+    stats = metrics.current() or {}
+    out = io.StringIO()
+    out.write(f"{request.method} {request.full_path} -> {response.status}\n")
+    out.write(
+        f"{stats.get('sql_statements', 0)} SQL statement(s), "
+        f"{stats.get('sqlite_seconds', 0.0) * 1000:.2f} ms in SQLite, "
+        f"{stats.get('connections', 0)} connection(s) opened, "
+        f"{stats.get('flood_fill_nodes', 0)} flood fill node(s)\n\n"
+    )
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(profile_lines)
+    return Response(out.getvalue(), mimetype="text/plain", headers={"Cache-Control": "no-store"})
+
+def stop_profiling():
+    """
+    Stops the current request's profiler, if it has one, and returns it.
+    """
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        profile_lock.release()
+    return profiler
+
+@app.before_request
+def begin_request_metrics():
+    """
+    Starts collecting the request's metrics and, for an admin's `?profile=1`
+    request, profiling it.
+    """
+    g.metrics_token = metrics.begin_request()
+    if request.args.get("profile") == "1":
+        if not is_admin(session.get("user")):
+            return jsonify({"error": "Profiling is only available to admins"}), 403
+        if not profile_lock.acquire(blocking=False):
+            return jsonify({"error": "Another request is being profiled"}), 409
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def end_request_metrics(response: Response) -> Response:
+    """
+    Records the request's metrics, and swaps a profiled request's response
+    for its profile.
+    """
+    profiler = stop_profiling()
+    if profiler is not None:
+        response = profile_response(profiler, response)
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        metrics.end_request(endpoint_label(), response.status_code, token)
+    return response
+
+@app.teardown_request
+def abandon_request_metrics(exc):
+    """
+    Records the metrics of a request whose view raised, which skips
+    `end_request_metrics`.
+    """
+    stop_profiling()
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        metrics.end_request(endpoint_label(), 500, token)
+
 @app.route("/", methods=["GET"])
 def index():
     """
@@ -45,13 +453,7 @@ def go():
     x = int(request.args.get("x"))
     y = int(request.args.get("y"))
 
-    if move_validation.check_valid_move(session["user"], (x, y)):
-        local_stones = stone_db.retrieve_region(x, y)
-        for stone_pos, stone_row in local_stones.items():
-            move_validation.evolve_status(stone_pos, stone_row)
-        stone_db.place_stone(session["user"], x, y)
-        captures.perform_captures((x, y))
-    else:
+    if move_engine.apply(session["user"], x, y) is None:
         pass # TODO: Add error messages.
 
     # TODO: Replace with `redirect` once that works.
@@ -62,10 +464,11 @@ def go_json():
     """
     JSON variant of stone placement for the interactive viewer.
     Performs the same validation, status evolution, placement, and capture resolution,
-    returning a JSON response so the client can update without a full page reload.
+    returning a JSON response (including the resulting board deltas) so the client can
+    update without a full page reload.
 
     Note: The viewer may subsequently call `/board-changes` to retrieve an efficient
-    list of board deltas (events) since its last retrieval time and force a reload
+    list of board deltas (events) after its cursor and force a reload
     to reflect authoritative state.
     """
     try:
@@ -80,18 +483,85 @@ def go_json():
     # Capture a baseline server timestamp just before any mutation for client delta queries
     before_ts = time.time()
 
-    if move_validation.check_valid_move(session["user"], (x, y)):
-        local_stones = stone_db.retrieve_region(x, y)
-        for stone_pos, stone_row in local_stones.items():
-            move_validation.evolve_status(stone_pos, stone_row)
-        stone_db.place_stone(session["user"], x, y)
-        captures.perform_captures((x, y))
+    deltas = move_engine.apply(session["user"], x, y)
+    if deltas is not None:
         after_ts = time.time()
-        return jsonify({"success": True, "events_since": before_ts, "now": after_ts})
+        return jsonify({"success": True, "events_since": before_ts, "now": after_ts, "deltas": deltas})
     else:
         after_ts = time.time()
         return jsonify({"success": False, "error": "Invalid move", "events_since": before_ts, "now": after_ts}), 200
 
+@app.route("/group", methods=["GET"])
+def group():
+    """
+    Returns the chain containing the stone at (x, y) along with its liberties.
+    """
+    try:
+        x = int(request.args.get("x"))
+        y = int(request.args.get("y"))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid coordinates"}), 400
+
+    chain_id = groups.group_of(x, y)
+    if chain_id is None:
+        return jsonify({"success": False, "error": "No stone at location"}), 404
+
+    return jsonify({
+        "success": True,
+        "player": groups.player_of(chain_id),
+        "stones": sorted(groups.stones(chain_id)),
+        "liberties": sorted(groups.liberties(chain_id)),
+    })
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """
+    Serves the metrics collected by `metrics` in the Prometheus text format:
+    per-endpoint histograms of latency, time in SQLite and outside it, SQL
+    statements, connections opened and flood fill nodes visited, per-function
+    timings of `stone_db` and `user_db`, and running totals.
+    """
+    return Response(metrics.render(), content_type=metrics.content_type, headers={"Cache-Control": "no-store"})
+
+@app.route("/legal-moves", methods=["GET"])
+def legal_moves():
+    """
+    Returns where a player may place a stone within the inclusive rectangle
+    spanned by (x0, y0) and (x1, y1), evaluated in one pass by
+    `board_arrays.legality_map`. The player is the `player` query parameter,
+    or else the signed-in user.
+    Response JSON shape:
+      { "success": true, "x0": int, "y0": int, "x1": int, "y1": int,
+        "rows": [str, ...] }
+    with one string per y from y0 to y1, holding "1" for each x from x0 to
+    x1 where a stone may be placed and "0" elsewhere.
+    Responds with 503 if NumPy is not installed.
+    """
+    if not board_arrays.available:
+        return jsonify({"success": False, "error": "Legality maps are unavailable"}), 503
+
+    try:
+        x0, y0, x1, y1 = parse_bbox(request.args)
+        player = int(request.args["player"]) if "player" in request.args else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid parameters"}), 400
+
+    if player is None:
+        if "user" not in session:
+            return jsonify({"success": False, "error": "Not authenticated"}), 401
+        player = session["user"]
+
+    legal = board_arrays.legality_map(player, x0, y0, x1, y1)
+
+    return jsonify({
+        "success": True,
+        "x0": x0,
+        "y0": y0,
+        "x1": x1,
+        "y1": y1,
+        "rows": ["".join("1" if point else "0" for point in row) for row in legal.tolist()],
+    })
+
 @app.route("/login")
 def login():
     """
@@ -108,22 +578,15 @@ def new_pending_poll() -> Response:
     """
     user_id = int(request.args.get("player"))
     since = float(request.args.get("polling_start_time"))
-    has_new = stone_db.new_pending(user_id, since)
-    if not has_new:
-        return jsonify(False)
-    details = stone_db.new_pending_details(user_id, since)
-    return jsonify({
-        "hasNew": True,
-        "x": details["x"],
-        "y": details["y"],
-        "last_status_change_time": details["last_status_change_time"],
-    })
+    return jsonify(pending_poll_payload(user_id, since))
 
 @app.route("/region", methods=["GET"])
 def region():
     """
     Returns the 13x13 region of stones centered on (x, y) with player names and scores,
     matching the shape the viewer expects. Intended for incremental refreshes.
+    Carries an ETag (see `window_etag`), and a request whose If-None-Match
+    names it gets an empty 304 response.
     """
     try:
         x = int(request.args.get("x"))
@@ -131,23 +594,28 @@ def region():
     except (TypeError, ValueError):
         return jsonify({"success": False, "error": "Invalid coordinates"}), 400
 
-    stones = stone_db.retrieve_region(x, y)
+    return window_response(x - 6, y - 6, x + 6, y + 6, lambda: region_payload(x, y))
 
-    # Attach player names and scores
-    out = {}
-    for (sx, sy), row in stones.items():
-        player_id = row["player"]
-        name = user_db.get_user_info(player_id, "username")[0]
-        score = stone_db.player_score(player_id)
-        out[f"{sx} {sy}"] = {
-            "player_name": name,
-            "player_score": score,
-            "status": row["status"],
-            "placement_time": row["placement_time"],
-            "last_status_change_time": row["last_status_change_time"],
-        }
+@app.route("/window", methods=["GET"])
+def window():
+    """
+    Returns every stone within the inclusive rectangle spanned by (x0, y0)
+    and (x1, y1), in the same shape as `/region`. The viewer fetches the
+    window around its viewport whenever the user pans or zooms. Cached and
+    revalidated as in `/region`.
+    """
+    try:
+        x0 = int(request.args.get("x0"))
+        y0 = int(request.args.get("y0"))
+        x1 = int(request.args.get("x1"))
+        y1 = int(request.args.get("y1"))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid coordinates"}), 400
 
-    return jsonify({"success": True, "stones": out})
+    if abs(x1 - x0) >= window_max_span or abs(y1 - y0) >= window_max_span:
+        return jsonify({"success": False, "error": f"Window must span fewer than {window_max_span} points per side"}), 400
+
+    return window_response(x0, y0, x1, y1, lambda: {"success": True, "stones": window_stones_payload(x0, y0, x1, y1)})
 
 @app.route("/process-login", methods=["POST"])
 def process_login():
@@ -297,81 +765,134 @@ def viewer():
     except KeyError:
         cursor = [0, 0]
 
-    stone_dict = stone_db.retrieve()
-
-    # We need to pass the player names and score for each stone to the client as well.
-    # CODESMELL
-    player_names = {}
-    player_scores = {}
-    for coords in stone_dict:
-        # Perform caching so we don't have to access the database multiple times per player.
-        player_id = stone_dict[coords]["player"]
-        if player_id not in player_names:
-            player_names[player_id] = user_db.get_user_info(player_id, "username")[0]
-            player_scores[player_id] = stone_db.player_score(player_id)
-        stone_dict[coords]["player_name"] = player_names[player_id]
-        stone_dict[coords]["player_score"] = player_scores[player_id]
+    # Read the event cursor first, so that no change made while the page
+    # is rendered is missed.
+    board_cursor = stone_db.latest_event_id()
 
-    # Make the indices comprehensible to Javascript (it can't accept tuples for keys).
-    stones = {" ".join(map(str, stone)): stone_dict[stone] for stone in stone_dict}
+    # Only the stones around the cursor (and the player's own pending stones,
+    # for cycling through them) are embedded; the viewer fetches the rest
+    # from `/window` as the user pans.
+    stones = window_stones_payload(
+        cursor[0] - viewer_window_radius, cursor[1] - viewer_window_radius,
+        cursor[0] + viewer_window_radius, cursor[1] + viewer_window_radius,
+    )
+    if "user" in session:
+        stones.update(stones_payload(stone_db.pending_stones(session["user"])))
 
     return render_template(
         "viewer.html",
-        username=(user_db.get_user_info(session["user"], "username")[0] if "user" in session else None),
+        username=(user_db.usernames([session["user"]])[session["user"]] if "user" in session else None),
         score=f"{stone_db.player_score(session['user']):,}" if "user" in session else None,
         cursor=cursor,
         stones=stones,
+        viewer_window_radius=viewer_window_radius,
+        window_max_span=window_max_span,
+        board_cursor=str(board_cursor),
         polling_start_time=int(time.time()),
     )
 
+
 @app.route("/board-changes", methods=["GET"])
 def board_changes():
     """
-    Returns an efficient representation of all board mutations since the given timestamp.
+    Returns a page of board mutations after the given cursor.
     Query params:
-      - since (float, epoch seconds): return events strictly after this time
+      - cursor (opaque string): the `next_cursor` of the previous page, or the
+        `board_cursor` the viewer page was rendered with
+      - limit (int, optional): maximum number of events to read, at most
+        `board_changes_page_size`
+      - x0, y0, x1, y1 (int, optional): only return events within this
+        inclusive bounding box, spanning fewer than `window_max_span` points
+        per side; only the chunks it overlaps are read
+      - format (optional): "compact" for the binary encoding of `wire`, which
+        may also be requested with the Accept header
+    Runs of events for the same point within a page are compressed into the
+    point's final state.
     Response JSON shape:
       {
-        "since": <float>,
-        "now": <float>,
+        "next_cursor": <str>,
+        "has_more": <bool>,
+        "resync": <bool>,
         "events": [
-          { "event_time": float, "event_type": str, "x": int, "y": int,
+          { "event_id": int, "event_time": float, "event_type": str, "x": int, "y": int,
             "player": int|null, "placement_time": float|null,
-            "last_status_change_time": float|null, "status": str|null }
+            "last_status_change_time": float|null, "status": str|null,
+            "player_name": str|null, "player_score": int|null }
         ]
       }
+    If the cursor is missing, or older than the latest compaction (so that
+    some of the events after it no longer exist), the response has
+    "resync": true, no events, and the cursor of the latest event; the client
+    should refetch the stones it holds (e.g. from `/window`) and resume
+    from that cursor.
     """
     try:
-        since = float(request.args.get("since", "0"))
-    except (TypeError, ValueError):
-        return jsonify({"error": "Invalid 'since' parameter"}), 400
+        cursor, limit, bbox = parse_board_changes_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    events = stone_db.get_events_since(since)
-    now_ts = time.time()
-    # Enrich with player_name and player_score for efficient client updates
-    name_cache = {}
-    score_cache = {}
-    for ev in events:
-        pid = ev.get("player")
-        if pid is None:
-            ev["player_name"] = None
-            ev["player_score"] = None
-            continue
-        if pid not in name_cache:
-            try:
-                name_cache[pid] = user_db.get_user_info(pid, "username")[0]
-            except Exception:
-                name_cache[pid] = None
-        if pid not in score_cache:
-            try:
-                score_cache[pid] = stone_db.player_score(pid)
-            except Exception:
-                score_cache[pid] = None
-        ev["player_name"] = name_cache[pid]
-        ev["player_score"] = score_cache[pid]
+    return payload_response(board_changes_payload(cursor, limit, bbox))
 
-    return jsonify({
-        "since": since,
-        "now": now_ts,
-        "events": events,
+@app.route("/board-stream", methods=["GET"])
+def board_stream():
+    """
+    Streams board mutations to the client as Server-Sent Events, as they
+    are committed.
+    Query params:
+      - cursor (optional): the cursor to resume after, as for `/board-changes`;
+        the Last-Event-ID header sent by a reconnecting EventSource takes
+        precedence
+      - x0, y0, x1, y1 (int, optional): only stream events within this
+        inclusive bounding box, as for `/board-changes` (events for the
+        signed-in player's own stones are also streamed as they happen,
+        though not when catching up)
+    Each message carries an `id` (the cursor to resume after) and data of
+    the form { "events": [...] }, with events shaped as in `/board-changes`.
+    Events missed since the cursor are sent first, in pages compressed as
+    in `/board-changes`. If the cursor is missing or older than the latest
+    compaction, a "resync" event with data { "next_cursor": <str> } is sent
+    instead, and streaming continues from that cursor. A client which falls
+    too far behind is disconnected, and catches up when it reconnects.
+    """
+    try:
+        bbox = parse_bbox(request.args)
+        cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor")
+        cursor = None if cursor is None else int(cursor)
+    except (KeyError, ValueError):
+        return jsonify({"error": "Invalid parameters"}), 400
+    visible = stream_filter(bbox, session.get("user"))
+
+    def stream():
+        updates = queue.Queue(maxsize=stream_queue_size)
+        overflowed = threading.Event()
+
+        def on_deltas(deltas):
+            try:
+                updates.put_nowait(deltas)
+            except queue.Full:
+                overflowed.set()
+
+        # Subscribe before catching up, so that nothing committed in between is missed.
+        token = broadcaster.subscribe(on_deltas)
+        try:
+            yield f"retry: {stream_retry}\n\n"
+
+            messages, last_id = stream_catch_up(cursor, bbox)
+            yield from messages
+
+            while not overflowed.is_set():
+                try:
+                    deltas = updates.get(timeout=stream_heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                message, last_id = stream_message(deltas, last_id, visible)
+                if message is not None:
+                    yield message
+        finally:
+            broadcaster.unsubscribe(token)
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
     })
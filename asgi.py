@@ -0,0 +1,347 @@
+# ASGI entry point, for serving many long-lived viewer connections from one process.
+#
+# Run with any ASGI server, e.g. `uvicorn asgi:application`.
+# `/region`, `/board-changes`, `/board-stream` and `/new-pending-poll` are
+# served on the event loop, with their blocking SQLite work handed to a
+# bounded pool of threads, so an open stream costs a queue rather than a
+# thread. Every other route is passed through to the Flask app.
+
+import asyncio
+import contextvars
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from itsdangerous import BadSignature
+from werkzeug.http import parse_etags
+
+import app
+import broadcaster
+import metrics
+import wire
+
+executor_workers = 8 # Threads running blocking (SQLite and Flask) work.
+executor_backlog = 64 # Blocking jobs admitted at once; further requests wait their turn.
+
+_executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="asgi-blocking")
+_slots = None # Semaphore admitting blocking jobs, created on the event loop.
+
+async def run_blocking(fn, *args):
+    """
+    Runs `fn(*args)` on the blocking executor and returns its result,
+    waiting for a slot if `executor_backlog` jobs are already admitted.
+    """
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(executor_backlog)
+    async with _slots:
+        # Run in a copy of the caller's context, so that work done for a
+        # request is counted in its metrics.
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(_executor, context.run, fn, *args)
+
+def query_args(scope: dict) -> dict:
+    """
+    Returns the request's query parameters, keeping the first value of each.
+    """
+    return {
+        name: values[0]
+        for name, values in parse_qs(scope["query_string"].decode("latin-1")).items()
+    }
+
+def header(scope: dict, name: str):
+    """
+    Returns the value of the named request header, or None.
+    """
+    name = name.lower().encode("latin-1")
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def session_user(scope: dict):
+    """
+    Returns the signed-in user's id from the Flask session cookie, or None.
+    """
+    cookie = SimpleCookie(header(scope, "Cookie") or "")
+    morsel = cookie.get(app.app.config["SESSION_COOKIE_NAME"])
+    if morsel is None:
+        return None
+    serializer = app.app.session_interface.get_signing_serializer(app.app)
+    try:
+        data = serializer.loads(morsel.value, max_age=int(app.app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+    return data.get("user")
+
+def _encode_headers(headers: dict) -> list:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+async def send_body(send, body: bytes, content_type: str, status: int = 200, headers: dict = {}):
+    """
+    Sends `body` as a complete response, with any extra `headers`.
+    """
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())] + _encode_headers(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_json(send, payload, status: int = 200, headers: dict = {}):
+    """
+    Sends `payload` as a complete JSON response.
+    """
+    await send_body(send, json.dumps(payload).encode(), "application/json", status, headers)
+
+async def send_payload(scope, send, payload: dict, headers: dict = {}):
+    """
+    Sends a stones or events payload as in `app.payload_response`: in the
+    compact encoding of `wire` if the request asked for it, otherwise as
+    JSON.
+    """
+    headers = dict(headers, Vary="Accept")
+    if wire.requested(query_args(scope).get("format"), header(scope, "Accept")):
+        try:
+            body = wire.encode(payload)
+        except ValueError:
+            body = None
+        if body is not None:
+            await send_body(send, body, wire.media_type, headers=headers)
+            return
+    await send_json(send, payload, headers=headers)
+
+async def region(scope, receive, send):
+    """
+    Serves `/region` as in `app.region`, including its ETag revalidation.
+    """
+    args = query_args(scope)
+    try:
+        x = int(args.get("x"))
+        y = int(args.get("y"))
+    except (TypeError, ValueError):
+        await send_json(send, {"success": False, "error": "Invalid coordinates"}, 400)
+        return
+
+    compact = wire.requested(args.get("format"), header(scope, "Accept"))
+    etag = await run_blocking(app.window_etag, x - 6, y - 6, x + 6, y + 6, compact)
+    headers = app.window_headers(etag)
+    if parse_etags(header(scope, "If-None-Match")).contains(etag):
+        await send({"type": "http.response.start", "status": 304, "headers": _encode_headers(headers)})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    await send_payload(scope, send, await run_blocking(app.region_payload, x, y), headers)
+
+async def board_changes(scope, receive, send):
+    """
+    Serves `/board-changes` as in `app.board_changes`.
+    """
+    try:
+        cursor, limit, bbox = app.parse_board_changes_args(query_args(scope))
+    except ValueError as e:
+        await send_json(send, {"error": str(e)}, 400)
+        return
+    await send_payload(scope, send, await run_blocking(app.board_changes_payload, cursor, limit, bbox))
+
+async def new_pending_poll(scope, receive, send):
+    """
+    Serves `/new-pending-poll` as in `app.new_pending_poll`.
+    """
+    args = query_args(scope)
+    try:
+        user_id = int(args.get("player"))
+        since = float(args.get("polling_start_time"))
+    except (TypeError, ValueError):
+        await send_json(send, {"error": "Invalid parameters"}, 400)
+        return
+    await send_json(send, await run_blocking(app.pending_poll_payload, user_id, since))
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+async def board_stream(scope, receive, send):
+    """
+    Serves `/board-stream` as in `app.board_stream`, holding a bounded
+    asyncio queue per client in place of a thread.
+    """
+    args = query_args(scope)
+    try:
+        bbox = app.parse_bbox(args)
+        cursor = header(scope, "Last-Event-ID") or args.get("cursor")
+        cursor = None if cursor is None else int(cursor)
+    except (KeyError, ValueError):
+        await send_json(send, {"error": "Invalid parameters"}, 400)
+        return
+    visible = app.stream_filter(bbox, session_user(scope))
+
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue(maxsize=app.stream_queue_size)
+    overflowed = asyncio.Event()
+
+    def put(deltas):
+        try:
+            updates.put_nowait(deltas)
+        except asyncio.QueueFull:
+            overflowed.set()
+
+    def on_deltas(deltas):
+        # Called on the committing thread.
+        loop.call_soon_threadsafe(put, deltas)
+
+    async def send_chunk(text: str):
+        await send({"type": "http.response.body", "body": text.encode(), "more_body": True})
+
+    # Subscribe before catching up, so that nothing committed in between is missed.
+    token = broadcaster.subscribe(on_deltas)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        await send_chunk(f"retry: {app.stream_retry}\n\n")
+
+        messages, last_id = await run_blocking(app.stream_catch_up, cursor, bbox)
+        for message in messages:
+            await send_chunk(message)
+
+        while not overflowed.is_set() and not disconnected.done():
+            getter = asyncio.ensure_future(updates.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=app.stream_heartbeat, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                if not disconnected.done():
+                    await send_chunk(": keepalive\n\n")
+                continue
+            message, last_id = await run_blocking(app.stream_message, getter.result(), last_id, visible)
+            if message is not None:
+                await send_chunk(message)
+
+        if not disconnected.done():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        broadcaster.unsubscribe(token)
+        disconnected.cancel()
+
+def _wsgi_environ(scope: dict, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for key, value in scope["headers"]:
+        name = key.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        value = value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+def _call_wsgi(environ: dict):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+
+    chunks = app.app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    return response["status"], response["headers"], body
+
+async def flask_fallback(scope, receive, send):
+    """
+    Serves a request through the Flask app on the blocking executor. The
+    response is buffered, so streaming Flask routes must not be reached
+    this way.
+    """
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+
+    status, headers, body = await run_blocking(_call_wsgi, _wsgi_environ(scope, body))
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# path -> handler for routes served on the event loop.
+routes = {
+    "/region": region,
+    "/board-changes": board_changes,
+    "/board-stream": board_stream,
+    "/new-pending-poll": new_pending_poll,
+}
+
+async def metered(handler, scope, receive, send):
+    """
+    Serves a request with one of the `routes`, collecting its metrics up
+    to the start of its response, as `app` does for the routes it serves.
+    """
+    metrics.begin_request()
+
+    async def send_and_record(message):
+        if message["type"] == "http.response.start":
+            metrics.end_request(scope["path"], message["status"])
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_and_record)
+    except BaseException:
+        metrics.end_request(scope["path"], 500)
+        raise
+    metrics.end_request(scope["path"], 499) # The client left before a response was started.
+
+async def application(scope, receive, send):
+    """
+    The ASGI application.
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                _executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    handler = routes.get(scope["path"]) if scope["method"] == "GET" else None
+    if handler is None:
+        await flask_fallback(scope, receive, send)
+    else:
+        await metered(handler, scope, receive, send)
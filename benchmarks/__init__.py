@@ -0,0 +1,7 @@
+# Benchmarks for the move pipeline and the read paths around it.
+#
+# `boards` builds synthetic boards and `workloads` drives them through
+# `MoveEngine` and the Flask test client; `scripts/benchmark_moves.py` runs
+# them against a scratch database and reports the results. Both modules
+# open the database when imported, so point `storage.db_file` at a scratch
+# file (and provide a config.json) first.
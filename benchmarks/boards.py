@@ -0,0 +1,120 @@
+# Synthetic boards for benchmarking, written straight into the database.
+
+import random
+from time import time
+
+from typing import Dict, List, Tuple
+
+import stone_db
+import storage
+import user_db
+
+scenarios = ("random", "chains", "fights", "pending")
+
+# Share of stones in each status, per scenario.
+status_mixes = {
+    "random":  {"Unlocked": 0.8, "Locked": 0.15, "Pending": 0.05},
+    "chains":  {"Unlocked": 0.9, "Locked": 0.1, "Pending": 0.0},
+    "fights":  {"Unlocked": 0.85, "Locked": 0.1, "Pending": 0.05},
+    "pending": {"Unlocked": 0.5, "Locked": 0.0, "Pending": 0.5},
+}
+
+fight_block = 8 # Points per side of each two-player block in the "fights" scenario.
+pending_block = 16 # Points per side of each one-player block in the "pending" scenario.
+chain_spacing = 3 # Rows from one chain to the next in the "chains" scenario.
+
+def create_players(count: int) -> List[int]:
+    """
+    Registers `count` passwordless players named bench-1, bench-2, ...
+    in one transaction. Returns their user ids.
+    """
+    with storage.transaction() as cur:
+        first = cur.execute("SELECT COALESCE(MAX(id), 0) FROM users;").fetchone()[0] + 1
+        for i in range(count):
+            user_db.create_user(f"bench-{first + i}", None, None)
+        cur.execute("SELECT id FROM users WHERE id >= ? ORDER BY id;", [first])
+        return [row[0] for row in cur.fetchall()]
+
+def build(scenario: str, size: int, density: float, players: List[int], seed: int = 0) -> Dict[Tuple[int, int], dict]:
+    """
+    Lays out a synthetic board on the `size`-square area centered on the
+    origin, keyed by (x, y) in the shape of `stone_db.retrieve`:
+      - "random": each point holds a stone of a random player with
+        probability `density`;
+      - "chains": every `chain_spacing`-th row is one player's unbroken
+        chain across the whole area, so captures and merges touch chains
+        of `size` stones;
+      - "fights": the area is split into `fight_block`-square blocks, each
+        contested by two players filling it to `density`, so that chains
+        are small, tangled and short of liberties;
+      - "pending": the area is split into `pending_block`-square blocks,
+        each held by one player filling it to `density`, with half their
+        stones Pending (so that, as in play, only they can move there).
+    Statuses are drawn from `status_mixes`. Stones are not checked for
+    liberties, so dense boards may hold chains that could not arise in play.
+    """
+    rng = random.Random(seed)
+    statuses, weights = zip(*status_mixes[scenario].items())
+    now = time()
+    low = -(size // 2)
+    span = range(low, low + size)
+
+    def stone(player: int) -> dict:
+        status = rng.choices(statuses, weights)[0]
+        # Recent enough that no Pending stone expires during a run.
+        changed = now - rng.uniform(0, 3600)
+        return {
+            "id":                      None,
+            "player":                  player,
+            "placement_time":          changed - rng.uniform(0, 86400),
+            "last_status_change_time": changed,
+            "status":                  status,
+        }
+
+    def blocks(side: int, owners: int) -> Dict[Tuple[int, int], List[int]]:
+        # The players contesting each block, drawn as it is first reached.
+        drawn = {}
+        for x in span:
+            for y in span:
+                block = ((x - low) // side, (y - low) // side)
+                if block not in drawn:
+                    drawn[block] = rng.sample(players, owners) if len(players) >= owners else players * owners
+        return drawn
+
+    stones = {}
+    if scenario == "chains":
+        for row, y in enumerate(span[::chain_spacing]):
+            player = players[row % len(players)]
+            for x in span:
+                stones[(x, y)] = stone(player)
+    elif scenario in ("fights", "pending"):
+        side, owners = (fight_block, 2) if scenario == "fights" else (pending_block, 1)
+        contested = blocks(side, owners)
+        for x in span:
+            for y in span:
+                if rng.random() < density:
+                    stones[(x, y)] = stone(rng.choice(contested[((x - low) // side, (y - low) // side)]))
+    elif scenario == "random":
+        for x in span:
+            for y in span:
+                if rng.random() < density:
+                    stones[(x, y)] = stone(rng.choice(players))
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    return stones
+
+def load(stones: Dict[Tuple[int, int], dict]):
+    """
+    Replaces the stones table with `stones`, then reloads the in-memory
+    board and recomputes scores. No board events are logged for them.
+    """
+    with stone_db.write_lock:
+        with storage.transaction(immediate=True) as cur:
+            cur.execute("DELETE FROM stones;")
+            cur.executemany("""INSERT INTO stones (x, y, player, placement_time, last_status_change_time, status)
+                VALUES (?, ?, ?, ?, ?, ?);""", [
+                [x, y, row["player"], row["placement_time"], row["last_status_change_time"], row["status"]]
+                for (x, y), row in stones.items()
+            ])
+        stone_db.load_index()
+        stone_db.reconcile_scores()
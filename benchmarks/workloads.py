@@ -0,0 +1,198 @@
+# Timed benchmark workloads: moves and reads against the current board.
+#
+# Each workload is a sequence of calls, run one after another on the
+# calling thread by `run`, which times every call and counts the SQL statements it
+# issues on the thread's pooled connection. Flask test client requests are
+# handled on the calling thread too, so their statements are counted.
+
+import math
+import random
+import statistics
+import time
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import board_index
+import move_validation
+import storage
+
+Call = Callable[[], object]
+
+move_spread = 3 # Most points between a move and the stone it is aimed next to.
+move_attempts = 20 # Points tried per move when looking for a valid one.
+poll_limit = 100 # Events requested per `/board-changes` poll.
+poll_window = 64 # Points per side of the area each `/board-changes` poller follows.
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of an ascending list of samples.
+    """
+    if ordered == []:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def run(calls: Iterable[Call], accepted: Optional[Callable[[object], bool]] = None) -> dict:
+    """
+    Runs `calls` in order and returns their latency percentiles (ms),
+    throughput and SQL statement counts. `calls` may be a generator, in
+    which case whatever it does to produce the next call is not timed.
+    If `accepted` is given, it is applied to each call's result, and the
+    calls it approves of are counted (e.g. valid moves) and reported per
+    second.
+    """
+    statements = [0]
+    db = storage.connection()
+    db.set_trace_callback(lambda statement: statements.__setitem__(0, statements[0] + 1))
+
+    latencies = []
+    counts = []
+    approved = 0
+    try:
+        for call in calls:
+            before = statements[0]
+            call_start = time.perf_counter()
+            result = call()
+            latencies.append((time.perf_counter() - call_start) * 1000)
+            counts.append(statements[0] - before)
+            if accepted is not None and accepted(result):
+                approved += 1
+    finally:
+        db.set_trace_callback(None)
+    elapsed = sum(latencies) / 1000
+
+    latencies.sort()
+    report = {
+        "calls":                len(latencies),
+        "seconds":              round(elapsed, 4),
+        "calls_per_second":     round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "mean_ms":              round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "p50_ms":               round(percentile(latencies, 0.50), 4),
+        "p95_ms":               round(percentile(latencies, 0.95), 4),
+        "p99_ms":               round(percentile(latencies, 0.99), 4),
+        "max_ms":               round(latencies[-1], 4) if latencies else 0.0,
+        "statements":           sum(counts),
+        "statements_per_call":  round(sum(counts) / len(counts), 2) if counts else 0.0,
+        "max_statements":       max(counts, default=0),
+    }
+    if accepted is not None:
+        report["accepted"] = approved
+        report["accepted_per_second"] = round(approved / elapsed, 1) if elapsed > 0 else None
+    return report
+
+def move_targets(count: int, players: List[int], seed: int = 0) -> List[Tuple[int, int, int]]:
+    """
+    Picks `count` (player, x, y) moves for random players, each up to
+    `move_spread` points from a random stone on the current board. Many
+    will be invalid.
+    """
+    rng = random.Random(seed)
+    occupied = list(board_index.all_stones()) or [(0, 0)]
+    targets = []
+    for _ in range(count):
+        x, y = rng.choice(occupied)
+        targets.append((
+            rng.choice(players),
+            x + rng.randint(-move_spread, move_spread),
+            y + rng.randint(-move_spread, move_spread),
+        ))
+    return targets
+
+def valid_move_targets(count: int, players: List[int], seed: int = 0) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yields `count` (player, x, y) moves which are valid on the board as it
+    stands when each is yielded, as players who can see the board would
+    play. Each is looked for among `move_attempts` points near random
+    stones, offered to the players with Pending stones around them and a
+    few others; if none is found, a random (likely invalid) move is yielded.
+    """
+    rng = random.Random(seed)
+    occupied = list(board_index.all_stones()) or [(0, 0)]
+    for _ in range(count):
+        target = None
+        for _ in range(move_attempts):
+            x, y = rng.choice(occupied)
+            x += rng.randint(-move_spread, move_spread)
+            y += rng.randint(-move_spread, move_spread)
+            local_stones = board_index.region(x - 6, y - 6, x + 6, y + 6)
+            pending = {row["player"] for row in local_stones.values() if row["status"] == "Pending"}
+            candidates = sorted(pending) + rng.sample(players, min(len(players), 4))
+            target = (rng.choice(players), x, y)
+            player = next((p for p in candidates if move_validation.is_valid_move(p, (x, y), local_stones)), None)
+            if player is not None:
+                target = (player, x, y)
+                break
+        yield target
+
+def player_clients(app, players: List[int]) -> Dict[int, object]:
+    """
+    Returns a Flask test client signed in as each player, keyed by user id.
+    """
+    clients = {}
+    for player in players:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user"] = player
+        clients[player] = client
+    return clients
+
+def validation_calls(targets: List[Tuple[int, int, int]]) -> List[Call]:
+    """
+    Calls `move_validation.check_valid_move` for each target, without
+    playing it.
+    """
+    return [lambda t=t: move_validation.check_valid_move(t[0], (t[1], t[2])) for t in targets]
+
+def engine_calls(engine, targets: Iterable[Tuple[int, int, int]]) -> Iterator[Call]:
+    """
+    Plays each target through `engine.apply` directly; a call's result is
+    None if the move was invalid. Targets are consumed as the calls are
+    made, so they may come from `valid_move_targets`.
+    """
+    return (lambda t=t: engine.apply(*t) for t in targets)
+
+def go_json_calls(clients: Dict[int, object], targets: Iterable[Tuple[int, int, int]]) -> Iterator[Call]:
+    """
+    Plays each target through `/go-json`, as its player; a call's result is
+    the response's "success". Targets are consumed as in `engine_calls`.
+    """
+    def call(player: int, x: int, y: int) -> bool:
+        response = clients[player].get(f"/go-json?x={x}&y={y}")
+        return response.status_code == 200 and response.get_json()["success"]
+    return (lambda t=t: call(*t) for t in targets)
+
+def region_calls(client, targets: List[Tuple[int, int, int]]) -> List[Call]:
+    """
+    Reads `/region` around each target.
+    """
+    return [lambda t=t: client.get(f"/region?x={t[1]}&y={t[2]}").status_code == 200 for t in targets]
+
+def viewer_calls(clients: Dict[int, object], targets: List[Tuple[int, int, int]]) -> List[Call]:
+    """
+    Loads `/viewer` at each target, as its player.
+    """
+    return [lambda t=t: clients[t[0]].get(f"/viewer?x={t[1]}&y={t[2]}").status_code == 200 for t in targets]
+
+def board_changes_calls(client, cursor: int, pollers: int, count: int, seed: int = 0) -> List[Call]:
+    """
+    Simulates `pollers` viewers, each following the events after `cursor`
+    within a `poll_window`-square area around a random stone, `poll_limit`
+    events at a time. They poll in turn, `count` polls in all; a poller that
+    catches up starts over from `cursor`. A call's result is the number of
+    events it received.
+    """
+    rng = random.Random(seed)
+    occupied = list(board_index.all_stones()) or [(0, 0)]
+    half = poll_window // 2
+    windows = []
+    for _ in range(max(pollers, 1)):
+        x, y = rng.choice(occupied)
+        windows.append((x - half, y - half, x + half - 1, y + half - 1))
+    cursors = [cursor] * len(windows)
+
+    def poll(i: int) -> int:
+        x0, y0, x1, y1 = windows[i]
+        response = client.get(f"/board-changes?cursor={cursors[i]}&limit={poll_limit}&x0={x0}&y0={y0}&x1={x1}&y1={y1}")
+        page = response.get_json()
+        cursors[i] = int(page["next_cursor"]) if page["has_more"] else cursor
+        return len(page["events"])
+    return [lambda i=i: poll(i % len(windows)) for i in range(count)]
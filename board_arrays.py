@@ -0,0 +1,80 @@
+# Dense NumPy views of the board, for evaluating many points at once.
+#
+# NumPy is optional: without it `available` is False, and callers should
+# report the feature as unavailable rather than call into this module.
+
+from typing import Dict, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import stone_db
+
+available = np is not None
+
+region_radius = 6 # Points either side of a move in the region its legality depends on (13x13).
+
+# Codes used for stone statuses in dense arrays; 0 is an empty point.
+status_codes = {"Unlocked": 1, "Pending": 2, "Locked": 3}
+
+def rasterize(stones: Dict[Tuple[int, int], dict], x0: int, y0: int, x1: int, y1: int):
+    """
+    Copies the stones within the inclusive rectangle spanned by (x0, y0)
+    and (x1, y1) into dense arrays indexed [y - y0, x - x0]. Returns
+    (player, status, placement_time): player ids (0 where empty), codes
+    from `status_codes` (0 where empty) and placement times (NaN where
+    empty).
+    """
+    shape = (y1 - y0 + 1, x1 - x0 + 1)
+    player = np.zeros(shape, dtype=np.int64)
+    status = np.zeros(shape, dtype=np.uint8)
+    placement_time = np.full(shape, np.nan)
+
+    inside = [
+        (sx, sy, row) for (sx, sy), row in stones.items()
+        if x0 <= sx <= x1 and y0 <= sy <= y1
+    ]
+    if inside:
+        rows = np.array([sy - y0 for sx, sy, _ in inside])
+        cols = np.array([sx - x0 for sx, sy, _ in inside])
+        player[rows, cols] = [row["player"] for _, _, row in inside]
+        status[rows, cols] = [status_codes[row["status"]] for _, _, row in inside]
+        placement_time[rows, cols] = [row["placement_time"] for _, _, row in inside]
+    return player, status, placement_time
+
+def box_sums(counts, radius: int):
+    """
+    Sums `counts` over the (2 * radius + 1)-square box around every point
+    at least `radius` points from its edge, using a summed-area table.
+    The result is smaller than `counts` by `radius` on every side.
+    """
+    table = np.zeros((counts.shape[0] + 1, counts.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = counts.cumsum(axis=0).cumsum(axis=1)
+    size = 2 * radius + 1
+    return table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
+
+def legality_map(player: int, x0: int, y0: int, x1: int, y1: int):
+    """
+    Evaluates `move_validation.is_valid_move` for `player` at every point
+    of the inclusive rectangle spanned by (x0, y0) and (x1, y1) in one
+    pass. Returns a boolean array indexed [y - y0, x - x0].
+    """
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    r = region_radius
+
+    stones = stone_db.retrieve_window(x0 - r, y0 - r, x1 + r, y1 + r)
+    owner, status, _ = rasterize(stones, x0 - r, y0 - r, x1 + r, y1 + r)
+
+    occupied = status != 0
+    own_locked = (status == status_codes["Locked"]) & (owner == player)
+    foreign_pending = (status == status_codes["Pending"]) & (owner != player)
+
+    return (
+        ~occupied[r:-r, r:-r]
+        & (box_sums(occupied, r) > 0)
+        & (box_sums(own_locked, r) == 0)
+        & (box_sums(foreign_pending, r) == 0)
+    )
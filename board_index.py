@@ -0,0 +1,195 @@
+# In-memory chunked index of every stone on the board.
+
+import threading
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Width and height (in board points) of a single chunk.
+chunk_size = 16
+
+# (cx, cy) -> {(x, y): stone row}
+_chunks: Dict[Tuple[int, int], Dict[Tuple[int, int], dict]] = {}
+_stone_count = 0
+
+# (cx, cy) -> {player: stones held in the chunk}
+_chunk_players: Dict[Tuple[int, int], Dict[int, int]] = {}
+
+# (cx, cy) -> version, bumped on every change to the chunk. Versions are
+# drawn from one counter, so a chunk never returns to an earlier version,
+# even after being emptied or the index being reloaded.
+_versions: Dict[Tuple[int, int], int] = {}
+_last_version = 0
+
+_lock = threading.RLock()
+
+def chunk_of(x: int, y: int) -> Tuple[int, int]:
+    """
+    Returns the coordinates of the chunk containing the point (x, y).
+    """
+    return (x // chunk_size, y // chunk_size)
+
+def _touch(key: Tuple[int, int]):
+    global _last_version
+    _last_version += 1
+    _versions[key] = _last_version
+
+def _count_player(key: Tuple[int, int], player: int, change: int):
+    players = _chunk_players.setdefault(key, {})
+    players[player] = players.get(player, 0) + change
+    if players[player] == 0:
+        del players[player]
+        if not players:
+            del _chunk_players[key]
+
+def chunks_overlapping(x0: int, y0: int, x1: int, y1: int):
+    """
+    Yields the coordinates of every chunk intersecting the inclusive
+    rectangle spanned by (x0, y0) and (x1, y1).
+    """
+    cx0, cy0 = chunk_of(x0, y0)
+    cx1, cy1 = chunk_of(x1, y1)
+    for cx in range(cx0, cx1 + 1):
+        for cy in range(cy0, cy1 + 1):
+            yield (cx, cy)
+
+def clear():
+    """
+    Empties the index.
+    """
+    global _stone_count
+    with _lock:
+        for key in _chunks:
+            _touch(key)
+        _chunks.clear()
+        _chunk_players.clear()
+        _stone_count = 0
+
+def load(stones: Dict[Tuple[int, int], dict]):
+    """
+    Replaces the contents of the index with the provided stones,
+    keyed by (x, y) as returned by `stone_db.retrieve`.
+    """
+    with _lock:
+        clear()
+        for (x, y), row in stones.items():
+            put(x, y, row)
+
+def get(x: int, y: int) -> Optional[dict]:
+    """
+    Retrieves a copy of the stone at the specified location. If one
+    does not exist, returns None.
+    """
+    with _lock:
+        chunk = _chunks.get(chunk_of(x, y))
+        if chunk is None:
+            return None
+        row = chunk.get((x, y))
+        return dict(row) if row is not None else None
+
+def put(x: int, y: int, row: dict):
+    """
+    Inserts or replaces the stone at the specified location.
+    """
+    global _stone_count
+    with _lock:
+        key = chunk_of(x, y)
+        chunk = _chunks.setdefault(key, {})
+        if (x, y) not in chunk:
+            _stone_count += 1
+        else:
+            _count_player(key, chunk[(x, y)]["player"], -1)
+        chunk[(x, y)] = dict(row)
+        _count_player(key, row["player"], 1)
+        _touch(key)
+
+def update(x: int, y: int, **fields):
+    """
+    Updates fields of the stone at the specified location.
+    Does nothing if no stone exists there.
+    """
+    with _lock:
+        key = chunk_of(x, y)
+        chunk = _chunks.get(key)
+        if chunk is not None and (x, y) in chunk:
+            chunk[(x, y)].update(fields)
+            _touch(key)
+
+def discard(x: int, y: int) -> Optional[dict]:
+    """
+    Removes the stone at the specified location, returning it (or None
+    if there was no stone there).
+    """
+    global _stone_count
+    with _lock:
+        key = chunk_of(x, y)
+        chunk = _chunks.get(key)
+        if chunk is None:
+            return None
+        row = chunk.pop((x, y), None)
+        if row is not None:
+            _stone_count -= 1
+            _count_player(key, row["player"], -1)
+            _touch(key)
+        if not chunk:
+            del _chunks[key]
+        return row
+
+def region(x0: int, y0: int, x1: int, y1: int) -> Dict[Tuple[int, int], dict]:
+    """
+    Retrieves copies of all stones within the inclusive rectangle spanned
+    by (x0, y0) and (x1, y1), keyed by (x, y).
+    """
+    stones = {}
+    with _lock:
+        for key in chunks_overlapping(x0, y0, x1, y1):
+            chunk = _chunks.get(key)
+            if chunk is None:
+                continue
+            for (sx, sy), row in chunk.items():
+                if x0 <= sx <= x1 and y0 <= sy <= y1:
+                    stones[(sx, sy)] = dict(row)
+    return stones
+
+def chunk(key: Tuple[int, int]) -> Tuple[int, Dict[Tuple[int, int], dict]]:
+    """
+    Retrieves the version of a chunk together with copies of its stones,
+    keyed by (x, y), as of that version.
+    """
+    with _lock:
+        stones = {coords: dict(row) for coords, row in _chunks.get(key, {}).items()}
+        return _versions.get(key, 0), stones
+
+def chunk_versions(keys: Iterable[Tuple[int, int]]) -> List[int]:
+    """
+    Returns the current version of each of the given chunks, in order.
+    A chunk which has never held a stone is at version 0.
+    """
+    with _lock:
+        return [_versions.get(key, 0) for key in keys]
+
+def chunk_players(keys: Iterable[Tuple[int, int]]) -> Set[int]:
+    """
+    Returns the players holding any stone in the given chunks.
+    """
+    players = set()
+    with _lock:
+        for key in keys:
+            players.update(_chunk_players.get(key, ()))
+    return players
+
+def all_stones() -> Dict[Tuple[int, int], dict]:
+    """
+    Retrieves copies of every stone in the index, keyed by (x, y).
+    """
+    stones = {}
+    with _lock:
+        for chunk in _chunks.values():
+            for coords, row in chunk.items():
+                stones[coords] = dict(row)
+    return stones
+
+def stone_count() -> int:
+    """
+    Counts the stones in the index.
+    """
+    return _stone_count
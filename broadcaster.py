@@ -0,0 +1,55 @@
+# In-process publish/subscribe of committed board deltas.
+
+import threading
+
+from typing import Callable, Dict, List
+
+# subscription token -> callback
+_subscribers: Dict[int, Callable[[List[dict]], None]] = {}
+_next_token = 1
+
+_lock = threading.Lock()
+
+def subscribe(callback: Callable[[List[dict]], None]) -> int:
+    """
+    Registers `callback` to be called with each batch of deltas committed
+    to the board, in commit order. Callbacks run on the committing thread
+    while it holds `stone_db.write_lock`, so they must return quickly (e.g.
+    by handing the batch to a queue) and must not modify the deltas.
+    Returns a token for `unsubscribe`.
+    """
+    global _next_token
+    with _lock:
+        token = _next_token
+        _next_token += 1
+        _subscribers[token] = callback
+    return token
+
+def unsubscribe(token: int):
+    """
+    Removes a subscription. Does nothing if it has already been removed.
+    """
+    with _lock:
+        _subscribers.pop(token, None)
+
+def publish(deltas: List[dict]):
+    """
+    Hands a batch of committed deltas, in the shape documented by
+    `stone_db.write_deltas`, to every subscriber. A subscriber whose
+    callback raises is dropped, since the deltas have already been
+    committed and the publisher cannot act on the error.
+    """
+    with _lock:
+        subscribers = list(_subscribers.items())
+    for token, callback in subscribers:
+        try:
+            callback(deltas)
+        except Exception:
+            unsubscribe(token)
+
+def subscriber_count() -> int:
+    """
+    Returns the number of current subscriptions.
+    """
+    with _lock:
+        return len(_subscribers)
@@ -0,0 +1,203 @@
+# Incremental tracking of chains (connected same-player groups of stones) and their liberties.
+
+import threading
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import metrics
+
+# (x, y) -> chain id
+_chain_of: Dict[Tuple[int, int], int] = {}
+# chain id -> { "player": int, "stones": set, "liberties": set }
+_chains: Dict[int, dict] = {}
+_next_chain_id = 1
+
+_lock = threading.RLock()
+
+def neighbours(x: int, y: int) -> List[Tuple[int, int]]:
+    """
+    Returns the four points orthogonally adjacent to (x, y).
+    """
+    return [
+        (x - 1, y), # North
+        (x, y + 1), # East
+        (x + 1, y), # South
+        (x, y - 1), # West
+    ]
+
+def _new_chain(player: int, stones: Set[Tuple[int, int]], liberties: Set[Tuple[int, int]]) -> int:
+    global _next_chain_id
+    chain_id = _next_chain_id
+    _next_chain_id += 1
+    _chains[chain_id] = {"player": player, "stones": stones, "liberties": liberties}
+    for point in stones:
+        _chain_of[point] = chain_id
+    return chain_id
+
+def _flood(origin: Tuple[int, int], player: int, occupied: Dict[Tuple[int, int], int]) -> Tuple[Set[Tuple[int, int]], Set[Tuple[int, int]]]:
+    """
+    Collects the stones and liberties of the chain containing `origin`,
+    where `occupied` maps every occupied point to its player.
+    """
+    stones = {origin}
+    liberties = set()
+    unchecked = [origin]
+    while unchecked:
+        for adjacent in neighbours(*unchecked.pop()):
+            if adjacent in stones:
+                continue
+            owner = occupied.get(adjacent)
+            if owner is None: # A liberty has been found!
+                liberties.add(adjacent)
+            elif owner == player: # The stone belongs to the chain.
+                stones.add(adjacent)
+                unchecked.append(adjacent)
+    metrics.record_flood_fill(len(stones))
+    return stones, liberties
+
+def clear():
+    """
+    Forgets every chain.
+    """
+    with _lock:
+        _chain_of.clear()
+        _chains.clear()
+
+def chains_from(stones: Dict[Tuple[int, int], dict]) -> Set[Tuple[int, FrozenSet[Tuple[int, int]], FrozenSet[Tuple[int, int]]]]:
+    """
+    Computes every chain from scratch from the provided stones, keyed by
+    (x, y) as returned by `stone_db.retrieve`, in the same form as `snapshot`.
+    """
+    occupied = {coords: row["player"] for coords, row in stones.items()}
+    chains = set()
+    visited = set()
+    for coords, player in occupied.items():
+        if coords in visited:
+            continue
+        chain_stones, chain_liberties = _flood(coords, player, occupied)
+        visited |= chain_stones
+        chains.add((player, frozenset(chain_stones), frozenset(chain_liberties)))
+    return chains
+
+def rebuild(stones: Dict[Tuple[int, int], dict]):
+    """
+    Replaces every tracked chain with chains computed from scratch from the
+    provided stones.
+    """
+    with _lock:
+        clear()
+        for player, chain_stones, chain_liberties in chains_from(stones):
+            _new_chain(player, set(chain_stones), set(chain_liberties))
+
+def add_stone(x: int, y: int, player: int) -> int:
+    """
+    Records a stone placed at (x, y), merging it with any adjacent chains
+    belonging to the same player. Returns the id of the resulting chain.
+    """
+    with _lock:
+        stones = {(x, y)}
+        liberties = set()
+        seen = set()
+        for adjacent in neighbours(x, y):
+            adjacent_chain_id = _chain_of.get(adjacent)
+            if adjacent_chain_id is None:
+                liberties.add(adjacent)
+                continue
+            if adjacent_chain_id in seen:
+                continue
+            seen.add(adjacent_chain_id)
+            adjacent_chain = _chains[adjacent_chain_id]
+            adjacent_chain["liberties"].discard((x, y))
+            if adjacent_chain["player"] == player:
+                # Merge the adjacent chain into the new one.
+                stones |= adjacent_chain["stones"]
+                liberties |= adjacent_chain["liberties"]
+                del _chains[adjacent_chain_id]
+        liberties.discard((x, y))
+        return _new_chain(player, stones, liberties)
+
+def remove_stones(points: Iterable[Tuple[int, int]]):
+    """
+    Records the removal of the stones at the specified points. Chains
+    which lose all of their stones are dropped; chains which lose only some
+    are split into their remaining connected pieces. Neighbouring chains
+    regain the vacated points as liberties.
+    """
+    with _lock:
+        removed = [point for point in points if point in _chain_of]
+        affected = set()
+        for point in removed:
+            chain_id = _chain_of.pop(point)
+            _chains[chain_id]["stones"].discard(point)
+            affected.add(chain_id)
+
+        for chain_id in affected:
+            chain = _chains.pop(chain_id)
+            remaining = chain["stones"]
+            if not remaining:
+                continue
+            # Re-split whatever is left of a partially removed chain.
+            occupied = {point: chain["player"] for point in remaining}
+            for point in remaining:
+                if _chain_of.get(point) == chain_id:
+                    piece, _ = _flood(point, chain["player"], occupied)
+                    liberties = {
+                        adjacent
+                        for stone in piece
+                        for adjacent in neighbours(*stone)
+                        if adjacent not in _chain_of
+                    }
+                    _new_chain(chain["player"], piece, liberties)
+
+        for point in removed:
+            for adjacent in neighbours(*point):
+                adjacent_chain_id = _chain_of.get(adjacent)
+                if adjacent_chain_id is not None:
+                    _chains[adjacent_chain_id]["liberties"].add(point)
+
+def group_of(x: int, y: int) -> Optional[int]:
+    """
+    Returns the id of the chain containing the stone at (x, y), or None if
+    the point is empty. Chain ids are only stable until the chain is next
+    merged, split or removed.
+    """
+    return _chain_of.get((x, y))
+
+def player_of(chain_id: int) -> int:
+    """
+    Returns the player owning the specified chain.
+    """
+    with _lock:
+        return _chains[chain_id]["player"]
+
+def stones(chain_id: int) -> FrozenSet[Tuple[int, int]]:
+    """
+    Returns the points occupied by the specified chain.
+    """
+    with _lock:
+        return frozenset(_chains[chain_id]["stones"])
+
+def liberties(chain_id: int) -> FrozenSet[Tuple[int, int]]:
+    """
+    Returns the liberties of the specified chain.
+    """
+    with _lock:
+        return frozenset(_chains[chain_id]["liberties"])
+
+def liberty_count(chain_id: int) -> int:
+    """
+    Counts the liberties of the specified chain.
+    """
+    with _lock:
+        return len(_chains[chain_id]["liberties"])
+
+def snapshot() -> Set[Tuple[int, FrozenSet[Tuple[int, int]], FrozenSet[Tuple[int, int]]]]:
+    """
+    Returns every chain as a (player, stones, liberties) triple, independent
+    of chain ids, so that two sets of chains can be compared.
+    """
+    with _lock:
+        return {
+            (chain["player"], frozenset(chain["stones"]), frozenset(chain["liberties"]))
+            for chain in _chains.values()
+        }
@@ -0,0 +1,234 @@
+# Lightweight hot-path instrumentation, exposed in the Prometheus text format.
+#
+# Each request gets a stats dict (see `begin_request`) held in a context
+# variable, which `storage`, `groups` and instrumented functions add to as
+# the request runs; `end_request` folds it into the histograms. Work done
+# outside a request (the expiry sweeper, startup) only reaches the totals.
+
+import functools
+import inspect
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import region_cache
+
+content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+latency_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0) # Seconds.
+call_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1.0) # Seconds.
+statement_buckets = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+connection_buckets = (0, 1, 2, 5)
+node_buckets = (0, 16, 64, 256, 1024, 4096, 16384, 65536)
+
+# name -> (help, buckets)
+_histogram_specs = {
+    "infinite_go_request_seconds":            ("Time spent serving each request.", latency_buckets),
+    "infinite_go_request_sqlite_seconds":     ("Time each request spent in SQLite calls.", latency_buckets),
+    "infinite_go_request_python_seconds":     ("Time each request spent outside SQLite calls.", latency_buckets),
+    "infinite_go_request_sql_statements":     ("SQL statements executed per request.", statement_buckets),
+    "infinite_go_request_connections_opened": ("SQLite connections opened per request.", connection_buckets),
+    "infinite_go_request_flood_fill_nodes":   ("Points examined by capture checks and chain flood fills per request.", node_buckets),
+    "infinite_go_call_seconds":               ("Time spent in each instrumented stone_db and user_db function.", call_buckets),
+}
+
+# name -> help
+_counter_specs = {
+    "infinite_go_requests_total":           "Requests served, by endpoint and status.",
+    "infinite_go_sql_statements_total":     "SQL statements executed, in and out of requests.",
+    "infinite_go_sqlite_seconds_total":     "Time spent in SQLite calls, in and out of requests.",
+    "infinite_go_connections_opened_total": "SQLite connections opened, in and out of requests.",
+    "infinite_go_flood_fill_nodes_total":   "Points examined by capture checks and chain flood fills, in and out of requests.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# (name, labels) -> [per-bucket counts (the last for +Inf), sum, count]
+_histograms: Dict[Tuple[str, Labels], list] = {}
+# (name, labels) -> value
+_counters: Dict[Tuple[str, Labels], float] = {}
+
+_lock = threading.Lock()
+
+_request: ContextVar[Optional[dict]] = ContextVar("metrics_request", default=None)
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def observe(name: str, value: float, **labels):
+    """
+    Records `value` in the histogram `name` (one of `_histogram_specs`).
+    """
+    buckets = _histogram_specs[name][1]
+    index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+def increment(name: str, amount: float = 1, **labels):
+    """
+    Adds `amount` to the counter `name` (one of `_counter_specs`).
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def begin_request():
+    """
+    Starts collecting stats for a request in the current context.
+    Returns a token for `end_request`.
+    """
+    return _request.set({
+        "start":            perf_counter(),
+        "sql_statements":   0,
+        "sqlite_seconds":   0.0,
+        "connections":      0,
+        "flood_fill_nodes": 0,
+    })
+
+def current() -> Optional[dict]:
+    """
+    Returns the stats collected so far for the current request, or None
+    outside a request.
+    """
+    return _request.get()
+
+def end_request(endpoint: str, status: int, token=None) -> Optional[dict]:
+    """
+    Stops collecting stats for the current request and records them under
+    `endpoint`. Returns them, with "seconds" and "python_seconds" filled
+    in, or None if no request was being collected.
+    """
+    stats = _request.get()
+    if stats is None:
+        return None
+    try:
+        _request.reset(token)
+    except (TypeError, ValueError): # No token, or one from another context.
+        _request.set(None)
+
+    stats["seconds"] = perf_counter() - stats["start"]
+    stats["python_seconds"] = max(stats["seconds"] - stats["sqlite_seconds"], 0.0)
+    observe("infinite_go_request_seconds", stats["seconds"], endpoint=endpoint)
+    observe("infinite_go_request_sqlite_seconds", stats["sqlite_seconds"], endpoint=endpoint)
+    observe("infinite_go_request_python_seconds", stats["python_seconds"], endpoint=endpoint)
+    observe("infinite_go_request_sql_statements", stats["sql_statements"], endpoint=endpoint)
+    observe("infinite_go_request_connections_opened", stats["connections"], endpoint=endpoint)
+    observe("infinite_go_request_flood_fill_nodes", stats["flood_fill_nodes"], endpoint=endpoint)
+    increment("infinite_go_requests_total", endpoint=endpoint, status=status)
+    return stats
+
+def record_sql(seconds: float, statements: int = 0):
+    """
+    Records time spent in a SQLite call, which executed `statements` statements.
+    """
+    stats = _request.get()
+    if stats is not None:
+        stats["sqlite_seconds"] += seconds
+        stats["sql_statements"] += statements
+    with _lock:
+        key = ("infinite_go_sqlite_seconds_total", ())
+        _counters[key] = _counters.get(key, 0) + seconds
+        if statements:
+            key = ("infinite_go_sql_statements_total", ())
+            _counters[key] = _counters.get(key, 0) + statements
+
+def record_connection():
+    """
+    Records the opening of a SQLite connection.
+    """
+    stats = _request.get()
+    if stats is not None:
+        stats["connections"] += 1
+    increment("infinite_go_connections_opened_total")
+
+def record_flood_fill(nodes: int):
+    """
+    Records a capture check or chain flood fill which examined `nodes` points.
+    """
+    stats = _request.get()
+    if stats is not None:
+        stats["flood_fill_nodes"] += nodes
+    increment("infinite_go_flood_fill_nodes_total", nodes)
+
+def instrument(module, names: Optional[Iterable[str]] = None):
+    """
+    Replaces the public functions defined in `module` (or just those in
+    `names`) with wrappers recording each call's duration in
+    `infinite_go_call_seconds`, labelled "module.function". Calls between
+    the module's own functions go through the wrappers too.
+    """
+    if names is None:
+        names = [
+            name for name, value in vars(module).items()
+            if inspect.isfunction(value) and value.__module__ == module.__name__ and not name.startswith("_")
+        ]
+    for name in names:
+        function = getattr(module, name)
+        if getattr(function, "__wrapped__", None) is not None:
+            continue # Already instrumented.
+        setattr(module, name, _timed(function, f"{module.__name__}.{name}"))
+
+def _timed(function, label: str):
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe("infinite_go_call_seconds", perf_counter() - start, function=label)
+    return timed
+
+def _format_labels(labels: Labels) -> str:
+    if labels == ():
+        return ""
+    escaped = [(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def render() -> str:
+    """
+    Returns every histogram and counter, and the region cache's stats, in
+    the Prometheus text exposition format.
+    """
+    with _lock:
+        histograms = {key: [list(value[0]), value[1], value[2]] for key, value in _histograms.items()}
+        counters = dict(_counters)
+
+    lines: List[str] = []
+    for name, (help_text, buckets) in _histogram_specs.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (key_name, labels), (counts, total, count) in sorted(histograms.items()):
+            if key_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    for name, help_text in _counter_specs.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (key_name, labels), value in sorted(counters.items()):
+            if key_name == name:
+                lines.append(f"{name}{_format_labels(labels)} {value!r}")
+
+    cache = region_cache.stats()
+    lines.append("# HELP infinite_go_region_cache_entries Chunk payloads held by the region cache.")
+    lines.append("# TYPE infinite_go_region_cache_entries gauge")
+    lines.append(f"infinite_go_region_cache_entries {cache['size']}")
+    for stat in ("hits", "misses", "evictions", "invalidations"):
+        lines.append(f"# HELP infinite_go_region_cache_{stat}_total Region cache {stat}.")
+        lines.append(f"# TYPE infinite_go_region_cache_{stat}_total counter")
+        lines.append(f"infinite_go_region_cache_{stat}_total {cache[stat]}")
+    return "\n".join(lines) + "\n"
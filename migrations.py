@@ -0,0 +1,237 @@
+# Versioned schema migrations, applied in order at startup.
+
+import sqlite3
+from time import time
+
+from typing import Callable, List, Tuple
+
+import board_index
+import storage
+
+def _table_exists(cur: sqlite3.Cursor, name: str) -> bool:
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' and name=?;", [name])
+    return cur.fetchone() is not None
+
+def _create_users(cur: sqlite3.Cursor):
+    """
+    Creates the users table, if it does not exist, and inserts the SAI user.
+    """
+    if _table_exists(cur, "users"):
+        return
+
+    cur.execute("""CREATE TABLE users (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        username        TEXT NOT NULL,
+        email           TEXT,
+        registered_time REAL NOT NULL,
+        last_login_time REAL NOT NULL,
+        password_hash   TEXT
+    );""")
+
+    registered_time = time()
+    cur.execute("""INSERT INTO users (
+        username,
+        email,
+        registered_time,
+        last_login_time,
+        password_hash
+    ) VALUES ('SAI', NULL, ?, ?, '');""", # SAI has no password.
+    [registered_time, registered_time])
+
+def _create_board(cur: sqlite3.Cursor):
+    """
+    Creates the board_events and stones tables, if they do not exist, and
+    places SAI's first (unlocked) stone.
+    """
+    if not _table_exists(cur, "board_events"):
+        cur.execute("""CREATE TABLE board_events (
+            id                      INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_time              REAL NOT NULL,
+            event_type              TEXT NOT NULL,
+            x                       INTEGER NOT NULL,
+            y                       INTEGER NOT NULL,
+            player                  INTEGER,
+            placement_time          REAL,
+            last_status_change_time REAL,
+            status                  TEXT
+        );""")
+
+    if _table_exists(cur, "stones"):
+        return
+
+    cur.execute("""CREATE TABLE stones (
+        id                      INTEGER PRIMARY KEY AUTOINCREMENT,
+        x                       INTEGER NOT NULL,
+        y                       INTEGER NOT NULL,
+        player                  INTEGER NOT NULL,
+        placement_time          REAL NOT NULL,
+        last_status_change_time REAL NOT NULL,
+        status                  TEXT NOT NULL
+    );""")
+
+    seed_time = time()
+    cur.execute("""INSERT INTO stones (
+        x, y, player, placement_time, last_status_change_time, status
+    ) VALUES (0, 0, 1, ?, ?, 'Unlocked');""",
+    [seed_time, seed_time])
+    cur.executemany("""INSERT INTO board_events (
+        event_time, event_type, x, y, player, placement_time, last_status_change_time, status
+    ) VALUES (?, ?, 0, 0, 1, ?, ?, ?);""",
+    [
+        [seed_time, "place", seed_time, seed_time, "Locked"],
+        [seed_time, "status", seed_time, seed_time, "Unlocked"],
+    ])
+
+def _index_stones_and_events(cur: sqlite3.Cursor):
+    """
+    Indexes the hot lookups on stones and board_events. The unique (x, y)
+    index also enforces that no two stones occupy the same point; any
+    duplicates left over from before it existed are dropped, keeping the
+    oldest stone at each point. Each such point gets a "remove" event, then
+    a "place" event restating the stone kept there, so that replaying the
+    event log still reproduces the stones table. (board_events(id) is the
+    table's rowid, so it needs no separate index.)
+    """
+    # The log's last "place" at each such point is the newest stone there,
+    # which is what the "remove" takes away.
+    cur.execute("""SELECT kept.x, kept.y,
+            newest.player, newest.placement_time, newest.last_status_change_time, newest.status,
+            kept.player, kept.placement_time, kept.last_status_change_time, kept.status
+        FROM (SELECT MIN(id) AS kept_id, MAX(id) AS newest_id FROM stones GROUP BY x, y HAVING COUNT(id) > 1) AS duplicates
+        JOIN stones AS kept ON kept.id = duplicates.kept_id
+        JOIN stones AS newest ON newest.id = duplicates.newest_id
+        ORDER BY kept.id;""")
+    duplicates = cur.fetchall()
+    if duplicates != []:
+        event_time = time()
+        events = []
+        for x, y, *stones in duplicates:
+            events.append([event_time, "remove", x, y, *stones[:4]])
+            events.append([event_time, "place", x, y, *stones[4:]])
+        cur.executemany("""INSERT INTO board_events (
+            event_time, event_type, x, y, player, placement_time, last_status_change_time, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?);""", events)
+
+    cur.execute("""DELETE FROM stones WHERE id NOT IN (
+        SELECT MIN(id) FROM stones GROUP BY x, y
+    );""")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS stones_xy ON stones (x, y);")
+    cur.execute("CREATE INDEX IF NOT EXISTS stones_player_status ON stones (player, status, last_status_change_time);")
+    cur.execute("CREATE INDEX IF NOT EXISTS board_events_event_time ON board_events (event_time);")
+
+def _create_player_stats(cur: sqlite3.Cursor):
+    """
+    Creates the player_stats table of per-player stone counts, backfilled
+    from the stones table.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS player_stats (
+        player      INTEGER PRIMARY KEY,
+        stone_count INTEGER NOT NULL
+    );""")
+    cur.execute("DELETE FROM player_stats;")
+    cur.execute("""INSERT INTO player_stats (player, stone_count)
+        SELECT player, COUNT(id) FROM stones GROUP BY player;""")
+
+def _create_snapshots(cur: sqlite3.Cursor):
+    """
+    Creates the snapshots and snapshot_stones tables, which hold the board
+    as it stood after a given board event, and records the current board
+    as the first snapshot so that compaction always has a base to fold
+    older events into.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS snapshots (
+        event_id     INTEGER PRIMARY KEY,
+        created_time REAL NOT NULL
+    );""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS snapshot_stones (
+        snapshot_id             INTEGER NOT NULL,
+        x                       INTEGER NOT NULL,
+        y                       INTEGER NOT NULL,
+        player                  INTEGER NOT NULL,
+        placement_time          REAL NOT NULL,
+        last_status_change_time REAL NOT NULL,
+        status                  TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, x, y)
+    ) WITHOUT ROWID;""")
+
+    cur.execute("SELECT MAX(id) FROM board_events;")
+    event_id = cur.fetchone()[0] or 0
+    cur.execute("INSERT OR IGNORE INTO snapshots (event_id, created_time) VALUES (?, ?);", [event_id, time()])
+    cur.execute("""INSERT OR IGNORE INTO snapshot_stones (
+        snapshot_id, x, y, player, placement_time, last_status_change_time, status
+    ) SELECT ?, x, y, player, placement_time, last_status_change_time, status FROM stones;""",
+    [event_id])
+
+def _bucket_events(cur: sqlite3.Cursor):
+    """
+    Adds the board_index chunk coordinates of each event's point to
+    board_events, with an index, so that events can be fetched for a
+    region of the board without reading the rest.
+    """
+    cur.execute("ALTER TABLE board_events ADD COLUMN chunk_x INTEGER;")
+    cur.execute("ALTER TABLE board_events ADD COLUMN chunk_y INTEGER;")
+    # Floor division, which SQLite's integer division (truncating) is not for negative points.
+    cur.execute("""UPDATE board_events SET
+        chunk_x = CASE WHEN x >= 0 THEN x / :size ELSE -((-x - 1) / :size) - 1 END,
+        chunk_y = CASE WHEN y >= 0 THEN y / :size ELSE -((-y - 1) / :size) - 1 END;""",
+    {"size": board_index.chunk_size})
+    cur.execute("CREATE INDEX IF NOT EXISTS board_events_chunk ON board_events (chunk_x, chunk_y, id);")
+
+def _time_snapshots(cur: sqlite3.Cursor):
+    """
+    Records in each snapshot the time of the last board event folded into
+    it, so that history can be replayed from the latest snapshot before a
+    given time. Where that event has already been compacted away, the time
+    the snapshot was taken stands in for it, which is never earlier.
+    """
+    cur.execute("ALTER TABLE snapshots ADD COLUMN event_time REAL;")
+    cur.execute("""UPDATE snapshots SET event_time = COALESCE(
+        (SELECT event_time FROM board_events WHERE board_events.id = snapshots.event_id),
+        created_time
+    );""")
+
+# (version, description, step), in the order they must be applied.
+# Never edit or reorder a released step; append a new one instead.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "Create users table", _create_users),
+    (2, "Create stones and board_events tables", _create_board),
+    (3, "Index stones and board_events", _index_stones_and_events),
+    (4, "Create player_stats table", _create_player_stats),
+    (5, "Create snapshots tables", _create_snapshots),
+    (6, "Bucket board_events by chunk", _bucket_events),
+    (7, "Record snapshot event times", _time_snapshots),
+]
+
+def schema_version() -> int:
+    """
+    Returns the version of the most recently applied migration (0 if none).
+    """
+    cur = storage.cursor()
+    if not _table_exists(cur, "schema_version"):
+        return 0
+    cur.execute("SELECT MAX(version) FROM schema_version;")
+    return cur.fetchone()[0] or 0
+
+def migrate() -> List[int]:
+    """
+    Applies every pending migration in order, in one transaction.
+    Returns the versions that were applied.
+    """
+    applied = []
+    with storage.transaction(immediate=True) as cur:
+        cur.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+            version      INTEGER PRIMARY KEY,
+            description  TEXT NOT NULL,
+            applied_time REAL NOT NULL
+        );""")
+        cur.execute("SELECT MAX(version) FROM schema_version;")
+        current = cur.fetchone()[0] or 0
+
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(cur)
+            cur.execute("INSERT INTO schema_version (version, description, applied_time) VALUES (?, ?, ?);",
+            [version, description, time()])
+            applied.append(version)
+    return applied
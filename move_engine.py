@@ -0,0 +1,73 @@
+# Atomic move pipeline: validation, status evolution, placement and capture resolution.
+
+from time import time
+
+from typing import List, Optional
+
+import board_index
+import captures
+import move_validation
+import stone_db
+import storage
+
+class MoveEngine:
+    """
+    Applies moves to the board. Each move is computed against the in-memory
+    board index and chains, then written (stones and board_events alike)
+    in a single `BEGIN IMMEDIATE` transaction on the thread's pooled
+    connection, and only then reflected in memory. Board changes are
+    serialized within the process by `stone_db.write_lock`, and the
+    immediate transaction serializes them against any other writer of the
+    database.
+    """
+    def apply(self, player: int, x: int, y: int) -> Optional[List[dict]]:
+        """
+        Plays a stone for `player` at (x, y).
+        Returns None if the move is invalid. Otherwise, returns the resulting
+        board deltas in the order they were applied (status changes, the
+        placement, then any removals), in the shape documented by
+        `stone_db.write_deltas`.
+        """
+        stone_db.unlock_stale_pending()
+
+        with stone_db.write_lock:
+            local_stones = board_index.region(x - 6, y - 6, x + 6, y + 6)
+            if not move_validation.is_valid_move(player, (x, y), local_stones):
+                return None
+
+            move_time = time()
+            deltas = []
+
+            # Evolve the statuses of stones in the local region.
+            for (sx, sy), status in move_validation.region_status_changes(local_stones, player).items():
+                row = local_stones[(sx, sy)]
+                row["status"] = status
+                row["last_status_change_time"] = move_time
+                deltas.append(stone_db.make_delta("status", move_time, sx, sy, row))
+
+            # Place the stone.
+            placed = {
+                "id":                      None,
+                "player":                  player,
+                "placement_time":          move_time,
+                "last_status_change_time": move_time,
+                "status":                  "Locked",
+            }
+            deltas.append(stone_db.make_delta("place", move_time, x, y, placed))
+
+            # Resolve captures (including suicide).
+            for rx, ry in captures.find_captures(player, (x, y)):
+                if (rx, ry) == (x, y):
+                    row = placed
+                elif (rx, ry) in local_stones:
+                    row = local_stones[(rx, ry)]
+                else:
+                    row = board_index.get(rx, ry)
+                deltas.append(stone_db.make_delta("remove", move_time, rx, ry, row))
+
+            with storage.transaction(immediate=True) as cur:
+                stone_db.write_deltas(cur, deltas)
+
+            stone_db.apply_deltas(deltas)
+
+        return deltas
@@ -1,13 +1,19 @@
-from typing import Tuple
+from typing import Dict, Tuple
 
+import board_index
 import stone_db
 
 def check_valid_move(player: int, cursor: Tuple[int, int]) -> bool:
     """
     Returns True if valid, False otherwise.
     """
-    local_stones = stone_db.retrieve_region(*cursor)
+    return is_valid_move(player, cursor, stone_db.retrieve_region(*cursor))
 
+def is_valid_move(player: int, cursor: Tuple[int, int], local_stones: Dict[Tuple[int, int], dict]) -> bool:
+    """
+    Same as `check_valid_move`, but checks against an already retrieved
+    13x13 region centered at `cursor`.
+    """
     # Since local_stones is a dict, this is O(1).
     if cursor in local_stones:
         # The position is already occupied by a stone.
@@ -28,27 +34,47 @@ def check_valid_move(player: int, cursor: Tuple[int, int]) -> bool:
     return True
 
 
-def evolve_status(stone_pos: Tuple[int, int], stone_row: dict) -> None:
+def evolve_region_statuses(center: Tuple[int, int], player: int) -> Dict[Tuple[int, int], str]:
     """
-    Performs any necessary updates on the status of a stone
-    which has been played nearby.
-    
-    Note that this does not check if a stone at the supplied
-    location exists.
-    
-    As this feature concerns itself with stone locking status,
-    it is considered to be related to move validation.
+    Performs the status updates caused by `player` playing at `center` on
+    every stone in the surrounding 13x13 region at once, without placing a
+    stone, writing them with a single batched update. The region is read
+    and written under `stone_db.write_lock`, so no move can change it in
+    between. Returns the new statuses keyed by (x, y).
+    (`MoveEngine` makes the same changes within each move's transaction.)
     """
-    if not stone_row:
-        return
+    x, y = center
+    stone_db.unlock_stale_pending()
+
+    with stone_db.write_lock:
+        statuses = region_status_changes(board_index.region(x - 6, y - 6, x + 6, y + 6), player)
+        stone_db.update_statuses(statuses)
+    return statuses
 
-    current_status = stone_row.get("status")
-    next_status = {
+def region_status_changes(local_stones: Dict[Tuple[int, int], dict], player: int) -> Dict[Tuple[int, int], str]:
+    """
+    Computes the status transitions caused by `player` playing in the
+    13x13 region holding `local_stones`, keyed by (x, y). Only stones whose
+    status actually changes are included: every Locked stone becomes
+    Pending, and the player's own Pending stones become Unlocked.
+    (A valid move never has another player's Pending stones in its region.)
+    """
+    statuses = {}
+    for stone_pos, stone_row in local_stones.items():
+        current_status = stone_row["status"]
+        if current_status == "Pending" and stone_row["player"] != player:
+            continue
+        evolved_status = next_status(current_status)
+        if evolved_status != current_status:
+            statuses[stone_pos] = evolved_status
+    return statuses
+
+def next_status(current_status: str) -> str:
+    """
+    Returns the status a stone takes on when a stone is played nearby.
+    """
+    return {
         "Locked": "Pending",
         "Pending": "Unlocked",
         "Unlocked": "Unlocked",
     }[current_status]
-
-    # Only write and log an event if the status actually changes
-    if next_status != current_status:
-        stone_db.update_status(stone_row["id"], next_status)
@@ -0,0 +1,92 @@
+# In-memory index of each player's Pending stones, ordered by when they became Pending.
+
+import bisect
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+# player -> [(pending since, x, y)], sorted
+_by_player: Dict[int, List[Tuple[float, int, int]]] = {}
+# (x, y) -> (player, pending since)
+_entry_of: Dict[Tuple[int, int], Tuple[int, float]] = {}
+
+_lock = threading.RLock()
+
+def clear():
+    """
+    Removes every entry from the index.
+    """
+    with _lock:
+        _by_player.clear()
+        _entry_of.clear()
+
+def load(stones: Dict[Tuple[int, int], dict]):
+    """
+    Replaces the contents of the index with the Pending stones among
+    `stones`, keyed by (x, y) with rows as stored in the stones table.
+    """
+    with _lock:
+        clear()
+        for (x, y), row in stones.items():
+            if row["status"] == "Pending":
+                set_pending(x, y, row["player"], row["last_status_change_time"])
+
+def set_pending(x: int, y: int, player: int, since: float):
+    """
+    Records the stone at (x, y) as `player`'s, Pending since `since`,
+    replacing any previous entry for the point.
+    """
+    with _lock:
+        discard(x, y)
+        bisect.insort(_by_player.setdefault(player, []), (since, x, y))
+        _entry_of[(x, y)] = (player, since)
+
+def discard(x: int, y: int):
+    """
+    Removes any entry for the stone at (x, y).
+    """
+    with _lock:
+        entry = _entry_of.pop((x, y), None)
+        if entry is None:
+            return
+        player, since = entry
+        pending = _by_player[player]
+        del pending[bisect.bisect_left(pending, (since, x, y))]
+        if pending == []:
+            del _by_player[player]
+
+def pending_since(x: int, y: int, player: int) -> Optional[float]:
+    """
+    Returns when the stone at (x, y) became Pending, or None if it is not
+    a Pending stone of `player`'s.
+    """
+    with _lock:
+        entry = _entry_of.get((x, y))
+    if entry is None or entry[0] != player:
+        return None
+    return entry[1]
+
+def oldest_after(player: int, since: float) -> Optional[Tuple[float, int, int]]:
+    """
+    Returns (pending since, x, y) for the player's stone which became
+    Pending the soonest after `since`, or None if there is none.
+    """
+    with _lock:
+        pending = _by_player.get(player, [])
+        i = bisect.bisect_right(pending, (since, float("inf"), float("inf")))
+        return pending[i] if i < len(pending) else None
+
+def stones(player: int) -> List[Tuple[float, int, int]]:
+    """
+    Returns (pending since, x, y) for each of the player's Pending stones,
+    oldest first.
+    """
+    with _lock:
+        return list(_by_player.get(player, []))
+
+def snapshot() -> Dict[Tuple[int, int], Tuple[int, float]]:
+    """
+    Returns a copy of the index as { (x, y): (player, pending since) }.
+    """
+    with _lock:
+        return dict(_entry_of)
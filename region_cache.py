@@ -0,0 +1,78 @@
+# Bounded LRU cache of per-chunk stone payloads, invalidated by the board mutation path.
+
+import threading
+from collections import OrderedDict
+
+from typing import Dict, Iterable, Optional, Tuple
+
+cache_size = 4096 # Most chunks held at once.
+
+# (cx, cy) -> (chunk version, usernames generation, payload), least recently used first.
+_entries: "OrderedDict[Tuple[int, int], Tuple[int, int, dict]]" = OrderedDict()
+
+_hits = 0
+_misses = 0
+_evictions = 0
+_invalidations = 0
+
+_lock = threading.Lock()
+
+def get(key: Tuple[int, int], version: int, generation: int) -> Optional[dict]:
+    """
+    Returns the payload cached for the chunk, or None if there is none for
+    the given chunk version and usernames generation.
+    """
+    global _hits, _misses
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] != version or entry[1] != generation:
+            _misses += 1
+            return None
+        _entries.move_to_end(key)
+        _hits += 1
+        return entry[2]
+
+def put(key: Tuple[int, int], version: int, generation: int, payload: dict):
+    """
+    Caches the payload built for the chunk at the given version and
+    usernames generation, evicting the least recently used chunks beyond
+    `cache_size`. The payload must not be modified afterwards.
+    """
+    global _evictions
+    with _lock:
+        _entries[key] = (version, generation, payload)
+        _entries.move_to_end(key)
+        while len(_entries) > cache_size:
+            _entries.popitem(last=False)
+            _evictions += 1
+
+def invalidate(keys: Iterable[Tuple[int, int]]):
+    """
+    Drops the payloads cached for the given chunks.
+    """
+    global _invalidations
+    with _lock:
+        for key in keys:
+            if _entries.pop(key, None) is not None:
+                _invalidations += 1
+
+def clear():
+    """
+    Drops every cached payload.
+    """
+    with _lock:
+        _entries.clear()
+
+def stats() -> Dict[str, int]:
+    """
+    Returns the cache's size and its hit, miss, eviction and invalidation
+    counts since startup.
+    """
+    with _lock:
+        return {
+            "size": len(_entries),
+            "hits": _hits,
+            "misses": _misses,
+            "evictions": _evictions,
+            "invalidations": _invalidations,
+        }
@@ -0,0 +1,135 @@
+# Event-sourced replay of the board from snapshots and the board_events log.
+
+from typing import Dict, List, Optional, Tuple
+
+import stone_db
+import storage
+
+replay_batch_size = 10000 # Events fetched and folded per batch.
+
+_stone_columns = "x, y, player, placement_time, last_status_change_time, status"
+
+def _base_snapshot(cur, timestamp: Optional[float]) -> Tuple[int, float]:
+    """
+    Returns (event id, event time) of the latest snapshot taken at or
+    before `timestamp` (the latest of all if it is None). Raises ValueError
+    if every snapshot is later, since the events before them may have been
+    compacted away.
+    """
+    if timestamp is None:
+        cur.execute("SELECT event_id, event_time FROM snapshots ORDER BY event_id DESC LIMIT 1;")
+    else:
+        cur.execute("SELECT event_id, event_time FROM snapshots WHERE event_time <= ? ORDER BY event_id DESC LIMIT 1;", [timestamp])
+    row = cur.fetchone()
+    if row is None:
+        raise ValueError("The board's history before the earliest snapshot has been compacted away")
+    return row
+
+def _window_clause(window: Optional[Tuple[int, int, int, int]]) -> Tuple[str, list]:
+    if window is None:
+        return "", []
+    x0, y0, x1, y1 = window
+    return " AND x BETWEEN ? AND ? AND y BETWEEN ? AND ?", [min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1)]
+
+def _fold_rows(stones: Dict[Tuple[int, int], tuple], rows: List[tuple]):
+    # Folds (event_type, x, y, player, placement_time, last_status_change_time, status)
+    # rows into stones held as (player, placement_time, last_status_change_time, status).
+    for event_type, x, y, *stone in rows:
+        if event_type == "remove":
+            stones.pop((x, y), None)
+        else:
+            stones[(x, y)] = stone
+
+def board_at(timestamp: Optional[float] = None, window: Optional[Tuple[int, int, int, int]] = None) -> Dict[Tuple[int, int], dict]:
+    """
+    Reconstructs the board as it stood after every event up to and
+    including `timestamp` (or after every event, if it is None), from the
+    latest snapshot before then and the events since, fetched and folded
+    in batches of `replay_batch_size`. If an inclusive (x0, y0, x1, y1)
+    `window` is given, only the stones and events within it are read.
+    Returns stones keyed by (x, y), shaped as by `stone_db.snapshot_stones`.
+    Raises ValueError if the events before `timestamp` have been compacted
+    away.
+    """
+    where, params = _window_clause(window)
+    stones: Dict[Tuple[int, int], tuple] = {}
+
+    # Read the snapshot and the events after it as of one moment, so that
+    # a concurrent compaction cannot delete events between the two.
+    with storage.transaction() as cur:
+        snapshot_id, _ = _base_snapshot(cur, timestamp)
+
+        cur.execute(f"SELECT {_stone_columns} FROM snapshot_stones WHERE snapshot_id = ?{where};", [snapshot_id] + params)
+        for x, y, *stone in cur.fetchall():
+            stones[(x, y)] = stone
+
+        until = "" if timestamp is None else " AND event_time <= ?"
+        cur.execute(
+            f"""SELECT event_type, x, y, player, placement_time, last_status_change_time, status
+            FROM board_events
+            WHERE id > ?{until}{where}
+            ORDER BY id ASC;""",
+            [snapshot_id] + ([] if timestamp is None else [timestamp]) + params
+        )
+        while True:
+            rows = cur.fetchmany(replay_batch_size)
+            if not rows:
+                break
+            _fold_rows(stones, rows)
+
+    return {
+        coords: {
+            "player":                  player,
+            "placement_time":          placement_time,
+            "last_status_change_time": last_status_change_time,
+            "status":                  status,
+        }
+        for coords, (player, placement_time, last_status_change_time, status) in stones.items()
+    }
+
+def _stones_table(cur) -> Dict[Tuple[int, int], dict]:
+    cur.execute(f"SELECT {_stone_columns} FROM stones;")
+    return {
+        (x, y): {
+            "player":                  player,
+            "placement_time":          placement_time,
+            "last_status_change_time": last_status_change_time,
+            "status":                  status,
+        }
+        for x, y, player, placement_time, last_status_change_time, status in cur.fetchall()
+    }
+
+def verify() -> List[dict]:
+    """
+    Replays the whole log and compares the result with the stones table,
+    as of one moment. Returns a list of discrepancies, each a dict of the
+    form { "x": int, "y": int, "table": dict|None, "replay": dict|None }.
+    An empty list means the log reproduces the table exactly.
+    """
+    with storage.transaction() as cur:
+        replayed = board_at()
+        table = _stones_table(cur)
+
+    discrepancies = []
+    for coords in sorted(set(table) | set(replayed)):
+        if table.get(coords) != replayed.get(coords):
+            discrepancies.append({"x": coords[0], "y": coords[1], "table": table.get(coords), "replay": replayed.get(coords)})
+    return discrepancies
+
+def rebuild_stones() -> int:
+    """
+    Rewrites the stones table from a replay of the whole log, then reloads
+    the in-memory board and recomputes scores. Stones get new ids. Moves
+    are held up while it runs. Returns the number of stones written.
+    """
+    with stone_db.write_lock:
+        with storage.transaction(immediate=True) as cur:
+            stones = board_at()
+            cur.execute("DELETE FROM stones;")
+            cur.executemany(f"INSERT INTO stones ({_stone_columns}) VALUES (?, ?, ?, ?, ?, ?);", [
+                [x, y, row["player"], row["placement_time"], row["last_status_change_time"], row["status"]]
+                for (x, y), row in stones.items()
+            ])
+        stone_db.load_index()
+        stone_db.reconcile_scores()
+    return len(stones)
@@ -5,17 +5,31 @@ from __future__ import annotations
 
 import argparse
 import datetime as _dt
+import gzip
+import hashlib
+import json
 import re
+import shutil
 import sqlite3
 import sys
+import tempfile
+import time
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
 DEFAULT_BACKUP_DIR = PROJECT_ROOT / "data" / "backups"
 DEFAULT_RETENTION = 30
+INCREMENTAL_DIR_NAME = "incremental"
+DEFAULT_BASE_INTERVAL = 7.0  # Days between full base snapshots in incremental mode.
+DEFAULT_KEEP_CHAINS = 2
+DEFAULT_PAGES = 1024  # Pages copied per backup step; each step briefly holds a read lock.
+DEFAULT_SLEEP = 0.05  # Seconds to pause between backup steps.
+DEFAULT_MAX_RESTARTS = 5
+STATS_FILE_NAME = "backup-stats.jsonl"
+STONE_COLUMNS = ("x", "y", "player", "placement_time", "last_status_change_time", "status")
 
 
 def positive_int(value: str) -> int:
@@ -30,6 +44,18 @@ def positive_int(value: str) -> int:
     return parsed
 
 
+def non_negative_float(value: str) -> float:
+    """Parse a string as a non-negative number."""
+
+    try:
+        parsed = float(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a number") from exc
+    if parsed < 0:
+        raise argparse.ArgumentTypeError("Value must be zero or positive.")
+    return parsed
+
+
 def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
     """Parse command-line arguments."""
 
@@ -60,6 +86,73 @@ def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
         default=DEFAULT_RETENTION,
         help="Number of most recent backups to keep (0 disables pruning).",
     )
+    parser.add_argument(
+        "--pages",
+        type=positive_int,
+        default=DEFAULT_PAGES,
+        help=(
+            f"Database pages copied per step of the online backup (default: {DEFAULT_PAGES}; "
+            "0 copies everything in one step)."
+        ),
+    )
+    parser.add_argument(
+        "--sleep",
+        type=non_negative_float,
+        default=DEFAULT_SLEEP,
+        help=f"Seconds to pause between backup steps, letting writes through (default: {DEFAULT_SLEEP:g}).",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=non_negative_float,
+        default=0.0,
+        help="Most MiB per second to copy, pausing between steps as needed (default: 0, unlimited).",
+    )
+    parser.add_argument(
+        "--max-restarts",
+        type=positive_int,
+        default=DEFAULT_MAX_RESTARTS,
+        help=(
+            "Writes to the live database restart a stepped backup. After this many restarts, "
+            f"the copy is finished in one step instead (default: {DEFAULT_MAX_RESTARTS})."
+        ),
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Report the backup's progress on stderr.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            f"Append the board events since the last backup to the current chain in "
+            f"<destination>/{INCREMENTAL_DIR_NAME}/ as a compressed segment, starting a new "
+            "chain with a full base copy when one is due."
+        ),
+    )
+    parser.add_argument(
+        "--base-interval",
+        type=float,
+        default=DEFAULT_BASE_INTERVAL,
+        help=f"Days after which an incremental chain gets a new full base (default: {DEFAULT_BASE_INTERVAL:g}).",
+    )
+    parser.add_argument(
+        "--keep-chains",
+        type=positive_int,
+        default=DEFAULT_KEEP_CHAINS,
+        help=f"Number of most recent incremental chains to keep (default: {DEFAULT_KEEP_CHAINS}; 0 disables pruning).",
+    )
+    parser.add_argument(
+        "--restore",
+        type=Path,
+        metavar="TARGET",
+        help="Restore the latest incremental chain into a new database file at TARGET, then exit.",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Restore the latest incremental chain into a temporary file and check it against the live database.",
+    )
     return parser.parse_args(argv)
 
 
@@ -78,18 +171,140 @@ def compute_backup_path(destination: Path, label: str) -> Path:
     return destination / f"database-{timestamp}{suffix}.db"
 
 
-def create_backup(source: Path, destination: Path, label: str) -> Path:
-    """Perform a SQLite online backup to the destination path."""
+class BackupRestarted(Exception):
+    """Raised from the progress callback to abandon a stepped backup that keeps restarting."""
+
+
+def copy_database(
+    live_db: sqlite3.Connection,
+    backup_db: sqlite3.Connection,
+    pages: int = DEFAULT_PAGES,
+    sleep: float = DEFAULT_SLEEP,
+    rate_limit: float = 0.0,
+    max_restarts: int = DEFAULT_MAX_RESTARTS,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, float]:
+    """Copy a database with the online backup API in steps of `pages` pages, and return timing stats.
+
+    Each step holds a read lock on the live database only while it runs, and
+    the progress callback pauses for `sleep` seconds after every step but the
+    last (SQLite's own `sleep` only applies when a step finds the database
+    busy or locked). With a `rate_limit` in MiB per second, the pause is
+    lengthened as needed to keep under it. A write to the live database
+    through another connection restarts the copy; after `max_restarts`
+    restarts, it is finished in a single step. `progress(copied, total)` is
+    called after every step.
+    """
+
+    page_size = live_db.execute("PRAGMA page_size;").fetchone()[0]
+    start = time.monotonic()
+    state = {"copied": 0, "steps": 0, "restarts": 0, "remaining": None}
+
+    def on_step(status: int, remaining: int, total: int) -> None:
+        previous = state["remaining"]
+        if previous is not None and remaining > previous:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise BackupRestarted()
+            previous = None
+        # A step copies what it took off the remainder; the first step of a pass starts from the total.
+        state["copied"] += (total if previous is None else previous) - remaining
+        state["remaining"] = remaining
+        state["steps"] += 1
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining == 0:
+            return
+        pause = sleep
+        if rate_limit > 0:
+            due = state["copied"] * page_size / (rate_limit * 1024 * 1024)
+            pause = max(pause, due - (time.monotonic() - start))
+        if pause > 0:
+            time.sleep(pause)
+
+    fell_back = False
+    try:
+        live_db.backup(backup_db, pages=pages if pages > 0 else -1, progress=on_step, sleep=sleep)
+    except BackupRestarted:
+        fell_back = True
+        live_db.backup(backup_db)
+
+    elapsed = time.monotonic() - start
+    total_pages = backup_db.execute("PRAGMA page_count;").fetchone()[0]
+    # Every pass counts, including any abandoned by a restart and the single-step fallback.
+    pages_copied = state["copied"] + (total_pages if fell_back else 0)
+    return {
+        "seconds": round(elapsed, 3),
+        "pages": total_pages,
+        "pages_copied": pages_copied,
+        "page_size": page_size,
+        "steps": state["steps"],
+        "restarts": state["restarts"],
+        "pages_per_second": round(pages_copied / elapsed, 1) if elapsed > 0 else None,
+        "fell_back": fell_back,
+    }
+
+
+def create_backup(
+    source: Path,
+    destination: Path,
+    label: str,
+    pages: int = DEFAULT_PAGES,
+    sleep: float = DEFAULT_SLEEP,
+    rate_limit: float = 0.0,
+    max_restarts: int = DEFAULT_MAX_RESTARTS,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[Path, Dict[str, float]]:
+    """Perform a paged SQLite online backup to the destination path, returning it and the copy's stats."""
 
     if not source.exists():
         raise FileNotFoundError(f"Database not found at {source}.")
     destination.mkdir(parents=True, exist_ok=True)
     sanitized_label = sanitize_label(label)
     backup_path = compute_backup_path(destination, sanitized_label)
-    with sqlite3.connect(source) as live_db:
-        with sqlite3.connect(backup_path) as backup_db:
-            live_db.backup(backup_db)
-    return backup_path
+    live_db = sqlite3.connect(source)
+    backup_db = sqlite3.connect(backup_path)
+    try:
+        stats = copy_database(live_db, backup_db, pages, sleep, rate_limit, max_restarts, progress)
+    finally:
+        backup_db.close()
+        live_db.close()
+    return backup_path, stats
+
+
+def progress_printer(label: str) -> Callable[[int, int], None]:
+    """Return a progress callback that prints each further tenth of the copy to stderr."""
+
+    reported = {"tenth": -1}
+
+    def report(copied: int, total: int) -> None:
+        tenth = copied * 10 // total if total else 10
+        if tenth != reported["tenth"]:
+            reported["tenth"] = tenth
+            print(f"{label}: {copied}/{total} pages ({tenth * 10}%)", file=sys.stderr)
+
+    return report
+
+
+def describe_stats(stats: Dict[str, float]) -> str:
+    """Summarize a backup's timing stats in one line."""
+
+    mib = stats["pages"] * stats["page_size"] / (1024 * 1024)
+    rate = f"{stats['pages_per_second']:,.0f} pages/s" if stats["pages_per_second"] else "instant"
+    line = f"Copied {stats['pages']:,} pages ({mib:,.1f} MiB) in {stats['seconds']:.2f}s ({rate}, {stats['steps']} step(s))"
+    if stats["restarts"]:
+        line += f", restarted {stats['restarts']} time(s) by live writes"
+    if stats["fell_back"]:
+        line += ", finished in one step"
+    return line + "."
+
+
+def record_stats(destination: Path, backup_path: Path, stats: Dict[str, float]) -> None:
+    """Append a backup's timing stats to the stats log in the destination directory."""
+
+    entry = dict(stats, time=_dt.datetime.utcnow().isoformat(timespec="seconds"), backup=backup_path.name)
+    with (destination / STATS_FILE_NAME).open("a") as handle:
+        handle.write(json.dumps(entry) + "\n")
 
 
 def prune_backups(destination: Path, keep: int) -> List[Path]:
@@ -109,19 +324,355 @@ def prune_backups(destination: Path, keep: int) -> List[Path]:
     return removed
 
 
+def schema_version(db: sqlite3.Connection) -> int:
+    """Return the most recently applied schema migration of a database."""
+
+    return db.execute("SELECT MAX(version) FROM schema_version;").fetchone()[0] or 0
+
+
+def compaction_horizon(db: sqlite3.Connection) -> int:
+    """Return the last board event folded into the database's latest snapshot."""
+
+    return db.execute("SELECT MAX(event_id) FROM snapshots;").fetchone()[0] or 0
+
+
+def max_event_id(db: sqlite3.Connection) -> int:
+    """Return the id of the newest board event, falling back to the compaction horizon."""
+
+    event_id = db.execute("SELECT MAX(id) FROM board_events;").fetchone()[0]
+    return compaction_horizon(db) if event_id is None else event_id
+
+
+def read_table(db: sqlite3.Connection, query: str, params: Iterable[Any] = ()) -> Dict[str, Any]:
+    """Run a query and return its columns and rows as a JSON-serializable dict."""
+
+    cursor = db.execute(query, list(params))
+    return {
+        "columns": [column[0] for column in cursor.description],
+        "rows": [list(row) for row in cursor.fetchall()],
+    }
+
+
+def table_digest(table: Dict[str, Any]) -> str:
+    """Return a digest of a table read with `read_table`."""
+
+    return hashlib.sha256(json.dumps(table, sort_keys=True).encode()).hexdigest()
+
+
+def read_manifest(chain: Path) -> Dict[str, Any]:
+    """Load the manifest describing an incremental chain."""
+
+    return json.loads((chain / "manifest.json").read_text())
+
+
+def write_manifest(chain: Path, manifest: Dict[str, Any]) -> None:
+    """Atomically replace the manifest of an incremental chain."""
+
+    staging = chain / "manifest.json.tmp"
+    staging.write_text(json.dumps(manifest, indent=2))
+    staging.replace(chain / "manifest.json")
+
+
+def list_chains(root: Path) -> List[Path]:
+    """Return the incremental chains under `root`, oldest first."""
+
+    return sorted(path.parent for path in root.glob("chain-*/manifest.json"))
+
+
+def new_base_reason(manifest: Dict[str, Any], live_db: sqlite3.Connection, base_interval: float) -> Optional[str]:
+    """Return why the chain needs a new full base, or None if a segment can be appended."""
+
+    if schema_version(live_db) != manifest["schema_version"]:
+        return "the schema has been migrated"
+    if compaction_horizon(live_db) != manifest["compaction_horizon"]:
+        return "board events have been compacted"
+    if max_event_id(live_db) < manifest["last_event_id"]:
+        return "the live database is behind the backup"
+    if time.time() - manifest["created_time"] >= base_interval * 86400:
+        return "the base is older than the base interval"
+    return None
+
+
+def start_chain(source: Path, root: Path, **copy_options: Any) -> Tuple[Path, Dict[str, float]]:
+    """Start a new incremental chain with a full base copy of the live database."""
+
+    timestamp = _dt.datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    chain = root / f"chain-{timestamp}"
+    suffix = 1
+    while chain.exists():
+        suffix += 1
+        chain = root / f"chain-{timestamp}-{suffix}"
+    chain.mkdir(parents=True)
+    base_path, stats = create_backup(source, chain, "", **copy_options)
+    base_path = base_path.rename(chain / "base.db")
+
+    # The base itself says exactly which events it holds.
+    with sqlite3.connect(base_path) as base_db:
+        manifest = {
+            "created_time": time.time(),
+            "base": base_path.name,
+            "schema_version": schema_version(base_db),
+            "compaction_horizon": compaction_horizon(base_db),
+            "base_event_id": max_event_id(base_db),
+            "last_event_id": max_event_id(base_db),
+            "users_digest": table_digest(read_table(base_db, "SELECT * FROM users ORDER BY id;")),
+            "segments": [],
+        }
+    base_db.close()
+    write_manifest(chain, manifest)
+    return chain, stats
+
+
+def append_segment(source: Path, chain: Path) -> Optional[Path]:
+    """Write the board events since the chain's last backup, and the users table if it changed, as a segment."""
+
+    manifest = read_manifest(chain)
+    live_db = sqlite3.connect(source)
+    try:
+        # One read transaction, so the events and users are from the same moment.
+        live_db.execute("BEGIN;")
+        events = read_table(live_db, "SELECT * FROM board_events WHERE id > ? ORDER BY id;", [manifest["last_event_id"]])
+        users = read_table(live_db, "SELECT * FROM users ORDER BY id;")
+        live_db.execute("COMMIT;")
+    finally:
+        live_db.close()
+
+    users_digest = table_digest(users)
+    if not events["rows"] and users_digest == manifest["users_digest"]:
+        return None
+
+    id_column = events["columns"].index("id")
+    first_event_id = manifest["last_event_id"] + 1
+    last_event_id = events["rows"][-1][id_column] if events["rows"] else manifest["last_event_id"]
+    segment = {
+        "schema_version": manifest["schema_version"],
+        "first_event_id": first_event_id,
+        "last_event_id": last_event_id,
+        "board_events": events,
+        "users": users if users_digest != manifest["users_digest"] else None,
+    }
+    segment_path = chain / f"segment-{len(manifest['segments']) + 1:05d}-{last_event_id}.json.gz"
+    with gzip.open(segment_path, "wt", encoding="utf-8") as handle:
+        json.dump(segment, handle)
+
+    manifest["segments"].append({
+        "file": segment_path.name,
+        "first_event_id": first_event_id,
+        "last_event_id": last_event_id,
+        "events": len(events["rows"]),
+        "created_time": time.time(),
+    })
+    manifest["last_event_id"] = last_event_id
+    manifest["users_digest"] = users_digest
+    write_manifest(chain, manifest)
+    return segment_path
+
+
+def create_incremental_backup(source: Path, destination: Path, base_interval: float, **copy_options: Any) -> str:
+    """Append a segment to the current incremental chain, or start a new chain if one is due.
+
+    `copy_options` are passed to `create_backup` for the base copy.
+    """
+
+    if not source.exists():
+        raise FileNotFoundError(f"Database not found at {source}.")
+    root = destination / INCREMENTAL_DIR_NAME
+    chains = list_chains(root)
+
+    reason = "there is no chain yet"
+    if chains:
+        with sqlite3.connect(source) as live_db:
+            reason = new_base_reason(read_manifest(chains[-1]), live_db, base_interval)
+        live_db.close()
+    if reason is not None:
+        chain, stats = start_chain(source, root, **copy_options)
+        record_stats(destination, chain / "base.db", stats)
+        return f"Started incremental chain {chain} with a full base, because {reason}. {describe_stats(stats)}"
+
+    segment_path = append_segment(source, chains[-1])
+    if segment_path is None:
+        return f"No changes since the last backup in {chains[-1]}."
+    return f"Segment written to {segment_path}."
+
+
+def apply_events(db: sqlite3.Connection, events: Dict[str, Any]) -> None:
+    """Insert board event rows and apply them to the stones table, as `stone_db.write_deltas` did."""
+
+    columns = events["columns"]
+    placeholders = ", ".join("?" * len(columns))
+    db.executemany(f"INSERT INTO board_events ({', '.join(columns)}) VALUES ({placeholders});", events["rows"])
+
+    for row in events["rows"]:
+        event = dict(zip(columns, row))
+        if event["event_type"] == "place":
+            db.execute("DELETE FROM stones WHERE x = ? AND y = ?;", [event["x"], event["y"]])
+            db.execute(
+                f"INSERT INTO stones ({', '.join(STONE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?);",
+                [event[column] for column in STONE_COLUMNS],
+            )
+        elif event["event_type"] == "status":
+            db.execute(
+                "UPDATE stones SET status = ?, last_status_change_time = ? WHERE x = ? AND y = ?;",
+                [event["status"], event["last_status_change_time"], event["x"], event["y"]],
+            )
+        elif event["event_type"] == "remove":
+            db.execute("DELETE FROM stones WHERE x = ? AND y = ?;", [event["x"], event["y"]])
+
+
+def restore_chain(chain: Path, target: Path) -> int:
+    """Restore an incremental chain into a new database at `target`. Returns the last event id restored."""
+
+    if target.exists():
+        raise FileExistsError(f"{target} already exists; restore into a new path.")
+    manifest = read_manifest(chain)
+    shutil.copyfile(chain / manifest["base"], target)
+
+    db = sqlite3.connect(target)
+    try:
+        with db:
+            for entry in manifest["segments"]:
+                with gzip.open(chain / entry["file"], "rt", encoding="utf-8") as handle:
+                    segment = json.load(handle)
+                apply_events(db, segment["board_events"])
+                if segment["users"] is not None:
+                    users = segment["users"]
+                    placeholders = ", ".join("?" * len(users["columns"]))
+                    db.execute("DELETE FROM users;")
+                    db.executemany(f"INSERT INTO users ({', '.join(users['columns'])}) VALUES ({placeholders});", users["rows"])
+            # Scores are derived from the stones table.
+            db.execute("DELETE FROM player_stats;")
+            db.execute("INSERT INTO player_stats (player, stone_count) SELECT player, COUNT(id) FROM stones GROUP BY player;")
+    finally:
+        db.close()
+    return manifest["last_event_id"]
+
+
+def verify_chain(chain: Path, source: Path) -> List[str]:
+    """Restore a chain into a temporary file and return how it differs from the live database."""
+
+    problems: List[str] = []
+    with tempfile.TemporaryDirectory() as scratch:
+        restored_path = Path(scratch) / "restored.db"
+        last_event_id = restore_chain(chain, restored_path)
+        restored = sqlite3.connect(restored_path)
+        restored.execute("ATTACH DATABASE ? AS live;", [str(source)])
+        try:
+            # One read transaction over both, so the live side holds still.
+            restored.execute("BEGIN;")
+            live_horizon = restored.execute("SELECT MAX(event_id) FROM live.snapshots;").fetchone()[0] or 0
+            horizon = max(compaction_horizon(restored), live_horizon)
+            live_last = restored.execute("SELECT MAX(id) FROM live.board_events;").fetchone()[0] or live_horizon
+
+            # Events the live database still holds, up to the end of the backup.
+            for left, right in (("main", "live"), ("live", "main")):
+                missing = restored.execute(
+                    f"""SELECT COUNT(*) FROM (
+                        SELECT * FROM {left}.board_events WHERE id > ? AND id <= ?
+                        EXCEPT SELECT * FROM {right}.board_events WHERE id > ? AND id <= ?
+                    );""",
+                    [horizon, last_event_id, horizon, last_event_id],
+                ).fetchone()[0]
+                if missing:
+                    problems.append(f"{missing} board event(s) in the {left} database differ from the {right} one")
+
+            if live_last == last_event_id:
+                stone_columns = ", ".join(STONE_COLUMNS)
+                for table, columns in (("stones", stone_columns), ("users", "*")):
+                    for left, right in (("main", "live"), ("live", "main")):
+                        missing = restored.execute(
+                            f"SELECT COUNT(*) FROM (SELECT {columns} FROM {left}.{table} EXCEPT SELECT {columns} FROM {right}.{table});"
+                        ).fetchone()[0]
+                        if missing:
+                            problems.append(f"{missing} row(s) of {table} in the {left} database differ from the {right} one")
+            else:
+                print(
+                    f"The live database has moved on to event {live_last}, past the backup's {last_event_id}; "
+                    "only board events were compared.",
+                    file=sys.stderr,
+                )
+            restored.execute("COMMIT;")
+        finally:
+            restored.close()
+    return problems
+
+
+def prune_chains(root: Path, keep: int) -> List[Path]:
+    """Remove old incremental chains beyond the retention limit."""
+
+    if keep <= 0:
+        return []
+    removed = []
+    for stale in list_chains(root)[:-keep]:
+        shutil.rmtree(stale)
+        removed.append(stale)
+    return removed
+
+
 def main(argv: Iterable[str] | None = None) -> int:
     """Script entry point."""
 
     args = parse_args(argv)
-    try:
-        backup_path = create_backup(args.db_path, args.destination, args.label)
-    except Exception as exc:  # pylint: disable=broad-except
-        print(f"Backup failed: {exc}", file=sys.stderr)
-        return 1
-    removed = prune_backups(args.destination, args.retention)
-    print(f"Backup written to {backup_path}.")
-    if removed:
-        print(f"Pruned {len(removed)} old backup(s).")
+    root = args.destination / INCREMENTAL_DIR_NAME
+
+    if args.restore is not None:
+        chains = list_chains(root)
+        if not chains:
+            print(f"No incremental chain found in {root}.", file=sys.stderr)
+            return 1
+        try:
+            last_event_id = restore_chain(chains[-1], args.restore)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Restore failed: {exc}", file=sys.stderr)
+            return 1
+        print(f"Restored {chains[-1]} up to board event {last_event_id} into {args.restore}.")
+        return 0
+
+    copy_options = {
+        "pages": args.pages,
+        "sleep": args.sleep,
+        "rate_limit": args.rate_limit,
+        "max_restarts": args.max_restarts,
+        "progress": progress_printer("backup") if args.progress else None,
+    }
+
+    if args.incremental:
+        try:
+            print(create_incremental_backup(args.db_path, args.destination, args.base_interval, **copy_options))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Backup failed: {exc}", file=sys.stderr)
+            return 1
+        removed = prune_chains(root, args.keep_chains)
+        if removed:
+            print(f"Pruned {len(removed)} old incremental chain(s).")
+    elif not args.verify:
+        try:
+            backup_path, stats = create_backup(args.db_path, args.destination, args.label, **copy_options)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Backup failed: {exc}", file=sys.stderr)
+            return 1
+        record_stats(args.destination, backup_path, stats)
+        removed = prune_backups(args.destination, args.retention)
+        print(f"Backup written to {backup_path}.")
+        print(describe_stats(stats))
+        if removed:
+            print(f"Pruned {len(removed)} old backup(s).")
+
+    if args.verify:
+        chains = list_chains(root)
+        if not chains:
+            print(f"No incremental chain found in {root}.", file=sys.stderr)
+            return 1
+        try:
+            problems = verify_chain(chains[-1], args.db_path)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Verification failed: {exc}", file=sys.stderr)
+            return 1
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        if problems:
+            print(f"{chains[-1]} does not match the live database.", file=sys.stderr)
+            return 1
+        print(f"{chains[-1]} restores to match the live database.")
     return 0
 
 
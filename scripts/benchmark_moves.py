@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Benchmark the move pipeline and the reads around it on synthetic boards."""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import os
+import platform
+import secrets
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("random", "chains", "fights", "pending")
+DEFAULT_SIZE = 128
+DEFAULT_DENSITY = 0.3
+DEFAULT_PLAYERS = 50
+DEFAULT_MOVES = 1000
+DEFAULT_READS = 1000
+COMPARED_FIELDS = ("p50_ms", "p95_ms", "p99_ms", "statements_per_call")
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def positive_int(value: str) -> int:
+    """Parse a string as a strictly positive integer."""
+
+    try:
+        parsed = int(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{value!r} is not an integer") from exc
+    if parsed <= 0:
+        raise argparse.ArgumentTypeError("Value must be positive.")
+    return parsed
+
+
+def fraction(value: str) -> float:
+    """Parse a string as a number between 0 and 1."""
+
+    try:
+        parsed = float(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a number") from exc
+    if not 0 <= parsed <= 1:
+        raise argparse.ArgumentTypeError("Value must be between 0 and 1.")
+    return parsed
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build synthetic boards in a scratch database and time move validation, "
+            "MoveEngine moves, /go-json moves, /region reads, /viewer loads and "
+            "/board-changes polls on each, reporting latency percentiles, throughput "
+            "and SQLite statements per call."
+        )
+    )
+    parser.add_argument(
+        "--scenario",
+        choices=SCENARIOS,
+        nargs="+",
+        default=list(SCENARIOS),
+        help="Boards to benchmark (default: all of them).",
+    )
+    parser.add_argument(
+        "--size",
+        type=positive_int,
+        default=DEFAULT_SIZE,
+        help=f"Points per side of the synthetic board (default: {DEFAULT_SIZE}).",
+    )
+    parser.add_argument(
+        "--density",
+        type=fraction,
+        default=DEFAULT_DENSITY,
+        help=f"Share of points holding a stone, for the random, fights and pending boards (default: {DEFAULT_DENSITY}).",
+    )
+    parser.add_argument(
+        "--players",
+        type=positive_int,
+        default=DEFAULT_PLAYERS,
+        help=f"Simulated players, each with their own signed-in client (default: {DEFAULT_PLAYERS}).",
+    )
+    parser.add_argument(
+        "--moves",
+        type=positive_int,
+        default=DEFAULT_MOVES,
+        help=f"Moves attempted per board, through MoveEngine and again through /go-json (default: {DEFAULT_MOVES}).",
+    )
+    parser.add_argument(
+        "--reads",
+        type=positive_int,
+        default=DEFAULT_READS,
+        help=f"Validations, /region reads, /viewer loads and /board-changes polls per board (default: {DEFAULT_READS}).",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for board layouts and move choices, so runs are comparable (default: 0).",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Write the results to this JSON file.",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        help="Compare the results with those of an earlier run saved with --output.",
+    )
+    return parser.parse_args(argv)
+
+
+def git_revision() -> Dict[str, Any]:
+    """Return the checked-out commit and whether the tree has uncommitted changes, if known."""
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def benchmark_scenario(scenario: str, args: argparse.Namespace, players: list) -> Dict[str, Any]:
+    """Build one synthetic board and run every workload on it."""
+
+    # Imported once the scratch database is in place.
+    import app as web  # pylint: disable=import-outside-toplevel
+    import stone_db  # pylint: disable=import-outside-toplevel
+    from benchmarks import boards, workloads  # pylint: disable=import-outside-toplevel
+    from move_engine import MoveEngine  # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    stones = boards.build(scenario, args.size, args.density, players, args.seed)
+    boards.load(stones)
+    build_seconds = time.perf_counter() - start
+
+    clients = workloads.player_clients(web.app, players)
+    reader = web.app.test_client()
+    reads = workloads.move_targets(args.reads, players, args.seed + 1)
+    cursor = stone_db.latest_event_id()
+
+    results = {}
+    results["validate"] = workloads.run(workloads.validation_calls(reads), bool)
+    results["engine_move"] = workloads.run(
+        workloads.engine_calls(MoveEngine(), workloads.valid_move_targets(args.moves, players, args.seed + 2)),
+        lambda deltas: deltas is not None,
+    )
+    results["go_json"] = workloads.run(
+        workloads.go_json_calls(clients, workloads.valid_move_targets(args.moves, players, args.seed + 3)), bool
+    )
+    results["region"] = workloads.run(workloads.region_calls(reader, reads))
+    results["viewer"] = workloads.run(workloads.viewer_calls(clients, reads))
+    results["board_changes"] = workloads.run(
+        workloads.board_changes_calls(reader, cursor, len(players), args.reads, args.seed + 4)
+    )
+    return {"stones": len(stones), "build_seconds": round(build_seconds, 3), "workloads": results}
+
+
+def print_results(name: str, result: Dict[str, Any], size: int) -> None:
+    """Print one board's results as a table."""
+
+    print(f"{name}: {result['stones']:,} stones on a {size}x{size} board (built in {result['build_seconds']:.2f}s)")
+    print(
+        f"  {'workload':<14} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'calls/s':>9} {'stmts':>7} {'accepted/s':>11}"
+    )
+    for workload, report in result["workloads"].items():
+        accepted = report.get("accepted_per_second")
+        print(
+            f"  {workload:<14} {report['calls']:>7} {report['p50_ms']:>9.3f} {report['p95_ms']:>9.3f} "
+            f"{report['p99_ms']:>9.3f} {report['calls_per_second'] or 0:>9,.0f} "
+            f"{report['statements_per_call']:>7.2f} {'' if accepted is None else f'{accepted:,.0f}':>11}"
+        )
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any]) -> None:
+    """Print how each workload's latencies and statement counts moved since a baseline run."""
+
+    label = (baseline.get("commit") or "unknown")[:12]
+    print(f"Compared with {label} ({baseline.get('time', 'unknown time')}):")
+    for name, result in results["scenarios"].items():
+        old_workloads = baseline.get("scenarios", {}).get(name, {}).get("workloads", {})
+        for workload, report in result["workloads"].items():
+            old = old_workloads.get(workload)
+            if old is None:
+                continue
+            changes = []
+            for field in COMPARED_FIELDS:
+                before, after = old[field], report[field]
+                change = f" ({(after - before) / before:+.0%})" if before else ""
+                changes.append(f"{field} {before:g} -> {after:g}{change}")
+            print(f"  {name}/{workload}: " + ", ".join(changes))
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    baseline: Optional[Dict[str, Any]] = None
+    if args.compare is not None:
+        try:
+            baseline = json.loads(args.compare.read_text())
+        except (OSError, ValueError) as exc:
+            print(f"Could not read {args.compare}: {exc}", file=sys.stderr)
+            return 1
+    output = args.output.resolve() if args.output is not None else None
+
+    results: Dict[str, Any] = {
+        **git_revision(),
+        "time": _dt.datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "settings": {
+            "size": args.size,
+            "density": args.density,
+            "players": args.players,
+            "moves": args.moves,
+            "reads": args.reads,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # The app reads config.json, and the storage layer creates `data/`,
+        # relative to the working directory.
+        os.chdir(scratch)
+        Path("config.json").write_text(json.dumps({
+            "secret key": secrets.token_hex(16),
+            "password salt": secrets.token_hex(16),
+            "email": {},
+        }))
+        import storage  # pylint: disable=import-outside-toplevel
+
+        storage.db_file = os.path.join(scratch, "database.db")
+        from benchmarks import boards  # pylint: disable=import-outside-toplevel
+
+        players = boards.create_players(args.players)
+        for scenario in args.scenario:
+            results["scenarios"][scenario] = benchmark_scenario(scenario, args, players)
+            print_results(scenario, results["scenarios"][scenario], args.size)
+        storage.close()
+
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Results written to {output}.")
+    if baseline is not None:
+        compare(baseline, results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
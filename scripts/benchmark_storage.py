@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Compare per-call query latency with and without the shared storage layer."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Sequence
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+DEFAULT_ITERATIONS = 2000
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def positive_int(value: str) -> int:
+    """Parse a string as a strictly positive integer."""
+
+    try:
+        parsed = int(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{value!r} is not an integer") from exc
+    if parsed <= 0:
+        raise argparse.ArgumentTypeError("Value must be positive.")
+    return parsed
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure per-call latency of typical stone_db/user_db reads, opening a "
+            "fresh connection per call (before) versus the pooled storage layer (after)."
+        )
+    )
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to read (default: {DEFAULT_DB_PATH}).",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=positive_int,
+        default=DEFAULT_ITERATIONS,
+        help=f"Number of calls per measurement (default: {DEFAULT_ITERATIONS}).",
+    )
+    return parser.parse_args(argv)
+
+
+def time_calls(call: Callable[[int], object], iterations: int) -> List[float]:
+    """Return the duration in microseconds of each of `iterations` calls."""
+
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        call(i)
+        durations.append((time.perf_counter() - start) * 1e6)
+    return durations
+
+
+def summarize(label: str, durations: Sequence[float]) -> str:
+    """Format mean and percentile latencies for one measurement."""
+
+    ordered = sorted(durations)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"{label:<32} mean {statistics.fmean(ordered):9.1f} us   p50 {p50:9.1f} us   p95 {p95:9.1f} us"
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(args.db_path)
+    with sqlite3.connect(args.db_path) as db:
+        points = db.execute("SELECT x, y FROM stones;").fetchall() or [(0, 0)]
+        user_ids = [row[0] for row in db.execute("SELECT id FROM users;").fetchall()] or [1]
+    rng = random.Random(0)
+    points = [rng.choice(points) for _ in range(args.iterations)]
+    user_ids = [rng.choice(user_ids) for _ in range(args.iterations)]
+
+    stone_query = "SELECT * FROM stones WHERE x = ? AND y = ?;"
+    user_query = "SELECT username FROM users WHERE id = ?;"
+
+    def fresh(query: str, params: Callable[[int], Sequence[object]]) -> Callable[[int], object]:
+        def call(i: int) -> object:
+            with sqlite3.connect(args.db_path) as db:
+                return db.execute(query, params(i)).fetchone()
+        return call
+
+    def pooled(query: str, params: Callable[[int], Sequence[object]]) -> Callable[[int], object]:
+        def call(i: int) -> object:
+            return storage.cursor().execute(query, params(i)).fetchone()
+        return call
+
+    stone_params = lambda i: points[i]  # noqa: E731
+    user_params = lambda i: [user_ids[i]]  # noqa: E731
+    measurements = [
+        ("stone lookup, fresh connection", fresh(stone_query, stone_params)),
+        ("stone lookup, pooled storage", pooled(stone_query, stone_params)),
+        ("user lookup, fresh connection", fresh(user_query, user_params)),
+        ("user lookup, pooled storage", pooled(user_query, user_params)),
+    ]
+    print(f"{args.iterations} calls each against {args.db_path}:")
+    for label, call in measurements:
+        print(summarize(label, time_calls(call, args.iterations)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
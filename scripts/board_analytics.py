@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Report per-player board statistics computed from a dense NumPy snapshot."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Snapshot the board (or a bounding box of it) into dense arrays and report "
+            "each player's stones, groups, groups in atari and territory. Requires NumPy."
+        )
+    )
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to analyse (default: {DEFAULT_DB_PATH}).",
+    )
+    parser.add_argument(
+        "--bbox",
+        type=int,
+        nargs=4,
+        metavar=("X0", "Y0", "X1", "Y1"),
+        help="Only analyse the stones within this inclusive bounding box (default: the whole board).",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the statistics as JSON.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    db_path = args.db_path.resolve()
+    # The storage layer creates `data/` relative to the working directory.
+    os.chdir(PROJECT_ROOT)
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(db_path)
+    import board_arrays  # pylint: disable=import-outside-toplevel
+
+    if not board_arrays.available:
+        print("NumPy is required: pip install numpy", file=sys.stderr)
+        return 1
+    import analytics  # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    snap = analytics.snapshot(tuple(args.bbox) if args.bbox else None)
+    summary = analytics.summarize(snap)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps({str(player): stats for player, stats in summary.items()}, indent=2))
+        return 0
+
+    height, width = snap["player"].shape
+    print(f"Analysed {width}x{height} points from ({snap['x0']}, {snap['y0']}) in {elapsed:.2f}s.")
+    print(f"{'player':>8} {'stones':>8} {'groups':>8} {'atari':>8} {'territory':>10}")
+    for player, stats in sorted(summary.items()):
+        print(f"{player:>8} {stats['stones']:>8} {stats['groups']:>8} {stats['atari']:>8} {stats['territory']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
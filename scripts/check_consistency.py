@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Check the in-memory board index and chains, as loaded at startup, against the stones table."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Iterable
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load the board the way the server does at startup and compare the in-memory "
+            "board index and chains with the stones table, reporting every point and chain "
+            "where they differ."
+        )
+    )
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to check (default: {DEFAULT_DB_PATH}).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    db_path = args.db_path.resolve()
+    # The storage layer creates `data/` relative to the working directory.
+    os.chdir(PROJECT_ROOT)
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(db_path)
+    import stone_db  # pylint: disable=import-outside-toplevel
+
+    discrepancies = stone_db.check_index_consistency()
+    for entry in discrepancies:
+        print(f"({entry['x']}, {entry['y']}): table {entry['table']}, index {entry['index']}")
+    chains = stone_db.check_group_consistency()
+    for player, stones, liberties in chains:
+        print(f"chain of player {player}: stones {sorted(stones)}, liberties {sorted(liberties)}")
+
+    if not discrepancies and not chains:
+        print("The board index and chains match the stones table.")
+        return 0
+    if discrepancies:
+        print(f"{len(discrepancies)} point(s) differ between the board index and the stones table.", file=sys.stderr)
+    if chains:
+        print(f"{len(chains)} chain(s) differ between the tracked chains and those rebuilt from the stones table.", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Fail if any hot stone_db query needs a full table scan."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Statements that are expected to read a whole table.
+ALLOWED_SCANS: Tuple[str, ...] = ()
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Exercise the hot stone_db read and write paths against a scratch database, "
+            "and check the query plan of every statement they run for table scans."
+        )
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the query plan of every statement checked.",
+    )
+    return parser.parse_args(argv)
+
+
+def exercise_hot_paths() -> List[str]:
+    """Run the hot stone_db paths on a scratch database and return the SQL they issued."""
+
+    # Importing stone_db migrates the schema and loads the board index.
+    import stone_db  # pylint: disable=import-outside-toplevel
+    import storage  # pylint: disable=import-outside-toplevel
+    from move_engine import MoveEngine  # pylint: disable=import-outside-toplevel
+
+    statements: List[str] = []
+    storage.connection().set_trace_callback(statements.append)
+
+    engine = MoveEngine()
+    engine.apply(2, 1, 0)
+    engine.apply(3, 0, 1)
+    engine.apply(2, -1, 0)
+    stone_db.player_score(2)
+    stone_db.new_pending(2, 0)
+    stone_db.new_pending_details(2, 0)
+    stone_db.next_pending_location(2, (1, 0))
+    stone_db.pending_stones(2)
+    stone_db.get_events_after(stone_db.compaction_horizon(), 100)
+    stone_db.get_events_after(stone_db.compaction_horizon(), 100, (-40, -40, 40, 40))
+    stone_db.latest_event_id()
+    stone_db.update_status(stone_db.get_stone(1, 0)["id"], "Unlocked")
+    stone_db.remove_stone(-1, 0)
+    return statements
+
+
+def query_plans(statements: Iterable[str]) -> List[Tuple[str, List[str]]]:
+    """Return the EXPLAIN QUERY PLAN details for each distinct data statement."""
+
+    import storage  # pylint: disable=import-outside-toplevel
+
+    db = storage.connect()
+    plans = []
+    seen = set()
+    for statement in statements:
+        normalized = " ".join(statement.split())
+        if normalized in seen or not normalized.upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+            continue
+        seen.add(normalized)
+        rows = db.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+        plans.append((normalized, [row[3] for row in rows]))
+    return plans
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        import storage  # pylint: disable=import-outside-toplevel
+
+        storage.db_file = os.path.join(scratch, "database.db")
+        plans = query_plans(exercise_hot_paths())
+
+    failures = 0
+    for statement, details in plans:
+        # "SCAN CONSTANT ROW" is a SELECT without a FROM clause, not a table scan.
+        scans = [detail for detail in details if detail.startswith("SCAN") and detail != "SCAN CONSTANT ROW"]
+        allowed = statement in ALLOWED_SCANS
+        if args.verbose or (scans and not allowed):
+            print(statement)
+            for detail in details:
+                print(f"    {detail}")
+        if scans and not allowed:
+            failures += 1
+    if failures:
+        print(f"{failures} hot statement(s) scan a whole table.", file=sys.stderr)
+        return 1
+    print(f"Checked {len(plans)} statement(s); none scan a whole table.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Fold old board events into a snapshot and delete them."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Iterable
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+DEFAULT_RETENTION_DAYS = 30.0
+DEFAULT_KEEP_SNAPSHOTS = 1
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def positive_int(value: str) -> int:
+    """Parse a string as a strictly positive integer."""
+
+    try:
+        parsed = int(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{value!r} is not an integer") from exc
+    if parsed <= 0:
+        raise argparse.ArgumentTypeError("Value must be positive.")
+    return parsed
+
+
+def non_negative_float(value: str) -> float:
+    """Parse a string as a non-negative float."""
+
+    try:
+        parsed = float(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a number") from exc
+    if parsed < 0:
+        raise argparse.ArgumentTypeError("Value must not be negative.")
+    return parsed
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Fold board events older than the retention horizon into a snapshot of the "
+            "board and delete them. Viewers whose cursor predates the snapshot are told "
+            "to resync."
+        )
+    )
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to compact (default: {DEFAULT_DB_PATH}).",
+    )
+    parser.add_argument(
+        "--retention-days",
+        type=non_negative_float,
+        default=DEFAULT_RETENTION_DAYS,
+        help=f"Keep events newer than this many days (default: {DEFAULT_RETENTION_DAYS:g}).",
+    )
+    parser.add_argument(
+        "--keep-snapshots",
+        type=positive_int,
+        default=DEFAULT_KEEP_SNAPSHOTS,
+        help=f"Number of most recent snapshots to keep (default: {DEFAULT_KEEP_SNAPSHOTS}).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    db_path = args.db_path.resolve()
+    # The storage layer creates `data/` relative to the working directory.
+    os.chdir(PROJECT_ROOT)
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(db_path)
+    import stone_db  # pylint: disable=import-outside-toplevel
+
+    horizon = stone_db.compact_events(args.retention_days * 86400, args.keep_snapshots)
+    if horizon is None:
+        print("Nothing to compact.")
+    else:
+        print(f"Folded board events up to id {horizon} into a snapshot.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
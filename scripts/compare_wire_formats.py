@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Compare the size and encoding time of JSON and compact payloads."""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Tuple
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import wire  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build synthetic /window and /board-changes payloads, check that the "
+            "compact encoding round-trips them, and compare its size and latency with JSON."
+        )
+    )
+    parser.add_argument(
+        "--stones",
+        type=int,
+        default=4000,
+        help="Stones in the synthetic window payload (default: 4000).",
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=1000,
+        help="Events in the synthetic board-changes payload (default: 1000).",
+    )
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=40,
+        help="Distinct players in each payload (default: 40).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=50,
+        help="Timed repetitions of each encoding (default: 50).",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for the synthetic payloads (default: 0).",
+    )
+    return parser.parse_args(argv)
+
+
+def window_payload(rng: random.Random, stones: int, players: int) -> dict:
+    """Build a `/window` payload of randomly placed stones."""
+
+    now = time.time()
+    side = max(1, int((stones * 2) ** 0.5))
+    points = rng.sample(range(side * side), min(stones, side * side))
+    payload = {}
+    for point in points:
+        player = rng.randrange(players)
+        placed = now - rng.uniform(0, 90 * 86400)
+        payload[f"{point % side - side // 2} {point // side - side // 2}"] = {
+            "player_name": f"player{player}",
+            "player_score": 100 + player,
+            "status": rng.choice(wire.statuses),
+            "placement_time": placed,
+            "last_status_change_time": placed + rng.uniform(0, 3600),
+        }
+    return {"success": True, "stones": payload}
+
+
+def events_payload(rng: random.Random, events: int, players: int) -> dict:
+    """Build a `/board-changes` payload of random events."""
+
+    now = time.time()
+    items = []
+    for i in range(events):
+        player = rng.randrange(players)
+        event_type = rng.choice(wire.event_types)
+        items.append({
+            "event_id": 1_000_000 + i,
+            "event_time": now + i * 0.25,
+            "event_type": event_type,
+            "x": rng.randint(-100, 100),
+            "y": rng.randint(-100, 100),
+            "player": player + 2,
+            "placement_time": now - rng.uniform(0, 86400),
+            "last_status_change_time": now + i * 0.25,
+            "status": rng.choice(wire.statuses),
+            "player_name": f"player{player}",
+            "player_score": 100 + player,
+        })
+    return {"next_cursor": str(1_000_000 + events - 1), "has_more": False, "resync": False, "events": items}
+
+
+def time_per_call(fn: Callable[[], object], repeat: int) -> float:
+    """Return the mean seconds per call of `fn` over `repeat` calls."""
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def max_time_error(original: dict, decoded: dict) -> float:
+    """Return the largest timestamp difference between two payloads, checking everything else matches."""
+
+    if "stones" in original:
+        pairs = [(original["stones"][key], decoded["stones"][key]) for key in original["stones"]]
+        if original["stones"].keys() != decoded["stones"].keys():
+            raise AssertionError("Decoded stones are at different points")
+    else:
+        pairs = list(zip(original["events"], decoded["events"]))
+        if len(original["events"]) != len(decoded["events"]):
+            raise AssertionError("Decoded a different number of events")
+
+    error = 0.0
+    for before, after in pairs:
+        if before.keys() != after.keys():
+            raise AssertionError(f"Decoded fields differ: {sorted(before)} vs {sorted(after)}")
+        for field, value in before.items():
+            if field.endswith("_time"):
+                error = max(error, abs(value - after[field]))
+            elif value != after[field]:
+                raise AssertionError(f"Decoded {field} differs: {value!r} vs {after[field]!r}")
+    for field in original:
+        if field not in ("stones", "events") and original[field] != decoded[field]:
+            raise AssertionError(f"Decoded {field} differs")
+    return error
+
+
+def compare(name: str, payload: dict, repeat: int) -> List[Tuple[str, str]]:
+    """Round-trip `payload` and return report lines comparing the two encodings."""
+
+    as_json = json.dumps(payload).encode()
+    compact = wire.encode(payload)
+    error = max_time_error(payload, wire.decode(compact))
+
+    json_encode = time_per_call(lambda: json.dumps(payload).encode(), repeat)
+    compact_encode = time_per_call(lambda: wire.encode(payload), repeat)
+    json_decode = time_per_call(lambda: json.loads(as_json), repeat)
+    compact_decode = time_per_call(lambda: wire.decode(compact), repeat)
+
+    return [
+        (f"{name} size (bytes)", f"json {len(as_json):>10,}   compact {len(compact):>10,}   ratio {len(compact) / len(as_json):.2f}"),
+        (f"{name} gzip size (bytes)", f"json {len(gzip.compress(as_json)):>10,}   compact {len(gzip.compress(compact)):>10,}"),
+        (f"{name} encode (ms)", f"json {json_encode * 1000:>10.3f}   compact {compact_encode * 1000:>10.3f}"),
+        (f"{name} decode (ms)", f"json {json_decode * 1000:>10.3f}   compact {compact_decode * 1000:>10.3f}"),
+        (f"{name} max time error (s)", f"{error:.4f}"),
+    ]
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    lines = compare("window", window_payload(rng, args.stones, args.players), args.repeat)
+    lines += compare("events", events_payload(rng, args.events, args.players), args.repeat)
+
+    width = max(len(label) for label, _ in lines)
+    for label, value in lines:
+        print(f"{label:<{width}}  {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
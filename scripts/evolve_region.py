@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Apply the status changes a move would make around a point, without placing a stone."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Iterable
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Evolve the statuses of every stone in the 13x13 region centred on a point "
+            "as if PLAYER had played there: Locked stones become Pending and the player's "
+            "own Pending stones become Unlocked. No stone is placed."
+        )
+    )
+    parser.add_argument("x", type=int, help="Column of the region's centre.")
+    parser.add_argument("y", type=int, help="Row of the region's centre.")
+    parser.add_argument("player", type=int, help="User id of the player to evolve the region for.")
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to update (default: {DEFAULT_DB_PATH}).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only print the changes that would be made.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    db_path = args.db_path.resolve()
+    # The storage layer creates `data/` relative to the working directory.
+    os.chdir(PROJECT_ROOT)
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(db_path)
+    import move_validation  # pylint: disable=import-outside-toplevel
+    import stone_db  # pylint: disable=import-outside-toplevel
+
+    if args.dry_run:
+        statuses = move_validation.region_status_changes(stone_db.retrieve_region(args.x, args.y), args.player)
+    else:
+        statuses = move_validation.evolve_region_statuses((args.x, args.y), args.player)
+    for (x, y), status in sorted(statuses.items()):
+        print(f"({x}, {y}): {status}")
+
+    verb = "Would change" if args.dry_run else "Changed"
+    print(f"{verb} the status of {len(statuses)} stone(s) around ({args.x}, {args.y}).")
+    if statuses and not args.dry_run:
+        print("A running server keeps its in-memory board until it is restarted.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Recompute per-player stone counts from the stones table and report drift."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Iterable
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the materialized player_stats scores with counts recomputed "
+            "from the stones table, and optionally rewrite them."
+        )
+    )
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to check (default: {DEFAULT_DB_PATH}).",
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help=(
+            "Rewrite player_stats from the stones table. A running server keeps its "
+            "in-memory scores until it is restarted."
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    db_path = args.db_path.resolve()
+    # The storage layer creates `data/` relative to the working directory.
+    os.chdir(PROJECT_ROOT)
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(db_path)
+    import stone_db  # pylint: disable=import-outside-toplevel
+
+    drift = stone_db.reconcile_scores() if args.fix else stone_db.score_drift()
+    for entry in drift:
+        print(f"player {entry['player']}: recorded {entry['recorded']}, actual {entry['actual']}")
+
+    if not drift:
+        print("No drift: player_stats matches the stones table.")
+        return 0
+    if args.fix:
+        print(f"Corrected {len(drift)} player score(s).")
+        return 0
+    print(f"{len(drift)} player score(s) have drifted; rerun with --fix to correct them.", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
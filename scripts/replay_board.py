@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Replay the board_events log: check it against the stones table, or rebuild the board at a point in time."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "database.db"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def parse_time(value: str) -> float:
+    """Parse a Unix timestamp or an ISO 8601 date and time (local time unless it carries an offset)."""
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Not a Unix timestamp or ISO 8601 time: {value}") from exc
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Rebuild the board from the latest snapshot and the board_events log. By default, "
+            "check that the replay reproduces the stones table exactly."
+        )
+    )
+    parser.add_argument(
+        "--db-path",
+        type=Path,
+        default=DEFAULT_DB_PATH,
+        help=f"Path to the SQLite database to replay (default: {DEFAULT_DB_PATH}).",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--at",
+        type=parse_time,
+        help="Print the board as it stood at this time (Unix timestamp or ISO 8601), as JSON.",
+    )
+    mode.add_argument(
+        "--rebuild",
+        action="store_true",
+        help=(
+            "Rewrite the stones table from the replay. Stop the server first: a running "
+            "server keeps its in-memory board until it is restarted."
+        ),
+    )
+    parser.add_argument(
+        "--bbox",
+        type=int,
+        nargs=4,
+        metavar=("X0", "Y0", "X1", "Y1"),
+        help="With --at, only replay the stones within this inclusive bounding box.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Script entry point."""
+
+    args = parse_args(argv)
+    if not args.db_path.exists():
+        print(f"Database not found at {args.db_path}.", file=sys.stderr)
+        return 1
+
+    db_path = args.db_path.resolve()
+    # The storage layer creates `data/` relative to the working directory.
+    os.chdir(PROJECT_ROOT)
+    import storage  # pylint: disable=import-outside-toplevel
+
+    storage.db_file = str(db_path)
+    import replay  # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    if args.at is not None:
+        try:
+            stones = replay.board_at(args.at, tuple(args.bbox) if args.bbox else None)
+        except ValueError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+        print(json.dumps({f"{x} {y}": row for (x, y), row in sorted(stones.items())}, indent=2))
+        print(f"Replayed {len(stones)} stone(s) in {time.perf_counter() - start:.2f}s.", file=sys.stderr)
+        return 0
+
+    if args.rebuild:
+        count = replay.rebuild_stones()
+        print(f"Rewrote the stones table with {count} stone(s) in {time.perf_counter() - start:.2f}s.")
+        return 0
+
+    discrepancies = replay.verify()
+    for entry in discrepancies:
+        print(f"({entry['x']}, {entry['y']}): table {entry['table']}, replay {entry['replay']}")
+    if discrepancies:
+        print(f"{len(discrepancies)} point(s) differ; rerun with --rebuild to rewrite the stones table.", file=sys.stderr)
+        return 1
+    print(f"The log reproduces the stones table exactly ({time.perf_counter() - start:.2f}s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -53,6 +53,17 @@ def parse_args() -> argparse.Namespace:
         default=30,
         help="Number of backups to retain when the job runs (0 disables pruning).",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Take incremental backups (a weekly full base plus daily event segments) instead of full copies.",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0.0,
+        help="Most MiB per second for full copies, passed through to backup_db.py (default: 0, unlimited).",
+    )
     parser.add_argument(
         "--log-file",
         type=Path,
@@ -118,6 +129,10 @@ def build_cron_entry(args: argparse.Namespace) -> str:
     ]
     if args.label:
         cmd_parts.append(f"--label {shlex.quote(args.label)}")
+    if args.incremental:
+        cmd_parts.append("--incremental")
+    if args.rate_limit > 0:
+        cmd_parts.append(f"--rate-limit {args.rate_limit:g}")
     command = " ".join(cmd_parts) + f" >> {shlex.quote(str(log_path))} 2>&1"
 
     return f"{args.minute} {args.hour} * * * {command}"
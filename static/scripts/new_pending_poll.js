@@ -1,23 +1,31 @@
+// Flag the "Cycle pending stones" button and tab title when one of the player's stones becomes pending
+function markNewPending() {
+    var cyclePendingButton = document.getElementById("cyclePending");
+    if (cyclePendingButton && !cyclePendingButton.innerText.includes('(NEW)')) {
+        cyclePendingButton.innerText = "*" + cyclePendingButton.innerText + " (NEW)*";
+    }
+    if (!/^\*.*\*$/.test(document.title)) {
+        document.title = "*" + document.title + "*";
+    }
+}
+
 function newPendingPoll(pollUrl) {
     setTimeout(function () {
+    // While the board stream is connected it reports new pending stones itself
+    if (window.boardStreamConnected) {
+        newPendingPoll(pollUrl);
+        return;
+    }
     fetch(pollUrl)
         .then(response => response.json())
         .then(payload => {
             // Backward compatible: old server returned boolean
             if (payload === true) {
-                var cyclePendingButton = document.getElementById("cyclePending");
-                if (cyclePendingButton && !cyclePendingButton.innerText.includes('(NEW)')) {
-                    cyclePendingButton.innerText = "*" + cyclePendingButton.innerText + " (NEW)*";
-                }
-                document.title = "*" + document.title + "*";
+                markNewPending();
                 return; // do not schedule another poll to avoid spamming until user acts or next page load
             }
             if (payload && payload.hasNew) {
-                var cyclePendingButton = document.getElementById("cyclePending");
-                if (cyclePendingButton && !cyclePendingButton.innerText.includes('(NEW)')) {
-                    cyclePendingButton.innerText = "*" + cyclePendingButton.innerText + " (NEW)*";
-                }
-                document.title = "*" + document.title + "*";
+                markNewPending();
                 // Trigger region auto-refresh and keep client state in sync without requiring a click
                 if (typeof window.onNewPendingStone === 'function') {
                     window.onNewPendingStone({ x: Number(payload.x), y: Number(payload.y) });
@@ -90,8 +90,33 @@ window.centerOnWorldCoord = function(x, y) {
     const halfCellsY = displayHeight() / (2 * rulingSpacing);
     _x = Number(x) - halfCellsX;
     _y = Number(y) - halfCellsY;
+    viewportChanged();
 };
 
+// Visible world rectangle as integer bounds [x0, y0, x1, y1] (inclusive)
+window.visibleWorldBounds = function() {
+    return [
+        Math.floor(x()),
+        Math.floor(y()),
+        Math.ceil(x() + displayWidth() / rulingSpacing),
+        Math.ceil(y() + displayHeight() / rulingSpacing)
+    ];
+};
+
+// Notify window.onViewportSettled(bounds) once a pan or zoom has come to rest,
+// so the viewer can fetch stones for the newly visible area
+const VIEWPORT_SETTLE_DELAY = 150; // ms
+let viewportSettleTimer = null;
+function viewportChanged() {
+    if (viewportSettleTimer !== null) clearTimeout(viewportSettleTimer);
+    viewportSettleTimer = setTimeout(() => {
+        viewportSettleTimer = null;
+        if (typeof window.onViewportSettled === 'function') {
+            window.onViewportSettled(window.visibleWorldBounds());
+        }
+    }, VIEWPORT_SETTLE_DELAY);
+}
+
 // Center viewport and reset zoom to the initial level
 window.centerAndResetZoom = function(x, y) {
     // Reset to initial but clamp to dynamic range for current canvas size
@@ -141,12 +166,14 @@ canvas.addEventListener("mousemove", (e) => {
                 window.suppressNextClickSelection = true;
             }
         }
+        const wasPanning = panning;
         _x += _x_offset / rulingSpacing;
         _y += _y_offset / rulingSpacing;
         _x_offset = 0;
         _y_offset = 0;
         panning = false;
         hideTooltip();
+        if (wasPanning) viewportChanged();
     });
 });
 
@@ -180,6 +207,7 @@ canvas.addEventListener("wheel", (e) => {
     var new_cursor_world_coords = canvas2World(mouseX(e), mouseY(e));
     _x += cursor_world_coords[0] - new_cursor_world_coords[0];
     _y += cursor_world_coords[1] - new_cursor_world_coords[1];
+    viewportChanged();
 }, { passive: false });
 
 // Pointer events for touch drag and pinch zoom on mobile devices
@@ -314,6 +342,7 @@ function endPointer(e) {
         pinchZooming = false;
         panPointerId = null;
         hideTooltip();
+        viewportChanged();
     } else if (activePointers.size === 1) {
         // Transition from pinch to pan with remaining pointer
         const [remainingId, pt] = Array.from(activePointers.entries())[0];
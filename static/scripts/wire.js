@@ -0,0 +1,113 @@
+// Decoder for the compact binary payloads described in wire.py
+const COMPACT_MEDIA_TYPE = 'application/vnd.infinite-go.compact';
+const COMPACT_STATUSES = ['Unlocked', 'Pending', 'Locked'];
+const COMPACT_EVENT_TYPES = ['place', 'status', 'remove'];
+const COMPACT_NO_PLAYER = 0xFFFF;
+const COMPACT_NO_STATUS = 0xFF;
+const COMPACT_NO_INT32 = -2147483648;
+
+// Decode an ArrayBuffer into the same object the endpoint would have sent as JSON
+function decodeCompact(buffer) {
+    const view = new DataView(buffer);
+    const bytes = new Uint8Array(buffer);
+    const text = new TextDecoder();
+    if (text.decode(bytes.subarray(0, 4)) !== 'IGW1') throw new Error('Not a compact payload');
+
+    const kind = view.getUint8(4);
+    const timeBase = view.getFloat64(8, true);
+    const timeUnit = view.getFloat64(16, true);
+    const idBase = view.getFloat64(24, true);
+    const count = view.getUint32(32, true);
+    const metaLen = view.getUint32(36, true);
+    let offset = 40;
+    const payload = JSON.parse(text.decode(bytes.subarray(offset, offset + metaLen)));
+    offset += metaLen;
+
+    const playerCount = view.getUint32(offset, true);
+    offset += 4;
+    const players = [];
+    for (let i = 0; i < playerCount; i++) {
+        const id = view.getInt32(offset, true);
+        const score = view.getInt32(offset + 4, true);
+        const nameLen = view.getUint16(offset + 8, true);
+        offset += 10;
+        let name = null;
+        if (nameLen !== COMPACT_NO_PLAYER) {
+            name = text.decode(bytes.subarray(offset, offset + nameLen));
+            offset += nameLen;
+        }
+        players.push({
+            player: id === -1 ? null : id,
+            player_name: name,
+            player_score: score === COMPACT_NO_INT32 ? null : score,
+        });
+    }
+
+    // Columns are read in the order wire.encode writes them
+    function column(size, read) {
+        const values = new Array(count);
+        for (let i = 0; i < count; i++) values[i] = read(offset + i * size);
+        offset += size * count;
+        return values;
+    }
+    const int32 = () => column(4, o => view.getInt32(o, true));
+    const uint16 = () => column(2, o => view.getUint16(o, true));
+    const uint8 = () => column(1, o => view.getUint8(o));
+    const times = () => int32().map(t => t === COMPACT_NO_INT32 ? null : timeBase + t * timeUnit);
+    const undelta = (deltas, start) => deltas.map(d => (start += d));
+
+    const isEvents = kind === 2;
+    const eventIds = isEvents ? undelta(int32(), idBase) : null;
+    const types = isEvents ? uint8() : null;
+    const xs = undelta(int32(), 0);
+    const ys = undelta(int32(), 0);
+    const indices = uint16();
+    const statuses = uint8();
+    const timeColumns = [];
+    for (let c = 0; c < (isEvents ? 3 : 2); c++) timeColumns.push(times());
+
+    const items = [];
+    for (let i = 0; i < count; i++) {
+        const player = indices[i] === COMPACT_NO_PLAYER ? { player: null, player_name: null, player_score: null } : players[indices[i]];
+        items.push({
+            player: player.player,
+            player_name: player.player_name,
+            player_score: player.player_score,
+            status: statuses[i] === COMPACT_NO_STATUS ? null : COMPACT_STATUSES[statuses[i]],
+        });
+    }
+
+    if (isEvents) {
+        payload.events = items.map((item, i) => Object.assign(item, {
+            event_id: eventIds[i],
+            event_type: COMPACT_EVENT_TYPES[types[i]],
+            x: xs[i],
+            y: ys[i],
+            event_time: timeColumns[0][i],
+            placement_time: timeColumns[1][i],
+            last_status_change_time: timeColumns[2][i],
+        }));
+    } else {
+        payload.stones = {};
+        items.forEach((item, i) => {
+            delete item.player;
+            item.placement_time = timeColumns[0][i];
+            item.last_status_change_time = timeColumns[1][i];
+            payload.stones[`${xs[i]} ${ys[i]}`] = item;
+        });
+    }
+    return payload;
+}
+
+// Fetch a stones or events payload in the compact encoding, falling back to JSON
+// when the server answers with JSON (e.g. for errors)
+function fetchPayload(url) {
+    const compactUrl = url + (url.includes('?') ? '&' : '?') + 'format=compact';
+    return fetch(compactUrl).then(response => {
+        const type = response.headers.get('Content-Type') || '';
+        if (type.startsWith(COMPACT_MEDIA_TYPE)) {
+            return response.arrayBuffer().then(decodeCompact);
+        }
+        return response.json();
+    });
+}
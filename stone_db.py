@@ -1,14 +1,32 @@
-import errno
-import os
+import heapq
 import sqlite3
-from time import time
+import threading
+from time import sleep, time
 
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-db_file = "data/database.db"
+import board_index
+import broadcaster
+import groups
+import migrations
+import pending_index
+import region_cache
+import storage
 
 pending_timeout = 86400 # Seconds.
 
+# Held while computing and committing any change to the board, so that
+# the database and the in-memory board stay in step.
+write_lock = threading.RLock()
+
+# Min-heap of (deadline, x, y, pending since) for stones that were made
+# Pending. Entries are not removed when a stone stops being Pending; they
+# are skipped when they come due instead.
+_pending_deadlines: List[Tuple[float, int, int, float]] = []
+
+# Stones held by each player, mirroring the player_stats table.
+_scores: Dict[int, int] = {}
+
 def get_stone(x: int, y: int):
     """
     Retrieves the stone at the specified location. If one does not exist,
@@ -16,73 +34,28 @@ def get_stone(x: int, y: int):
     """
     unlock_stale_pending()
 
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-
-        try:
-            cur.execute(f"""SELECT * FROM stones WHERE x={x} AND y={y};""")
-        except:
-            return None
-        
-        entry = cur.fetchone()
-
-        if entry is None:
-            return None
-        
-        return {
-            "id":                      entry[0],
-            "player":                  entry[3],
-            "placement_time":          entry[4],
-            "last_status_change_time": entry[5],
-            "status":                  entry[6],
-        }
+    return board_index.get(x, y)
 
 def new_pending(user_id: int, since: float) -> bool:
     """
     Determines if there are any new pending stones belonging to the player.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-
-        cur.execute("""SELECT
-            *
-        FROM
-            stones
-        WHERE
-            player = ? AND
-            status = 'Pending' AND
-            last_status_change_time > ?;""",
-        [user_id, since])
-
-        if cur.fetchone() is None:
-            return False # No new pending stone was found.
-        
-        return True # A pending stone was found.
+    return new_pending_details(user_id, since) is not None
 
 def new_pending_details(user_id: int, since: float):
     """
     Returns details for the oldest stone (by last_status_change_time) that became Pending
     after `since` for the given user. If none exist, returns None.
     The return shape is a dict: { "x": int, "y": int, "last_status_change_time": float }.
+    Served from `pending_index` without touching the database.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-
-        cur.execute(
-            """
-            SELECT x, y, last_status_change_time
-            FROM stones
-            WHERE player = ? AND status = 'Pending' AND last_status_change_time > ?
-            ORDER BY last_status_change_time ASC
-            LIMIT 1;
-            """,
-            [user_id, since]
-        )
+    unlock_stale_pending()
 
-        row = cur.fetchone()
-        if row is None:
-            return None
-        return {"x": row[0], "y": row[1], "last_status_change_time": row[2]}
+    entry = pending_index.oldest_after(user_id, since)
+    if entry is None:
+        return None
+    pending_since, x, y = entry
+    return {"x": x, "y": y, "last_status_change_time": pending_since}
 
 def next_pending_location(user_id: int, current_coords: Optional[Tuple[int, int]] = None) -> Optional[Tuple[int, int]]:
     """
@@ -92,144 +65,439 @@ def next_pending_location(user_id: int, current_coords: Optional[Tuple[int, int]
     successively younger pending stones. If there is no younger pending stone, the coordinates of the
     oldest pending stone are returned. If there are no pending stones at all, None is returned.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-
-        current_stone_pending_since = 0 # Will always be older than any stone.
-        if current_coords is not None:
-            current_stone = get_stone(*current_coords)
-            if current_stone is not None and current_stone["player"] == user_id and current_stone["status"] == "Pending":
-                # The current stone belongs to the player and is pending.
-                current_stone_pending_since = current_stone["last_status_change_time"]
-        
-        query = """SELECT
-            x, y
-        FROM
-            stones
-        WHERE
-            player = ? AND
-            status = 'Pending' AND
-            last_status_change_time > ?
-        ORDER BY
-            last_status_change_time ASC;"""
-        
-        cur.execute(query, [user_id, current_stone_pending_since])
-
-        next_pending_coords = cur.fetchone()
-
-        # A younger pending stone exists.
-        if next_pending_coords is not None:
-            return next_pending_coords
-        
-        # Otherwise, a younger pending stone does not exist.
-        
-        # Retrieve the oldest stone.
-        cur.execute(query, [user_id, 0])
-
-        next_pending_coords = cur.fetchone()
-
-        # Return either the coords of the oldest pending stone, or None if no such stone exists.
-        return next_pending_coords
-
-def _log_board_event(event_type: str, x: int, y: int, player: Optional[int], placement_time: Optional[float], last_status_change_time: Optional[float], status: Optional[str], event_time: Optional[float] = None):
-    """
-    Append a row to the board_events table capturing a mutation to the board.
-    - event_type: 'place' | 'status' | 'remove'
-    - x, y: board coordinates affected
-    - player, placement_time, last_status_change_time, status: fields from the stone row
-      (for removals, these reflect the values prior to deletion)
-    - event_time: optional explicit event timestamp (defaults to now())
-    """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-        ts = event_time if event_time is not None else time()
+    unlock_stale_pending()
+
+    current_stone_pending_since = 0 # Will always be older than any stone.
+    if current_coords is not None:
+        pending_since = pending_index.pending_since(*current_coords, user_id)
+        if pending_since is not None:
+            # The current stone belongs to the player and is pending.
+            current_stone_pending_since = pending_since
+
+    # A younger pending stone, or failing that the oldest one.
+    entry = pending_index.oldest_after(user_id, current_stone_pending_since) or pending_index.oldest_after(user_id, 0)
+
+    # Return either the coords of the chosen pending stone, or None if no such stone exists.
+    return None if entry is None else (entry[1], entry[2])
+
+def write_deltas(cur: sqlite3.Cursor, deltas: List[dict]):
+    """
+    Writes a sequence of board deltas to the stones table, and appends a
+    matching row to the board_events table for each, using the caller's
+    cursor so that everything lands in the caller's transaction.
+    Each delta is a dict with the same fields as a board event:
+    { "event_type", "event_time", "x", "y", "player", "placement_time",
+      "last_status_change_time", "status" }, plus "stone_id" for status
+    changes. The "stone_id" of placed stones and the "event_id" of every
+    delta are filled in here.
+    """
+    # Status changes and removals are batched; placements need their own
+    # statement to learn the new stone's id. Removals go last so that a
+    # stone placed and removed by suicide in the same batch is deleted.
+    cur.executemany("""UPDATE stones SET
+        status = ?,
+        last_status_change_time = ?
+    WHERE
+        id = ?;""",
+    [
+        [delta["status"], delta["last_status_change_time"], delta["stone_id"]]
+        for delta in deltas if delta["event_type"] == "status"
+    ])
+
+    for delta in deltas:
+        if delta["event_type"] == "place":
+            cur.execute("""INSERT INTO stones (
+                x,
+                y,
+                player,
+                placement_time,
+                last_status_change_time,
+                status
+            ) VALUES (?, ?, ?, ?, ?, ?);""",
+            [delta["x"], delta["y"], delta["player"], delta["placement_time"], delta["last_status_change_time"], delta["status"]])
+            delta["stone_id"] = cur.lastrowid
+
+    cur.executemany("DELETE FROM stones WHERE x = ? AND y = ?;", [
+        [delta["x"], delta["y"]]
+        for delta in deltas if delta["event_type"] == "remove"
+    ])
+
+    cur.executemany(
+        """
+        INSERT INTO board_events (
+            event_time, event_type, x, y, chunk_x, chunk_y, player, placement_time, last_status_change_time, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """,
+        [
+            [delta["event_time"], delta["event_type"], delta["x"], delta["y"], *board_index.chunk_of(delta["x"], delta["y"]), delta["player"], delta["placement_time"], delta["last_status_change_time"], delta["status"]]
+            for delta in deltas
+        ]
+    )
+    # Event ids are consecutive: the caller's immediate transaction keeps
+    # out any other writer.
+    cur.execute("SELECT last_insert_rowid();")
+    last_event_id = cur.fetchone()[0]
+    for i, delta in enumerate(deltas):
+        delta["event_id"] = last_event_id - len(deltas) + 1 + i
+
+    score_changes = _score_changes(deltas)
+    cur.executemany("""INSERT INTO player_stats (player, stone_count) VALUES (?, ?)
+        ON CONFLICT (player) DO UPDATE SET stone_count = stone_count + excluded.stone_count;""",
+    [[player, change] for player, change in score_changes.items() if change != 0])
+
+def _score_changes(deltas: List[dict]) -> Dict[int, int]:
+    """
+    Returns the net change in each player's stone count made by deltas.
+    """
+    changes: Dict[int, int] = {}
+    for delta in deltas:
+        if delta["event_type"] == "place":
+            changes[delta["player"]] = changes.get(delta["player"], 0) + 1
+        elif delta["event_type"] == "remove":
+            changes[delta["player"]] = changes.get(delta["player"], 0) - 1
+    return changes
+
+def make_delta(event_type: str, event_time: float, x: int, y: int, row: dict) -> dict:
+    """
+    Builds a board delta for `write_deltas` from the stone `row` at (x, y),
+    which should already hold the stone's values after the change
+    (or, for removals, its values prior to deletion).
+    """
+    return {
+        "event_type":              event_type,
+        "event_time":              event_time,
+        "x":                       x,
+        "y":                       y,
+        "event_id":                None,
+        "stone_id":                row["id"],
+        "player":                  row["player"],
+        "placement_time":          row["placement_time"],
+        "last_status_change_time": row["last_status_change_time"],
+        "status":                  row["status"],
+    }
+
+def apply_deltas(deltas: List[dict]):
+    """
+    Brings the in-memory board index, chains, pending stones and scores up
+    to date with deltas which have been committed with `write_deltas`,
+    drops the cached payloads of the chunks they touch, then publishes
+    them to `broadcaster` subscribers.
+    """
+    removed = []
+    for delta in deltas:
+        x, y = delta["x"], delta["y"]
+        if delta["event_type"] == "remove":
+            board_index.discard(x, y)
+            pending_index.discard(x, y)
+            removed.append((x, y))
+            continue
+
+        # Chains are updated once per run of removals, e.g. a whole captured group.
+        if removed:
+            groups.remove_stones(removed)
+            removed = []
+
+        if delta["event_type"] == "place":
+            board_index.put(x, y, {
+                "id":                      delta["stone_id"],
+                "player":                  delta["player"],
+                "placement_time":          delta["placement_time"],
+                "last_status_change_time": delta["last_status_change_time"],
+                "status":                  delta["status"],
+            })
+            groups.add_stone(x, y, delta["player"])
+        elif delta["event_type"] == "status":
+            board_index.update(x, y, status=delta["status"], last_status_change_time=delta["last_status_change_time"])
+
+        if delta["status"] == "Pending":
+            pending_index.set_pending(x, y, delta["player"], delta["last_status_change_time"])
+            _schedule_expiry(x, y, delta["last_status_change_time"])
+        else:
+            pending_index.discard(x, y)
+    if removed:
+        groups.remove_stones(removed)
+
+    region_cache.invalidate({board_index.chunk_of(delta["x"], delta["y"]) for delta in deltas})
+
+    for player, change in _score_changes(deltas).items():
+        _scores[player] = _scores.get(player, 0) + change
+
+    broadcaster.publish(deltas)
+
+def _commit_deltas(deltas: List[dict]):
+    """
+    Writes deltas in a single transaction, then applies them to the
+    in-memory board. Callers must hold `write_lock`.
+    """
+    if deltas == []:
+        return
+    with storage.transaction(immediate=True) as cur:
+        write_deltas(cur, deltas)
+    apply_deltas(deltas)
+
+def get_events_after(cursor: int, limit: int, bbox: Optional[Tuple[int, int, int, int]] = None) -> Tuple[List[dict], int, bool]:
+    """
+    Retrieves up to `limit` board events with ids greater than `cursor`,
+    with each run of events for the same point compressed into its last
+    event, which carries the point's final state. With `bbox`, an inclusive
+    rectangle (x0, y0, x1, y1), only events within it are retrieved, and
+    only the chunks it overlaps are read.
+    Returns (events, next cursor, whether more events remain), with events
+    sorted by ascending "event_id". Once no more events remain, the next
+    cursor is the latest event's, even if the events after `cursor` were
+    all outside `bbox`.
+    """
+    cur = storage.cursor()
+
+    head = latest_event_id()
+    if bbox is None:
         cur.execute(
             """
-            INSERT INTO board_events (
-                event_time, event_type, x, y, player, placement_time, last_status_change_time, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+            SELECT id, event_time, event_type, x, y, player, placement_time, last_status_change_time, status
+            FROM board_events
+            WHERE id > ? AND id <= ?
+            ORDER BY id ASC
+            LIMIT ?;
             """,
-            [ts, event_type, x, y, player, placement_time, last_status_change_time, status]
+            [cursor, head, limit + 1]
         )
+    else:
+        x0, y0, x1, y1 = bbox
+        cx0, cy0 = board_index.chunk_of(x0, y0)
+        cx1, cy1 = board_index.chunk_of(x1, y1)
+        chunk_xs = list(range(cx0, cx1 + 1))
+        chunk_ys = list(range(cy0, cy1 + 1))
+        cur.execute(
+            f"""
+            SELECT id, event_time, event_type, x, y, player, placement_time, last_status_change_time, status
+            FROM board_events
+            WHERE
+                chunk_x IN ({", ".join("?" * len(chunk_xs))}) AND
+                chunk_y IN ({", ".join("?" * len(chunk_ys))}) AND
+                id > ? AND id <= ? AND
+                x BETWEEN ? AND ? AND
+                y BETWEEN ? AND ?
+            ORDER BY id ASC
+            LIMIT ?;
+            """,
+            [*chunk_xs, *chunk_ys, cursor, head, x0, x1, y0, y1, limit + 1]
+        )
+    rows = cur.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for row in rows:
+        event = _event_from_row(row)
+        # Re-inserting moves the point after every other point seen so far.
+        latest.pop((event["x"], event["y"]), None)
+        latest[(event["x"], event["y"])] = event
+
+    next_cursor = rows[-1][0] if has_more else max(head, cursor)
+    return list(latest.values()), next_cursor, has_more
+
+def _event_from_row(row: tuple) -> dict:
+    return {
+        "event_id": row[0],
+        "event_time": row[1],
+        "event_type": row[2],
+        "x": row[3],
+        "y": row[4],
+        "player": row[5],
+        "placement_time": row[6],
+        "last_status_change_time": row[7],
+        "status": row[8],
+    }
+
+def latest_event_id() -> int:
+    """
+    Returns the id of the most recent board event, which is the cursor a
+    client holding the current board should resume from.
+    """
+    cur = storage.cursor()
 
+    cur.execute("SELECT MAX(id) FROM board_events;")
+    event_id = cur.fetchone()[0]
+    if event_id is None:
+        # Every event has been compacted away.
+        return compaction_horizon()
+    return event_id
 
-def get_events_since(since_epoch: float):
+def compaction_horizon() -> int:
     """
-    Retrieve all board mutation events with event_time strictly greater than `since_epoch`.
-    Returns a list of dicts sorted by ascending event_time for client consumption.
+    Returns the id of the last board event folded into the latest snapshot.
+    Events up to it may have been deleted, so cursors older than it cannot
+    be resumed.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    cur = storage.cursor()
+
+    cur.execute("SELECT MAX(event_id) FROM snapshots;")
+    return cur.fetchone()[0] or 0
+
+def snapshot_stones(snapshot_id: int) -> Dict[Tuple[int, int], dict]:
+    """
+    Retrieves the stones recorded in the snapshot taken after board event
+    `snapshot_id`, keyed by (x, y). Snapshot stones carry no "id".
+    """
+    cur = storage.cursor()
+
+    cur.execute("""SELECT
+        x, y, player, placement_time, last_status_change_time, status
+    FROM
+        snapshot_stones
+    WHERE
+        snapshot_id = ?;""",
+    [snapshot_id])
+
+    return {
+        (x, y): {
+            "player":                  player,
+            "placement_time":          placement_time,
+            "last_status_change_time": last_status_change_time,
+            "status":                  status,
+        }
+        for x, y, player, placement_time, last_status_change_time, status in cur.fetchall()
+    }
+
+def fold_events(stones: Dict[Tuple[int, int], dict], events: List[dict]):
+    """
+    Applies board events, in order, to `stones` (keyed by (x, y), as
+    returned by `snapshot_stones`) in place.
+    """
+    for event in events:
+        coords = (event["x"], event["y"])
+        if event["event_type"] == "remove":
+            stones.pop(coords, None)
+        else:
+            stones[coords] = {
+                "player":                  event["player"],
+                "placement_time":          event["placement_time"],
+                "last_status_change_time": event["last_status_change_time"],
+                "status":                  event["status"],
+            }
+
+def compact_events(retention: float, keep_snapshots: int = 1) -> Optional[int]:
+    """
+    Folds board events older than `retention` seconds into a new snapshot
+    and deletes them, keeping the newest `keep_snapshots` snapshots.
+    Returns the id of the last event folded in, or None if there was
+    nothing to compact.
+    """
+    # Build the snapshot in a read transaction, so that writers are only
+    # held up while it is stored. Snapshots and old events never change,
+    # so it stays valid unless another compaction commits first.
+    with storage.transaction() as cur:
+        base = compaction_horizon()
+        cur.execute("SELECT MAX(id) FROM board_events WHERE event_time < ?;", [time() - retention])
+        horizon = cur.fetchone()[0]
+        if horizon is None or horizon <= base:
+            return None
+
+        stones = snapshot_stones(base)
         cur.execute(
             """
-            SELECT event_time, event_type, x, y, player, placement_time, last_status_change_time, status
+            SELECT id, event_time, event_type, x, y, player, placement_time, last_status_change_time, status
             FROM board_events
-            WHERE event_time > ?
-            ORDER BY event_time ASC;
+            WHERE id > ? AND id <= ?
+            ORDER BY id ASC;
             """,
-            [since_epoch]
+            [base, horizon]
         )
-        rows = cur.fetchall()
-        events = []
-        for r in rows:
-            events.append({
-                "event_time": r[0],
-                "event_type": r[1],
-                "x": r[2],
-                "y": r[3],
-                "player": r[4],
-                "placement_time": r[5],
-                "last_status_change_time": r[6],
-                "status": r[7],
-            })
-        return events
+        events = [_event_from_row(row) for row in cur.fetchall()]
+        fold_events(stones, events)
+
+    with storage.transaction(immediate=True) as cur:
+        if compaction_horizon() != base:
+            return None # Another compaction got there first.
+
+        cur.execute("INSERT INTO snapshots (event_id, created_time, event_time) VALUES (?, ?, ?);", [horizon, time(), events[-1]["event_time"]])
+        cur.executemany("""INSERT INTO snapshot_stones (
+            snapshot_id, x, y, player, placement_time, last_status_change_time, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?);""",
+        [
+            [horizon, x, y, row["player"], row["placement_time"], row["last_status_change_time"], row["status"]]
+            for (x, y), row in stones.items()
+        ])
+        cur.execute("DELETE FROM board_events WHERE id <= ?;", [horizon])
+
+        cur.execute("SELECT event_id FROM snapshots ORDER BY event_id DESC LIMIT -1 OFFSET ?;", [max(keep_snapshots, 1)])
+        expired = [[row[0]] for row in cur.fetchall()]
+        cur.executemany("DELETE FROM snapshot_stones WHERE snapshot_id = ?;", expired)
+        cur.executemany("DELETE FROM snapshots WHERE event_id = ?;", expired)
+
+    return horizon
 
 def place_stone(player: int, x: int, y: int):
     """
     Places a stone by the specified player at a particular location.
-    Note: This does not check if another stone already exists there.
+    Note: This does not check if another stone already exists there;
+    if one does, the unique (x, y) index raises sqlite3.IntegrityError.
     Also logs a 'place' event for clients to consume as an efficient delta.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-
+    with write_lock:
         placement_time = time()
-        cur.execute(f"""INSERT INTO stones (
-            x,
-            y,
-            player,
-            placement_time,
-            last_status_change_time,
-            status
-        ) VALUES (
-            {x},
-            {y},
-            {player},
-            {placement_time},
-            {placement_time},
-            'Locked'
-        );""")
-    # Log after successful insert
-    _log_board_event(
-        event_type="place",
-        x=x,
-        y=y,
-        player=player,
-        placement_time=placement_time,
-        last_status_change_time=placement_time,
-        status="Locked",
-    )
-
-def player_score(user_id: int) -> Optional[int]:
+        _commit_deltas([make_delta("place", placement_time, x, y, {
+            "id":                      None,
+            "player":                  player,
+            "placement_time":          placement_time,
+            "last_status_change_time": placement_time,
+            "status":                  "Locked",
+        })])
+
+def player_score(user_id: int) -> int:
     """
     Counts how many stones belong to the specified player.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    return _scores.get(user_id, 0)
+
+def scores_for(user_ids) -> Dict[int, int]:
+    """
+    Counts how many stones belong to each of the specified players.
+    Returns a dict of the form { user_id: score }.
+    """
+    return { user_id: _scores.get(user_id, 0) for user_id in user_ids }
+
+def score_drift() -> List[dict]:
+    """
+    Recomputes every player's stone count from the stones table and
+    compares it with the player_stats table.
+    Returns a list of discrepancies, each a dict of the form
+    { "player", "recorded", "actual" }.
+    """
+    cur = storage.cursor()
 
-        cur.execute("SELECT COUNT(id) FROM stones WHERE player = ?;", [user_id])
+    cur.execute("SELECT player, COUNT(id) FROM stones GROUP BY player;")
+    actual = dict(cur.fetchall())
+    cur.execute("SELECT player, stone_count FROM player_stats;")
+    recorded = dict(cur.fetchall())
 
-        return cur.fetchone()[0]
+    return [
+        { "player": player, "recorded": recorded.get(player, 0), "actual": actual.get(player, 0) }
+        for player in sorted(set(actual) | set(recorded))
+        if recorded.get(player, 0) != actual.get(player, 0)
+    ]
+
+def reconcile_scores() -> List[dict]:
+    """
+    Rewrites the player_stats table from the stones table and reloads the
+    in-memory scores. Returns the discrepancies that were corrected, as
+    reported by `score_drift`.
+    """
+    with write_lock:
+        with storage.transaction(immediate=True) as cur:
+            drift = score_drift()
+            cur.execute("DELETE FROM player_stats;")
+            cur.execute("""INSERT INTO player_stats (player, stone_count)
+                SELECT player, COUNT(id) FROM stones GROUP BY player;""")
+        _load_scores()
+    return drift
+
+def _load_scores():
+    cur = storage.cursor()
+
+    cur.execute("SELECT player, stone_count FROM player_stats;")
+    _scores.clear()
+    _scores.update(cur.fetchall())
 
 def remove_stone(x, y):
     """
@@ -237,21 +505,23 @@ def remove_stone(x, y):
     Note: Does not throw errors when the stone does not exist.
     Also logs a 'remove' event including the prior stone attributes for delta queries.
     """
-    # Capture existing values to include in the event log
-    existing = get_stone(x, y)
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-        cur.execute("DELETE FROM stones WHERE x = ? AND y = ?;", [x, y])
-    if existing is not None:
-        _log_board_event(
-            event_type="remove",
-            x=x,
-            y=y,
-            player=existing.get("player"),
-            placement_time=existing.get("placement_time"),
-            last_status_change_time=existing.get("last_status_change_time"),
-            status=existing.get("status"),
-        )
+    remove_stones([(x, y)])
+
+def remove_stones(locations: List[Tuple[int, int]]):
+    """
+    Removes any stones at the specified locations, e.g. a captured group,
+    in one transaction, logging a 'remove' event for each stone that existed.
+    Unlike repeated calls to `remove_stone`, the chains in `groups` are
+    updated once for the whole batch.
+    """
+    with write_lock:
+        removal_time = time()
+        deltas = []
+        for x, y in locations:
+            stone = board_index.get(x, y)
+            if stone is not None:
+                deltas.append(make_delta("remove", removal_time, x, y, stone))
+        _commit_deltas(deltas)
 
 def retrieve_region(x, y):
     """
@@ -260,148 +530,223 @@ def retrieve_region(x, y):
     """
     unlock_stale_pending()
 
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    return board_index.region(x - 6, y - 6, x + 6, y + 6)
 
-        cur.execute(f"""SELECT * FROM stones WHERE
-            (x BETWEEN {x-6} AND {x+6}) AND
-            (y BETWEEN {y-6} AND {y+6});""")
-        
-        stone_entries = cur.fetchall()
+def retrieve_window(x0: int, y0: int, x1: int, y1: int) -> Dict[Tuple[int, int], dict]:
+    """
+    Retrieves all stones within the inclusive rectangle spanned by (x0, y0)
+    and (x1, y1).
+    """
+    unlock_stale_pending()
 
-        stones = {}
+    return board_index.region(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
 
-        for entry in stone_entries:
-            stones[(entry[1], entry[2])] = {
-                "id":                      entry[0],
-                "player":                  entry[3],
-                "placement_time":          entry[4],
-                "last_status_change_time": entry[5],
-                "status":                  entry[6],
-            }
+def window_version(x0: int, y0: int, x1: int, y1: int) -> tuple:
+    """
+    Returns a value which changes whenever a stone within the inclusive
+    rectangle spanned by (x0, y0) and (x1, y1), or the score of a player
+    holding a stone near it, changes. Read from memory, so it is cheap
+    enough to check before deciding whether to retrieve the stones.
+    """
+    unlock_stale_pending()
+
+    chunks = list(board_index.chunks_overlapping(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)))
+    scores = scores_for(board_index.chunk_players(chunks))
+    return (tuple(board_index.chunk_versions(chunks)), tuple(sorted(scores.items())))
 
-        return stones
+def retrieve_chunk(cx: int, cy: int) -> Tuple[int, Dict[Tuple[int, int], dict]]:
+    """
+    Retrieves the version of the chunk (cx, cy) of `board_index`, and
+    the stones within it as of that version.
+    """
+    unlock_stale_pending()
+
+    return board_index.chunk((cx, cy))
+
+def pending_stones(user_id: int) -> Dict[Tuple[int, int], dict]:
+    """
+    Retrieves all of the player's Pending stones.
+    """
+    unlock_stale_pending()
+
+    stones = {}
+    for _, x, y in pending_index.stones(user_id):
+        row = board_index.get(x, y)
+        if row is not None:
+            stones[(x, y)] = row
+    return stones
 
 def retrieve():
     """
-    Retrieves all stones.
-    TODO: Add filtering options (e.g. regional retrieval).
+    Retrieves all stones. For a window of the board, use `retrieve_window`.
     """
     unlock_stale_pending()
 
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    return board_index.all_stones()
 
-        cur.execute("SELECT * FROM stones;")
+def _retrieve_from_table() -> Dict[Tuple[int, int], dict]:
+    """
+    Reads every stone directly from the stones table, bypassing the
+    in-memory board index.
+    """
+    cur = storage.cursor()
 
-        stone_entries = cur.fetchall()
+    cur.execute("SELECT * FROM stones;")
 
-        stones = {}
+    stone_entries = cur.fetchall()
 
-        for entry in stone_entries:
-            stones[(entry[1], entry[2])] = {
-                "id":                      entry[0],
-                "player":                  entry[3],
-                "placement_time":          entry[4],
-                "last_status_change_time": entry[5],
-                "status":                  entry[6],
-            }
+    stones = {}
+
+    for entry in stone_entries:
+        stones[(entry[1], entry[2])] = {
+            "id":                      entry[0],
+            "player":                  entry[3],
+            "placement_time":          entry[4],
+            "last_status_change_time": entry[5],
+            "status":                  entry[6],
+        }
+
+    return stones
+
+def load_index():
+    """
+    (Re)builds the in-memory board index, chains, pending stones and
+    scores from the database.
+    """
+    stones = _retrieve_from_table()
+    with write_lock:
+        board_index.load(stones)
+        groups.rebuild(stones)
+        pending_index.load(stones)
+        region_cache.clear()
+        _load_scores()
+        _pending_deadlines.clear()
+        for (x, y), row in stones.items():
+            if row["status"] == "Pending":
+                _schedule_expiry(x, y, row["last_status_change_time"])
+
+def check_index_consistency() -> List[dict]:
+    """
+    Diffs the in-memory board index against the stones table.
+    Returns a list of discrepancies, each a dict of the form
+    { "x": int, "y": int, "table": dict|None, "index": dict|None }.
+    An empty list means the index is consistent.
+    """
+    table = _retrieve_from_table()
+    index = board_index.all_stones()
+
+    discrepancies = []
+    for coords in sorted(set(table) | set(index)):
+        if table.get(coords) != index.get(coords):
+            discrepancies.append({
+                "x": coords[0],
+                "y": coords[1],
+                "table": table.get(coords),
+                "index": index.get(coords),
+            })
+    return discrepancies
 
-        return stones
+def check_group_consistency() -> List[Tuple[int, frozenset, frozenset]]:
+    """
+    Recomputes every chain from the stones table and compares the result
+    against the incrementally maintained chains in `groups`.
+    Returns the (player, stones, liberties) chains present in only one of
+    the two. An empty list means the chains are consistent.
+    """
+    expected = groups.chains_from(_retrieve_from_table())
+    actual = groups.snapshot()
+    return sorted(expected ^ actual, key=lambda chain: min(chain[1]))
 
 def unlock_stale_pending():
     """
-    Unlocks every pending stone which has timed out.
-    This function should be called beforehand any time
-    information about any stone is retrieved.
+    Unlocks every pending stone which has timed out, logging a 'status'
+    event for each. This function should be called beforehand any time
+    information about any stone is retrieved; it only touches the database
+    when the earliest pending deadline has passed.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    if _pending_deadlines == [] or _pending_deadlines[0][0] > time():
+        return
 
+    with write_lock:
+        # Timestamped under the lock, so that event times follow event ids.
         unlock_time = time()
-        cur.execute("""UPDATE stones SET
-            status = 'Unlocked',
-            last_status_change_time = ?
-        WHERE
-            status = 'Pending' AND
-            last_status_change_time <= ? - ?;""",
-        [unlock_time, unlock_time, pending_timeout])
+        deltas = []
+        due = []
+        while _pending_deadlines != [] and _pending_deadlines[0][0] <= unlock_time:
+            entry = heapq.heappop(_pending_deadlines)
+            _, x, y, pending_since = entry
+            row = board_index.get(x, y)
+            # Skip entries for stones which have since been unlocked, removed or replaced.
+            if row is None or row["status"] != "Pending" or row["last_status_change_time"] != pending_since:
+                continue
+            due.append(entry)
+            row["status"] = "Unlocked"
+            row["last_status_change_time"] = unlock_time
+            deltas.append(make_delta("status", unlock_time, x, y, row))
+        try:
+            _commit_deltas(deltas)
+        except BaseException:
+            # Nothing was committed; keep the deadlines so the next call retries them.
+            for entry in due:
+                heapq.heappush(_pending_deadlines, entry)
+            raise
+
+def _schedule_expiry(x: int, y: int, pending_since: float):
+    """
+    Records the deadline by which the stone at (x, y), pending since
+    `pending_since`, must be unlocked.
+    """
+    with write_lock:
+        heapq.heappush(_pending_deadlines, (pending_since + pending_timeout, x, y, pending_since))
+
+def start_expiry_sweeper(interval: float = 1.0) -> threading.Thread:
+    """
+    Starts a daemon thread which unlocks timed-out pending stones every
+    `interval` seconds, so that their 'status' events are logged even when
+    nobody is reading the board.
+    """
+    def sweep():
+        while True:
+            sleep(interval)
+            try:
+                unlock_stale_pending()
+            except sqlite3.Error:
+                pass # Try again on the next sweep.
+
+    sweeper = threading.Thread(target=sweep, name="pending-expiry-sweeper", daemon=True)
+    sweeper.start()
+    return sweeper
 
 def update_status(stone_id: int, status: str):
     """
     Modifies the status of the specified stone and logs a 'status' event.
     """
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    # Retrieve the stone row to know its coordinates for the board index
+    cur = storage.cursor()
 
-        update_time = time()
-        cur.execute("""UPDATE stones SET
-            status = ?,
-            last_status_change_time = ?
-        WHERE
-            id = ?;""",
-        [status, update_time, stone_id])
-
-    # Retrieve the stone row to know its coordinates and player for event log
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-        cur.execute("SELECT x, y, player, placement_time FROM stones WHERE id = ?;", [stone_id])
-        row = cur.fetchone()
-        if row is not None:
-            _log_board_event(
-                event_type="status",
-                x=row[0],
-                y=row[1],
-                player=row[2],
-                placement_time=row[3],
-                last_status_change_time=update_time,
-                status=status,
-                event_time=update_time,
-            )
-
-# Create a `data/` directory if it does not exist.
-try:
-    os.makedirs("data")
-except OSError as e:
-    if e.errno != errno.EEXIST:
-        raise
-
-with sqlite3.connect(db_file) as db:
-    cur = db.cursor()
-
-    # Ensure the board_events table exists for efficient delta queries BEFORE any event logging
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' and name='board_events';")
-    if cur.fetchall() == []:
-        cur.execute(
-            """
-            CREATE TABLE board_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_time REAL NOT NULL,
-                event_type TEXT NOT NULL,
-                x INTEGER NOT NULL,
-                y INTEGER NOT NULL,
-                player INTEGER,
-                placement_time REAL,
-                last_status_change_time REAL,
-                status TEXT
-            );
-            """
-        )
+    cur.execute("SELECT x, y FROM stones WHERE id = ?;", [stone_id])
+    row = cur.fetchone()
+    if row is not None:
+        update_statuses({(row[0], row[1]): status})
 
-    # Check whether the stones table exists.
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' and name='stones';")
-    
-    # If not, create it and place the first (unlocked) stone.
-    if cur.fetchall() == []:
-        cur.execute("""CREATE TABLE stones (
-            id                      INTEGER PRIMARY KEY AUTOINCREMENT,
-            x                       INTEGER NOT NULL,
-            y                       INTEGER NOT NULL,
-            player                  INTEGER NOT NULL,
-            placement_time          REAL NOT NULL,
-            last_status_change_time REAL NOT NULL,
-            status                  TEXT NOT NULL
-        );""")
-
-        place_stone(1, 0, 0)
-        update_status(1, "Unlocked")
+def update_statuses(statuses: Dict[Tuple[int, int], str]):
+    """
+    Modifies the statuses of the stones at the specified locations in one
+    transaction, keyed by (x, y). All rows are updated with a single batched
+    UPDATE, and their 'status' events are appended with a single batched
+    INSERT sharing one timestamp. Locations without a stone are ignored.
+    """
+    with write_lock:
+        update_time = time()
+        deltas = []
+        for (x, y), status in statuses.items():
+            row = board_index.get(x, y)
+            if row is None:
+                continue
+            row["status"] = status
+            row["last_status_change_time"] = update_time
+            deltas.append(make_delta("status", update_time, x, y, row))
+        _commit_deltas(deltas)
+
+migrations.migrate()
+load_index()
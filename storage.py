@@ -0,0 +1,152 @@
+# Shared SQLite storage layer used by stone_db and user_db.
+
+import errno
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+import metrics
+
+db_file = "data/database.db"
+
+mmap_size = 256 * 1024 * 1024 # Bytes.
+cache_size = 64 * 1024 # KiB.
+statement_cache_size = 256 # Prepared statements kept per connection.
+
+_local = threading.local()
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    A cursor which reports the statements it executes, and the time spent
+    executing them and fetching their rows, to `metrics`.
+    """
+    def execute(self, sql, parameters=()):
+        start = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_sql(perf_counter() - start, 1)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_sql(perf_counter() - start, 1)
+
+    def fetchone(self):
+        start = perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            metrics.record_sql(perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            metrics.record_sql(perf_counter() - start)
+
+    def fetchall(self):
+        start = perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.record_sql(perf_counter() - start)
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            metrics.record_sql(perf_counter() - start)
+
+class TimedConnection(sqlite3.Connection):
+    """
+    A connection whose cursors, including those behind its `execute`
+    shortcuts, are `TimedCursor`s.
+    """
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connect() -> sqlite3.Connection:
+    """
+    Opens a new connection to the database in write-ahead-log mode, so that
+    readers never block the writer. Transactions are managed explicitly
+    (see `transaction`), so the connection runs in autocommit mode. Its
+    statements and their timings are reported to `metrics`.
+    """
+    metrics.record_connection()
+    db = sqlite3.connect(db_file, isolation_level=None, cached_statements=statement_cache_size, factory=TimedConnection)
+    db.execute("PRAGMA journal_mode = WAL;")
+    db.execute("PRAGMA synchronous = NORMAL;")
+    db.execute(f"PRAGMA mmap_size = {int(mmap_size)};")
+    db.execute(f"PRAGMA cache_size = -{int(cache_size)};")
+    return db
+
+def connection() -> sqlite3.Connection:
+    """
+    Returns the calling thread's connection, opening it on first use.
+    """
+    db = getattr(_local, "db", None)
+    if db is None:
+        db = connect()
+        _local.db = db
+        _local.depth = 0
+    return db
+
+def cursor() -> sqlite3.Cursor:
+    """
+    Returns a cursor on the calling thread's connection, for reads which
+    do not need a transaction.
+    """
+    return connection().cursor()
+
+@contextmanager
+def transaction(immediate: bool = False):
+    """
+    Runs the enclosed block in a transaction on the calling thread's
+    connection, yielding a cursor. Commits on success and rolls back if an
+    exception escapes. With `immediate`, the write lock is taken up front
+    (`BEGIN IMMEDIATE`). Nested uses join the outermost transaction.
+    """
+    db = connection()
+    depth = _local.depth
+    if depth == 0:
+        db.execute("BEGIN IMMEDIATE;" if immediate else "BEGIN;")
+    _local.depth = depth + 1
+    try:
+        yield db.cursor()
+    except BaseException:
+        _local.depth = depth
+        if depth == 0:
+            db.execute("ROLLBACK;")
+        raise
+    _local.depth = depth
+    if depth == 0:
+        db.execute("COMMIT;")
+
+def close():
+    """
+    Closes the calling thread's connection, if it has one.
+    """
+    db = getattr(_local, "db", None)
+    if db is not None:
+        db.close()
+        _local.db = None
+
+# Create a `data/` directory if it does not exist.
+try:
+    os.makedirs("data")
+except OSError as e:
+    if e.errno != errno.EEXIST:
+        raise
@@ -1,19 +1,28 @@
 from flask import session
 
-import errno
 import hashlib
 import json
-import os
 import re
-import sqlite3
+import threading
+from collections import OrderedDict
 from time import time
 
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import migrations
+import storage
 
 with open("config.json") as f:
     cfg = json.load(f)
 
-db_file = "data/database.db"
+username_cache_size = 4096 # Most usernames held by the cache.
+username_cache_ttl = 300.0 # Seconds a cached username is trusted for.
+users_query_batch = 500 # Most ids bound in one `IN (...)` query, below SQLite's variable limit.
+
+# user id -> (username, time cached), least recently used first.
+_usernames: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+_usernames_lock = threading.Lock()
+_username_generation = 0 # Bumped whenever a cached username is invalidated.
 
 def login(user_id: int):
     """
@@ -29,9 +38,7 @@ def logout():
     session.pop("user")
 
 def create_user(username: str, email: str, password: Optional[str]) -> None:
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
-
+    with storage.transaction() as cur:
         registered_time = time()
         cur.execute("""INSERT INTO users (
             username,
@@ -47,34 +54,105 @@ def create_user(username: str, email: str, password: Optional[str]) -> None:
             registered_time,
             hash_password(password)
         ])
+    # No invalidation needed: a new user owns no stones, and ids without a
+    # user are never cached.
 
 def get_user_info(user_id: int, *fields: List[str]):
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    cur = storage.cursor()
 
-        cur.execute(f"""SELECT {", ".join(fields)} FROM users WHERE id = ?""", [user_id])
+    cur.execute(f"""SELECT {", ".join(fields)} FROM users WHERE id = ?""", [user_id])
 
-        return cur.fetchone()
+    return cur.fetchone()
+
+def get_users_info(user_ids: Iterable[int], *fields: List[str]) -> Dict[int, tuple]:
+    """
+    Retrieves the given fields for many users at once, with one query per
+    `users_query_batch` ids. Returns { user id: (field values) }, omitting
+    ids which do not belong to any user.
+    """
+    user_ids = list(set(user_ids))
+    cur = storage.cursor()
+
+    info = {}
+    for start in range(0, len(user_ids), users_query_batch):
+        batch = user_ids[start:start + users_query_batch]
+        cur.execute(f"""SELECT id, {", ".join(fields)} FROM users WHERE id IN ({", ".join("?" * len(batch))})""", batch)
+        for row in cur.fetchall():
+            info[row[0]] = tuple(row[1:])
+    return info
+
+def usernames(user_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+    """
+    Returns { user id: username } for the given ids, None for ids which do
+    not belong to any user. Usernames are served from an LRU cache when
+    they were cached within `username_cache_ttl` seconds, and the rest are
+    fetched with `get_users_info`.
+    """
+    now = time()
+    names = {}
+    missing = []
+    with _usernames_lock:
+        for user_id in set(user_ids):
+            cached = _usernames.get(user_id)
+            if cached is not None and now - cached[1] < username_cache_ttl:
+                _usernames.move_to_end(user_id)
+                names[user_id] = cached[0]
+            else:
+                missing.append(user_id)
+
+    if missing:
+        fetched = get_users_info(missing, "username")
+        with _usernames_lock:
+            for user_id in missing:
+                if user_id in fetched:
+                    names[user_id] = fetched[user_id][0]
+                    _usernames[user_id] = (names[user_id], now)
+                    _usernames.move_to_end(user_id)
+                else:
+                    names[user_id] = None
+            while len(_usernames) > username_cache_size:
+                _usernames.popitem(last=False)
+    return names
+
+def invalidate_username(user_id: Optional[int] = None):
+    """
+    Drops the user's cached username, or every cached username if no user
+    is given. Must be called whenever an existing user's username changes.
+    Every region cache entry and window ETag depends on the generation this
+    bumps, so it is not called for new registrations.
+    """
+    global _username_generation
+    with _usernames_lock:
+        _username_generation += 1
+        if user_id is None:
+            _usernames.clear()
+        else:
+            _usernames.pop(user_id, None)
+
+def username_generation() -> int:
+    """
+    Returns a counter which changes whenever any username may have changed,
+    for validating responses which embed usernames.
+    """
+    return _username_generation
 
 def get_user_id_from_email(email: str) -> int:
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    cur = storage.cursor()
 
-        cur.execute("SELECT id FROM users WHERE email = ?", [email])
+    cur.execute("SELECT id FROM users WHERE email = ?", [email])
         
-        result = cur.fetchone()
-        if result is None:
-            return None
+    result = cur.fetchone()
+    if result is None:
+        return None
         
-        return result[0]
+    return result[0]
 
 def get_user_id_from_username(username: str) -> int:
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+    cur = storage.cursor()
 
-        cur.execute("SELECT id FROM users WHERE username = ?", [username])
+    cur.execute("SELECT id FROM users WHERE username = ?", [username])
         
-        return cur.fetchone()[0]
+    return cur.fetchone()[0]
 
 def hash_password(password: Optional[str]) -> str:
     if password is None: # For SAI.
@@ -83,10 +161,17 @@ def hash_password(password: Optional[str]) -> str:
     salted_password = password + cfg["password salt"]
     return hashlib.sha256(bytes(salted_password, "utf-8")).hexdigest()
 
-def update_password(user_id: int, new_password: str):
-    with sqlite3.connect(db_file) as db:
-        cur = db.cursor()
+def update_username(user_id: int, new_username: str):
+    with storage.transaction() as cur:
+        cur.execute("""UPDATE users SET username = ? WHERE id = ?""",
+        [
+            new_username,
+            user_id
+        ])
+    invalidate_username(user_id)
 
+def update_password(user_id: int, new_password: str):
+    with storage.transaction() as cur:
         cur.execute("""UPDATE users SET password_hash = ? WHERE id = ?""",
         [
             hash_password(new_password),
@@ -111,28 +196,4 @@ def validate_username(username: str) -> bool:
     """
     return re.fullmatch(r"[a-z0-9_]{3,16}", username) is not None
 
-# Create a `data/` directory if it does not exist.
-try:
-    os.makedirs("data")
-except OSError as e:
-    if e.errno != errno.EEXIST:
-        raise
-
-with sqlite3.connect(db_file) as db:
-    cur = db.cursor()
-
-    # Check whether the users table exists.
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' and name='users'")
-    
-    # If not, create it and insert the SAI user.
-    if cur.fetchall() == []:
-        cur.execute("""CREATE TABLE users (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            username        TEXT NOT NULL,
-            email           TEXT,
-            registered_time REAL NOT NULL,
-            last_login_time REAL NOT NULL,
-            password_hash   TEXT
-        )""")
-
-        create_user(username="SAI", email=None, password=None)
+migrations.migrate()
@@ -0,0 +1,250 @@
+# Compact binary encoding of stone and event payloads.
+#
+# A payload is the dict an endpoint would otherwise send as JSON, holding
+# either "stones" (keyed by "x y", as from `app.stones_payload`) or
+# "events" (a list, as from `app.events_payload`). It is encoded as, all
+# little-endian:
+#
+#   magic     4 bytes  b"IGW1"
+#   kind      uint8    1 = stones, 2 = events; then 3 bytes of padding
+#   time_base float64  timestamps are offsets from this...
+#   time_unit float64  ...counted in this many seconds
+#   id_base   float64  event ids are deltas starting from this
+#   count     uint32   number of stones or events
+#   meta_len  uint32   followed by the payload's other fields as UTF-8 JSON
+#   players   uint32   followed by, for each player referenced:
+#                        int32 id (-1 if unknown), int32 score,
+#                        uint16 name length (0xFFFF for none), UTF-8 name
+#
+# then one column per field, `count` entries each:
+#
+#   stones: int32 x delta, int32 y delta, uint16 player index,
+#           uint8 status, int32 placement_time, int32 last_status_change_time
+#   events: int32 event_id delta, uint8 event_type, int32 x delta,
+#           int32 y delta, uint16 player index, uint8 status, int32 event_time,
+#           int32 placement_time, int32 last_status_change_time
+#
+# Coordinates and event ids are deltas from the previous entry. A missing
+# player is index 0xFFFF, a missing status 0xFF, and a missing score or
+# timestamp -2**31. `static/scripts/wire.js` decodes the same format in the viewer.
+
+import json
+import struct
+import sys
+from array import array
+
+from typing import List, Optional, Tuple
+
+media_type = "application/vnd.infinite-go.compact"
+
+statuses = ("Unlocked", "Pending", "Locked")
+event_types = ("place", "status", "remove")
+
+# Candidate timestamp resolutions, finest first; the finest which fits
+# every offset in an int32 is used.
+time_units = (0.001, 0.01, 0.1, 1.0, 60.0)
+
+_magic = b"IGW1"
+_header = struct.Struct("<4sB3xdddII")
+_player = struct.Struct("<iiH")
+_kinds = {"stones": 1, "events": 2}
+
+_no_player = 0xFFFF
+_no_status = 0xFF
+_no_score = -2**31
+_no_time = -2**31
+
+def requested(format_arg: Optional[str], accept: Optional[str]) -> bool:
+    """
+    Determines whether a request asked for the compact encoding, with
+    `?format=compact` or by listing `media_type` in its Accept header.
+    An explicit `?format=` wins over the Accept header.
+    """
+    if format_arg is not None:
+        return format_arg == "compact"
+    return accept is not None and media_type in accept
+
+def _column(typecode: str, values) -> bytes:
+    try:
+        column = array(typecode, values)
+    except OverflowError as e: # E.g. a coordinate delta beyond 32 bits.
+        raise ValueError("Value out of range for the compact encoding") from e
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+def _read_column(typecode: str, data: bytes, offset: int, count: int) -> Tuple[List[int], int]:
+    column = array(typecode)
+    end = offset + column.itemsize * count
+    column.frombytes(data[offset:end])
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tolist(), end
+
+def _time_scale(times: List[Optional[float]]) -> Tuple[float, float]:
+    present = [t for t in times if t is not None]
+    if present == []:
+        return 0.0, 1.0
+    base = min(present)
+    span = max(present) - base
+    for unit in time_units:
+        if span / unit < 2**31 - 1:
+            return base, unit
+    raise ValueError("Timestamps span too long a period to encode")
+
+def _offsets(times: List[Optional[float]], base: float, unit: float) -> List[int]:
+    return [_no_time if t is None else round((t - base) / unit) for t in times]
+
+def _deltas(values: List[int]) -> List[int]:
+    previous = 0
+    deltas = []
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+def _undeltas(deltas: List[int], start: int = 0) -> List[int]:
+    values = []
+    for delta in deltas:
+        start += delta
+        values.append(start)
+    return values
+
+def encode(payload: dict) -> bytes:
+    """
+    Encodes a stones or events payload. Raises ValueError if it cannot be
+    represented, e.g. if it references more than 65,535 players, or a
+    coordinate, id or time difference does not fit in 32 bits.
+    """
+    kind = "stones" if "stones" in payload else "events"
+    meta = {field: value for field, value in payload.items() if field != kind}
+
+    if kind == "stones":
+        items = []
+        for key, stone in payload["stones"].items():
+            sx, sy = key.split(" ")
+            items.append(dict(stone, x=int(sx), y=int(sy), player=None))
+    else:
+        items = payload["events"]
+
+    # Players are told apart by id where the payload carries one, and by
+    # name otherwise.
+    players = {}
+    indices = []
+    for item in items:
+        if item["player"] is None and item["player_name"] is None:
+            indices.append(_no_player)
+            continue
+        key = (item["player"], item["player_name"])
+        if key not in players:
+            players[key] = (len(players), item["player_score"])
+        indices.append(players[key][0])
+    if len(players) >= _no_player:
+        raise ValueError("Too many players to encode")
+
+    time_fields = ("placement_time", "last_status_change_time") if kind == "stones" else ("event_time", "placement_time", "last_status_change_time")
+    time_base, time_unit = _time_scale([item[field] for item in items for field in time_fields])
+
+    ids = [item["event_id"] for item in items] if kind == "events" else []
+    id_base = ids[0] if ids else 0
+
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode()
+    parts = [
+        _header.pack(_magic, _kinds[kind], time_base, time_unit, id_base, len(items), len(meta_bytes)),
+        meta_bytes,
+        struct.pack("<I", len(players)),
+    ]
+    for (player_id, name), (_, score) in players.items():
+        name_bytes = b"" if name is None else name.encode()
+        try:
+            parts.append(_player.pack(
+                -1 if player_id is None else player_id,
+                _no_score if score is None else score,
+                _no_player if name is None else len(name_bytes),
+            ))
+        except struct.error as e:
+            raise ValueError("Player out of range for the compact encoding") from e
+        parts.append(name_bytes)
+
+    if kind == "events":
+        parts.append(_column("i", _deltas([event_id - id_base for event_id in ids])))
+        parts.append(_column("B", [event_types.index(item["event_type"]) for item in items]))
+    parts.append(_column("i", _deltas([item["x"] for item in items])))
+    parts.append(_column("i", _deltas([item["y"] for item in items])))
+    parts.append(_column("H", indices))
+    parts.append(_column("B", [_no_status if item["status"] is None else statuses.index(item["status"]) for item in items]))
+    for field in time_fields:
+        parts.append(_column("i", _offsets([item[field] for item in items], time_base, time_unit)))
+    return b"".join(parts)
+
+def decode(data: bytes) -> dict:
+    """
+    Decodes the output of `encode` back into the payload it was given,
+    with timestamps rounded to the encoded resolution.
+    """
+    magic, kind, time_base, time_unit, id_base, count, meta_len = _header.unpack_from(data, 0)
+    if magic != _magic:
+        raise ValueError("Not a compact payload")
+    offset = _header.size
+    payload = json.loads(data[offset:offset + meta_len])
+    offset += meta_len
+
+    (player_count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    players = []
+    for _ in range(player_count):
+        player_id, score, name_len = _player.unpack_from(data, offset)
+        offset += _player.size
+        name = None
+        if name_len != _no_player:
+            name = data[offset:offset + name_len].decode()
+            offset += name_len
+        players.append((None if player_id == -1 else player_id, name, None if score == _no_score else score))
+
+    def times(column):
+        return [None if t == _no_time else time_base + t * time_unit for t in column]
+
+    if kind == _kinds["events"]:
+        event_ids, offset = _read_column("i", data, offset, count)
+        types, offset = _read_column("B", data, offset, count)
+    xs, offset = _read_column("i", data, offset, count)
+    ys, offset = _read_column("i", data, offset, count)
+    indices, offset = _read_column("H", data, offset, count)
+    status_codes, offset = _read_column("B", data, offset, count)
+    columns = []
+    for _ in range(2 if kind == _kinds["stones"] else 3):
+        column, offset = _read_column("i", data, offset, count)
+        columns.append(times(column))
+
+    xs, ys = _undeltas(xs), _undeltas(ys)
+    items = []
+    for i in range(count):
+        player_id, name, score = players[indices[i]] if indices[i] != _no_player else (None, None, None)
+        item = {
+            "player": player_id,
+            "player_name": name,
+            "player_score": score,
+            "status": None if status_codes[i] == _no_status else statuses[status_codes[i]],
+        }
+        items.append(item)
+
+    if kind == _kinds["stones"]:
+        payload["stones"] = {}
+        for i, item in enumerate(items):
+            del item["player"]
+            item["placement_time"], item["last_status_change_time"] = columns[0][i], columns[1][i]
+            payload["stones"][f"{xs[i]} {ys[i]}"] = item
+    else:
+        event_ids = _undeltas(event_ids, int(id_base))
+        for i, item in enumerate(items):
+            item.update({
+                "event_id": event_ids[i],
+                "event_type": event_types[types[i]],
+                "x": xs[i],
+                "y": ys[i],
+                "event_time": columns[0][i],
+                "placement_time": columns[1][i],
+                "last_status_change_time": columns[2][i],
+            })
+        payload["events"] = items
+    return payload